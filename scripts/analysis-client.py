@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Analysis Service Client
+=======================
+
+Thin client of `analyze-pgn.py serve`: sends the games on stdin to the running
+service and prints its analysis JSON, a drop-in replacement for piping them
+through analyze-pgn.py (same input formats, same output) without the start-up
+cost of a new analyzer and engine per call.
+
+Only the standard library is loaded (see analysis/service.py).
+
+Usage:
+    python analyze-pgn.py serve --depth 15 &
+    python analysis-client.py < games.pgn > analysis.json
+    python analysis-client.py --json-input < games.json > analysis.json
+    python analysis-client.py --depth 10 < games.pgn > analysis.json   # refused unless the service runs --depth 10
+    python analysis-client.py --status
+    python analysis-client.py --shutdown
+
+The service address defaults to $ANALYSIS_SERVICE_URL or http://127.0.0.1:8737.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from analysis.service import DEFAULT_URL, ServiceError, request
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze games from stdin with a running analyze-pgn.py service')
+    parser.add_argument('--url', type=str, default=os.environ.get('ANALYSIS_SERVICE_URL', DEFAULT_URL),
+                        help='Service address (default: $ANALYSIS_SERVICE_URL or %(default)s)')
+    parser.add_argument('--depth', type=int, default=None, help='Depth the analysis must have (the service refuses other depths)')
+    parser.add_argument('--sample', type=int, default=None, help='Sample rate the analysis must have')
+    parser.add_argument('--json-input', action='store_true', help='Input is JSON with game metadata, as for analyze-pgn.py --json-input')
+    parser.add_argument('--status', action='store_true', help="Print the service's settings and counters instead")
+    parser.add_argument('--shutdown', action='store_true', help='Stop the service')
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            print(json.dumps(request(args.url, '/status'), indent=2))
+            return
+        if args.shutdown:
+            request(args.url, '/shutdown')
+            print(f"🛑 Analysis service at {args.url} stopping", file=sys.stderr)
+            return
+
+        body = sys.stdin.read()
+        if args.json_input and not body.lstrip().startswith('{'):
+            parser.error('--json-input expects a JSON document on stdin')
+        params = {name: value for name, value in (('depth', args.depth), ('sample', args.sample)) if value is not None}
+        output = request(args.url, '/analyze', body, params)
+    except ServiceError as e:
+        print(f"Analysis service error: {e}", file=sys.stderr)
+        if e.status == 503:
+            print("Start it with: python3 scripts/analyze-pgn.py serve", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✅ {len(output['games'])} game(s) analyzed by {args.url}", file=sys.stderr)
+    print(json.dumps(output, indent=2), flush=True)
+
+
+if __name__ == '__main__':
+    main()
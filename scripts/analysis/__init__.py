@@ -0,0 +1 @@
+"""Support modules for scripts/analyze-pgn.py."""
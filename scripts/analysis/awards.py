@@ -0,0 +1,234 @@
+"""
+Round Awards
+============
+
+Columnar award aggregation over analyzed game records.
+
+Game records are loaded into a table of NumPy columns (one value per game, or
+one per game and side), and every award is a vectorized argmax / argmin over
+its column followed by one lookup of the winning record. Ties go to the
+earliest game, and to White before Black within a game.
+
+Awards are declared in AWARDS as (name, Award) pairs, in output order:
+
+    Award(column, best, entry)
+
+    column  - name of a column built by AwardTable (NaN marks rows that do not
+              compete, e.g. games without a blunder)
+    best    - 'max' or 'min'
+    entry   - builds the award dict from (record, side); side is 'white' /
+              'black' for per-side columns and None for per-game columns
+
+Adding an award means adding a column (if it needs a new metric) and an entry.
+"""
+
+import numpy as np
+
+SIDES = ('white', 'black')
+
+# A 2600+ rated player's blunder qualifies for the "Not So Super GM" award
+SUPER_GM_RATING = 2600
+
+
+def total_moves(record, side):
+    return sum(record[f'{side}MoveQuality'].values())
+
+
+def game_fields(record):
+    return {
+        'white': record['white'],
+        'black': record['black'],
+        'gameIndex': record['gameIndex'],
+        'gameId': record['gameId']
+    }
+
+
+def accuracy_entry(record, side):
+    return {
+        'player': side,
+        'accuracy': record[f'{side}Accuracy'],
+        'acpl': record[f'{side}ACPL'],
+        **game_fields(record)
+    }
+
+
+def acpl_entry(record, side):
+    return {
+        'player': side,
+        'acpl': record[f'{side}ACPL'],
+        'accuracy': record[f'{side}Accuracy'],
+        **game_fields(record)
+    }
+
+
+def combined_acpl_entry(record, side):
+    return {
+        'combinedACPL': record['whiteACPL'] + record['blackACPL'],
+        'whiteACPL': record['whiteACPL'],
+        'blackACPL': record['blackACPL'],
+        **game_fields(record)
+    }
+
+
+def detail_entry(key):
+    """Entry copying a per-game detail dict (biggestBlunder, biggestComeback, ...)."""
+    def entry(record, side):
+        return {**record[key], **game_fields(record)}
+    return entry
+
+
+def engine_moves_entry(record, side):
+    engine_moves = record[f'{side}EngineMoves']
+    total = total_moves(record, side)
+    return {
+        'player': side,
+        'engineMoves': engine_moves,
+        'totalMoves': total,
+        'percentage': round(engine_moves / total * 100, 1) if total > 0 else 0,
+        **game_fields(record)
+    }
+
+
+def inaccuracies_entry(record, side):
+    return {
+        'player': side,
+        'inaccuracies': record[f'{side}MoveQuality']['inaccuracies'],
+        'totalMoves': total_moves(record, side),
+        **game_fields(record)
+    }
+
+
+def blunderer(record):
+    """Side, name and rating of the player who made the game's biggest blunder."""
+    side = record['biggestBlunder']['player']
+    return side, record[side], record.get(f'{side}Rating')
+
+
+def super_gm_entry(record, side):
+    _, name, rating = blunderer(record)
+    return {
+        **record['biggestBlunder'],
+        'rating': rating,
+        'playerName': name,
+        'white': record['white'],
+        'black': record['black'],
+        'whiteRating': record.get('whiteRating'),
+        'blackRating': record.get('blackRating'),
+        'gameIndex': record['gameIndex'],
+        'gameId': record['gameId']
+    }
+
+
+class Award:
+    """One award: the best row of a column, turned into an award dict."""
+
+    def __init__(self, column, best, entry):
+        self.column = column
+        self.best = best
+        self.entry = entry
+
+
+AWARDS = (
+    ('accuracyKing', Award('accuracy', 'max', accuracy_entry)),
+    ('biggestBlunder', Award('blunderSeverity', 'max', detail_entry('biggestBlunder'))),
+    ('comebackKing', Award('comebackSwing', 'max', detail_entry('biggestComeback'))),
+    ('luckyEscape', Award('escapeAmount', 'max', detail_entry('luckyEscape'))),
+    ('stockfishBuddy', Award('engineMoves', 'max', engine_moves_entry)),
+    ('inaccuracyKing', Award('inaccuracies', 'max', inaccuracies_entry)),
+    ('lowestACPL', Award('acpl', 'min', acpl_entry)),
+    ('highestACPL', Award('acpl', 'max', acpl_entry)),
+    ('lowestCombinedACPL', Award('combinedACPL', 'min', combined_acpl_entry)),
+    ('highestCombinedACPL', Award('combinedACPL', 'max', combined_acpl_entry)),
+    ('notSoSuperGM', Award('superGMSeverity', 'max', super_gm_entry)),
+)
+
+
+def detail_value(key, field):
+    """Column function: a field of an optional per-game detail dict (NaN when absent)."""
+    def value(record):
+        detail = record[key]
+        return detail[field] if detail else np.nan
+    return value
+
+
+def super_gm_severity(record):
+    if not record['biggestBlunder']:
+        return np.nan
+    _, _, rating = blunderer(record)
+    if not rating or rating < SUPER_GM_RATING:
+        return np.nan
+    return record['biggestBlunder']['severity']
+
+
+# Per-side columns: value of (record, side)
+SIDE_COLUMNS = {
+    'accuracy': lambda record, side: record[f'{side}Accuracy'],
+    'acpl': lambda record, side: record[f'{side}ACPL'],
+    'engineMoves': lambda record, side: record[f'{side}EngineMoves'],
+    'inaccuracies': lambda record, side: record[f'{side}MoveQuality']['inaccuracies'],
+}
+
+# Per-game columns: value of a record
+GAME_COLUMNS = {
+    'combinedACPL': lambda record: record['whiteACPL'] + record['blackACPL'],
+    'blunderSeverity': detail_value('biggestBlunder', 'severity'),
+    'comebackSwing': detail_value('biggestComeback', 'swing'),
+    'escapeAmount': detail_value('luckyEscape', 'escapeAmount'),
+    'superGMSeverity': super_gm_severity,
+}
+
+
+class AwardTable:
+    """
+    Game records plus their award columns.
+
+    Records can be added one at a time (e.g. while streaming); the per-ply
+    moveTimes are not kept, only what the award entries need.
+    """
+
+    def __init__(self, records=()):
+        self.records = []
+        self._rows = {name: [] for name in (*SIDE_COLUMNS, *GAME_COLUMNS)}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        record = {key: value for key, value in record.items() if key != 'moveTimes'}
+        self.records.append(record)
+        for name, value in SIDE_COLUMNS.items():
+            self._rows[name].append([value(record, side) for side in SIDES])
+        for name, value in GAME_COLUMNS.items():
+            self._rows[name].append(value(record))
+
+    def columns(self):
+        """Every column as a float array: shape (games, 2) for per-side columns, (games,) otherwise."""
+        return {name: np.asarray(rows, dtype=float) for name, rows in self._rows.items()}
+
+    @staticmethod
+    def best(award, values):
+        """(record index, side) of the award winner in its column, or None if no row competes."""
+        flat = values.ravel()
+        if flat.size == 0 or np.isnan(flat).all():
+            return None
+        index = int(np.nanargmax(flat) if award.best == 'max' else np.nanargmin(flat))
+        if values.ndim == 2:
+            return index // len(SIDES), SIDES[index % len(SIDES)]
+        return index, None
+
+    def summary(self):
+        """Every award, in AWARDS order (None for awards nobody qualified for)."""
+        columns = self.columns()
+        summary = {}
+        for name, award in AWARDS:
+            winner = self.best(award, columns[award.column])
+            if winner is None:
+                summary[name] = None
+            else:
+                row, side = winner
+                summary[name] = award.entry(self.records[row], side)
+        return summary
+
+
+def summarize(records):
+    """Round summary of a list of game records."""
+    return AwardTable(records).summary()
@@ -0,0 +1,112 @@
+"""
+Time Budget Scheduler
+=====================
+
+Fits a run into a wall-clock budget (analyze-pgn.py --time-budget MINUTES) by
+choosing the search depth of every game just before it is handed to a worker.
+
+Games are analyzed in award-relevance order: decisive games, games with a
+2600+ player (notSoSuperGM) and long games first, longer games before shorter
+ones. Each game gets the deepest depth (at most --depth) whose estimated cost
+still leaves room for every game after it at MIN_BUDGET_DEPTH, so the games
+that feed awards are analyzed first and deepest and only the tail of the
+queue is downgraded.
+
+Cost model: wall seconds per searched position at --depth (measured over all
+workers), times DEPTH_COST_GROWTH per depth step. The estimate starts from a
+short calibration and is replaced by the measured cost of finished games as
+the run goes on.
+"""
+
+import time
+
+from .awards import SUPER_GM_RATING
+
+# Search time multiplier per extra ply of depth (Stockfish's effective branching factor)
+DEPTH_COST_GROWTH = 1.5
+
+# Games are never downgraded below this depth (or --depth, if lower)
+MIN_BUDGET_DEPTH = 6
+
+# Share of the budget planned for; the rest covers estimate errors and writing the output
+BUDGET_SAFETY = 0.9
+
+# Games at least this long are likely comeback / lucky escape candidates
+LONG_GAME_PLIES = 120
+
+
+def award_relevance(job):
+    """How many award-feeding traits a game has (decisive result, 2600+ player, long game)."""
+    ratings = [rating for rating in (job.get('whiteRating'), job.get('blackRating')) if rating]
+    return sum((
+        job.get('result') in ('1-0', '0-1'),
+        bool(ratings) and max(ratings) >= SUPER_GM_RATING,
+        job['moveCount'] >= LONG_GAME_PLIES,
+    ))
+
+
+def priority_order(jobs):
+    """Jobs most worth a full-depth search first (ties: longer games, then input order)."""
+    return sorted(jobs, key=lambda job: (-award_relevance(job), -job['moveCount'], job['gameIndex']))
+
+
+class BudgetScheduler:
+    """Picks each game's depth as it is scheduled and learns the real cost from finished games."""
+
+    def __init__(self, budget_seconds, depth, sample_rate, workers, positions_per_second, started=None):
+        self.budget_seconds = budget_seconds
+        self.depth = depth
+        self.min_depth = min(depth, MIN_BUDGET_DEPTH)
+        self.sample_rate = sample_rate
+        self.workers = workers
+        self.started = time.perf_counter() if started is None else started
+        self._calibrated = 1 / positions_per_second
+        self._observed_seconds = 0.0
+        self._observed_positions = 0.0
+        self._in_flight = {}
+        self.downgraded = 0
+
+    def positions(self, job):
+        """Positions searched for a game (roughly one per sampled ply)."""
+        return job['moveCount'] // self.sample_rate + 1 if job['moveCount'] else 0
+
+    def seconds_per_position(self):
+        """Wall seconds per position at full depth: measured once games finish, calibrated until then."""
+        if self._observed_positions:
+            return self._observed_seconds / self._observed_positions
+        return self._calibrated
+
+    def cost(self, positions, depth):
+        return positions * self.seconds_per_position() * DEPTH_COST_GROWTH ** (depth - self.depth)
+
+    def estimate(self, jobs, depth=None):
+        """Estimated wall seconds of analyzing jobs at one depth (default: full depth)."""
+        return self.cost(sum(self.positions(job) for job in jobs), depth or self.depth)
+
+    def schedule(self, jobs):
+        """Yield jobs in priority order, each with job['depth'] set just before it is handed out."""
+        queue = priority_order(jobs)
+        remaining = sum(self.positions(job) for job in queue)
+        for job in queue:
+            positions = self.positions(job)
+            remaining -= positions
+            elapsed = time.perf_counter() - self.started
+            room = (self.budget_seconds * BUDGET_SAFETY - elapsed - sum(self._in_flight.values())
+                    - self.cost(remaining, self.min_depth))
+            depth = self.depth
+            while depth > self.min_depth and self.cost(positions, depth) > room:
+                depth -= 1
+            if depth < self.depth:
+                self.downgraded += 1
+            job['depth'] = depth
+            self._in_flight[job['gameIndex']] = self.cost(positions, depth)
+            yield job
+
+    def finish(self, job, counters):
+        """Account a finished game, learning from the time its worker spent on it."""
+        self._in_flight.pop(job['gameIndex'], None)
+        pending = counters.get('metrics')
+        positions = self.positions(job)
+        if pending and positions and job.get('depth'):
+            self._observed_seconds += sum(pending['phases'].values()) / self.workers
+            self._observed_positions += positions * DEPTH_COST_GROWTH ** (job['depth'] - self.depth)
@@ -0,0 +1,153 @@
+"""
+Persistent Position Evaluation Cache
+====================================
+
+SQLite-backed store of Stockfish evaluations shared across runs and rounds.
+
+Positions are keyed by their normalized FEN (piece placement, side to move,
+castling rights and en passant square; move counters are dropped so the same
+position reached at different move numbers shares one entry) together with
+the search depth and the engine identity (UCI "id name"). The composite key is
+hashed to a 64-bit integer so every row is just a few integers.
+
+Least recently used entries are evicted once the cache grows past its size cap.
+Several processes may share one cache file (WAL mode, buffered writes).
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+DEFAULT_MAX_ENTRIES = 2000000
+
+# Buffered lookups/stores are written out after this many operations
+FLUSH_EVERY = 500
+
+SCORE_TYPES = {'cp': 0, 'mate': 1}
+SCORE_NAMES = {code: name for name, code in SCORE_TYPES.items()}
+
+
+def normalize_fen(fen):
+    """Drop the halfmove clock and fullmove number from a FEN."""
+    return ' '.join(fen.split()[:4])
+
+
+def position_key(fen, depth, engine_id):
+    """64-bit signed integer key for (normalized position, depth, engine)."""
+    digest = hashlib.blake2b(
+        f"{engine_id}|{depth}|{normalize_fen(fen)}".encode(), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class EvalCache:
+    """On-disk evaluation cache with LRU eviction."""
+
+    def __init__(self, path, engine_id, depth, max_entries=DEFAULT_MAX_ENTRIES):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.engine_id = engine_id
+        self.depth = depth
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        self._pending_stores = []
+        self._pending_touches = []
+
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS evals ('
+            'key INTEGER PRIMARY KEY, '
+            'score_type INTEGER NOT NULL, '
+            'score INTEGER NOT NULL, '
+            'last_used INTEGER NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, fen, depth=None):
+        """Return the cached evaluation dict for a position (at the cache's depth unless given), or None."""
+        key = position_key(fen, self.depth if depth is None else depth, self.engine_id)
+        row = self._conn.execute(
+            'SELECT score_type, score FROM evals WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._pending_touches.append((time.time_ns(), key))
+        self._maybe_flush()
+        return {'type': SCORE_NAMES[row[0]], 'value': row[1]}
+
+    def put(self, fen, evaluation, depth=None):
+        """Store an evaluation dict ({'type': 'cp'|'mate', 'value': int})."""
+        if evaluation['type'] not in SCORE_TYPES:
+            return
+        key = position_key(fen, self.depth if depth is None else depth, self.engine_id)
+        self._pending_stores.append(
+            (key, SCORE_TYPES[evaluation['type']], int(evaluation['value']), time.time_ns())
+        )
+        self.stores += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._pending_stores) + len(self._pending_touches) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Write buffered stores and LRU timestamps to disk."""
+        if not self._pending_stores and not self._pending_touches:
+            return
+        with self._conn:
+            if self._pending_stores:
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO evals (key, score_type, score, last_used) VALUES (?, ?, ?, ?)',
+                    self._pending_stores
+                )
+            if self._pending_touches:
+                self._conn.executemany(
+                    'UPDATE evals SET last_used = ? WHERE key = ?',
+                    self._pending_touches
+                )
+        self._pending_stores = []
+        self._pending_touches = []
+
+    def evict(self):
+        """Drop least recently used entries beyond the size cap. Returns rows removed."""
+        self.flush()
+        count = self.entry_count()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        with self._conn:
+            self._conn.execute(
+                'DELETE FROM evals WHERE key IN '
+                '(SELECT key FROM evals ORDER BY last_used ASC LIMIT ?)',
+                (excess,)
+            )
+        return excess
+
+    def entry_count(self):
+        return self._conn.execute('SELECT COUNT(*) FROM evals').fetchone()[0]
+
+    def size_bytes(self):
+        """Size of the cache file including its write-ahead log."""
+        total = 0
+        for suffix in ('', '-wal'):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        self.flush()
+        self._conn.close()
@@ -0,0 +1,87 @@
+"""
+Analysis Checkpoints
+====================
+
+Append-only JSONL sidecar holding every finished game record of a run, so an
+interrupted analysis can be resumed without repeating engine work.
+
+The first line records the settings the games were analyzed with (engine,
+depth, ...); every following line is one game record exactly as it appears in
+the output JSON. Each record is flushed and fsync'd as soon as it is written.
+A truncated record (crash mid-write) is ignored when loading; a file whose
+settings line is unreadable cannot be resumed.
+"""
+
+import json
+import os
+
+
+class CheckpointMismatch(Exception):
+    """The checkpoint was written with different analysis settings."""
+
+
+def load_checkpoint(path, header):
+    """
+    Read finished game records from a checkpoint file.
+
+    Returns a dict mapping gameIndex to its record (empty if the file does not
+    exist). Raises CheckpointMismatch if it was written with other settings
+    or its settings line is unreadable.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                if line_number == 0:
+                    # Resumed writers append without rewriting it: every later resume would go unchecked
+                    raise CheckpointMismatch(f"{path} has no readable settings line")
+                continue  # Partially written line from an interrupted run
+
+            if line_number == 0:
+                saved = entry.get('checkpoint', {})
+                if saved != header:
+                    raise CheckpointMismatch(f"{path} was written with {saved}, this run uses {header}")
+                continue
+
+            records[entry['gameIndex']] = entry
+
+    return records
+
+
+class CheckpointWriter:
+    """Durably appends finished game records to a checkpoint file."""
+
+    def __init__(self, path, header, resume=False):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        keep_existing = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'a' if keep_existing else 'w', encoding='utf-8')
+        if keep_existing:
+            self._terminate_partial_line()
+        else:
+            self._write({'checkpoint': header})
+
+    def _terminate_partial_line(self):
+        """Start on a fresh line if the previous run died mid-record."""
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                self._file.write('\n')
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, record):
+        self._write(record)
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,83 @@
+"""
+Engine Backends
+===============
+
+Two interchangeable ways of talking to Stockfish, selected with
+`analyze-pgn.py --engine-backend`:
+
+    uci        Persistent UCI session via python-chess (chess.engine). Positions
+               are sent as `position startpos moves ...` with the game history,
+               and `ucinewgame` is only sent once, so the hash table stays warm
+               from one ply (and game) to the next.
+    stockfish  The `stockfish` pip package wrapper (`position fen ...` per
+               position), kept for comparison.
+
+Both return evaluations as {'type': 'cp'|'mate', 'value': int} from White's
+perspective and accept Threads / Hash settings. A search may ask for another
+depth than the configured one (the coarse pass of --coarse-depth).
+"""
+
+import chess
+import chess.engine
+from stockfish import Stockfish
+
+
+class UciEngine:
+    """Stockfish driven through a long-lived python-chess UCI session."""
+
+    name = 'uci'
+
+    def __init__(self, path, depth, threads=1, hash_mb=16):
+        self.depth = depth
+        self._limit = chess.engine.Limit(depth=depth)
+        self._engine = chess.engine.SimpleEngine.popen_uci(path)
+        self._engine.configure({'Threads': threads, 'Hash': hash_mb})
+
+    def evaluate(self, board, depth=None):
+        """Search a board (its move stack is sent as history) to the configured depth."""
+        limit = self._limit if depth is None else chess.engine.Limit(depth=depth)
+        info = self._engine.analyse(board, limit)
+        score = info['score'].white()
+        if score.is_mate():
+            return {'type': 'mate', 'value': score.mate()}
+        return {'type': 'cp', 'value': score.score()}
+
+    def close(self):
+        self._engine.quit()
+
+
+class StockfishWrapperEngine:
+    """Stockfish driven through the `stockfish` package (one FEN per search)."""
+
+    name = 'stockfish'
+
+    def __init__(self, path, depth, threads=1, hash_mb=16):
+        self.depth = depth
+        self._search_depth = depth
+        self._stockfish = Stockfish(path=path, depth=depth,
+                                    parameters={'Threads': threads, 'Hash': hash_mb})
+        # Newer releases of the wrapper report scores from the side to move by default
+        if hasattr(self._stockfish, 'set_turn_perspective'):
+            self._stockfish.set_turn_perspective(False)
+
+    def evaluate(self, board, depth=None):
+        depth = self.depth if depth is None else depth
+        if depth != self._search_depth:
+            self._stockfish.set_depth(depth)
+            self._search_depth = depth
+        self._stockfish.set_fen_position(board.fen())
+        return self._stockfish.get_evaluation()
+
+    def close(self):
+        self._stockfish.send_quit_command()
+
+
+ENGINE_BACKENDS = {
+    UciEngine.name: UciEngine,
+    StockfishWrapperEngine.name: StockfishWrapperEngine,
+}
+
+
+def open_engine(backend, path, depth, threads=1, hash_mb=16):
+    """Start an engine with the named backend."""
+    return ENGINE_BACKENDS[backend](path, depth, threads, hash_mb)
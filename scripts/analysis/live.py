@@ -0,0 +1,158 @@
+"""
+Live Round Tracking
+===================
+
+Bookkeeping of analyze-pgn.py --follow: watches the games.pgn files under one
+or more directories (e.g. _SRC/cup2025/round5game*) while a round is being
+broadcast and reports which games changed since the last poll.
+
+A file is only parsed again when its size or modification time changed.
+Games are identified by their file and their position in it:
+
+    new        first seen
+    extended   its mainline continues the one seen before: only the new
+               plies need the engine, earlier evaluations are kept
+    replaced   moves corrected (the new mainline does not continue the old
+               one), or another pairing in its place: analyzed again from
+               scratch (positions seen before still come from the eval cache)
+    result     same moves, new Result header (decides the comeback check)
+    removed    no longer in its file
+
+Each FollowedGame keeps the analysis state of its game between updates (its
+job fields, evaluation timeline and latest analysis), so scoring an update
+only costs the searches of its new positions.
+"""
+
+import io
+import json
+import os
+
+import chess.pgn
+
+PGN_FILE_NAME = 'games.pgn'
+
+
+def find_pgn_files(directories):
+    """Every games.pgn under the directories (or the listed files themselves), in sorted path order."""
+    paths = set()
+    for directory in directories:
+        if os.path.isfile(directory):
+            paths.add(directory)
+            continue
+        for root, _, files in os.walk(directory):
+            if PGN_FILE_NAME in files:
+                paths.add(os.path.join(root, PGN_FILE_NAME))
+    return sorted(paths)
+
+
+def write_json_atomic(path, data):
+    """Write JSON through a temporary file and a rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(data, indent=2) + '\n')
+    os.replace(temp_path, path)
+
+
+class FollowedGame:
+    """One followed game: where it lives, its moves so far and the analysis state kept between updates."""
+
+    def __init__(self, path, ordinal):
+        self.path = path
+        self.ordinal = ordinal
+        self.headers = {}
+        self.start_fen = None
+        self.ucis = ()
+        self.job = None
+        self.timeline = None
+        self.analysis = None
+
+    @property
+    def finished(self):
+        return self.headers.get('Result', '*') != '*'
+
+
+class LiveRound:
+    """The followed games of a set of directories, updated by poll()."""
+
+    def __init__(self, directories):
+        self.directories = directories
+        self.games = {}  # (path, ordinal) -> FollowedGame
+        self._stamps = {}  # path -> (size, mtime_ns) when last parsed
+
+    def ordered(self):
+        """Followed games in (file, position) order: the order of the files concatenated."""
+        return [self.games[key] for key in sorted(self.games)]
+
+    def poll(self):
+        """
+        Parse the files that changed since the last poll and return a list of
+        (status, FollowedGame, parsed game or None, new plies) for every game
+        that changed (see the module docstring).
+        """
+        updates = []
+        paths = find_pgn_files(self.directories)
+        for path in set(self._stamps) - set(paths):
+            # File gone: so are its games
+            del self._stamps[path]
+            updates += self._remove(path, 0)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamp = (stat.st_size, stat.st_mtime_ns)
+                if self._stamps.get(path) == stamp:
+                    continue
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except FileNotFoundError:
+                continue
+            self._stamps[path] = stamp
+
+            pgn = io.StringIO(text)
+            ordinal = 0
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                update = self._update(path, ordinal, game)
+                if update:
+                    updates.append(update)
+                ordinal += 1
+            updates += self._remove(path, ordinal)
+        return updates
+
+    def _update(self, path, ordinal, game):
+        key = (path, ordinal)
+        ucis = tuple(move.uci() for move in game.mainline_moves())
+        start_fen = game.board().fen()
+        headers = dict(game.headers)
+        followed = self.games.get(key)
+
+        if followed is None:
+            status = 'new'
+        elif (start_fen != followed.start_fen or ucis[:len(followed.ucis)] != followed.ucis
+              or (headers.get('White'), headers.get('Black')) != (followed.headers.get('White'), followed.headers.get('Black'))):
+            status = 'replaced'
+        elif len(ucis) > len(followed.ucis):
+            status = 'extended'
+        elif headers.get('Result') != followed.headers.get('Result'):
+            status = 'result'
+        else:
+            followed.headers = headers
+            return None
+
+        if status in ('new', 'replaced'):
+            followed = self.games[key] = FollowedGame(path, ordinal)
+            followed.start_fen = start_fen
+        new_plies = len(ucis) - len(followed.ucis)
+        followed.headers = headers
+        followed.ucis = ucis
+        return status, followed, game, new_plies
+
+    def _remove(self, path, first_ordinal):
+        """Forget the games of a file from position first_ordinal on."""
+        removed = []
+        for key in [key for key in self.games if key[0] == path and key[1] >= first_ordinal]:
+            removed.append(('removed', self.games.pop(key), None, 0))
+        return removed
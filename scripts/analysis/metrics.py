@@ -0,0 +1,191 @@
+"""
+Run Metrics
+===========
+
+Instrumentation for analyze-pgn.py: per-phase timers, engine call counts per
+game and an engine latency histogram, written as JSON with --metrics PATH.
+
+Phases:
+
+    pgnParse        reading games from PGN text
+    replay          board replay, FEN and SAN generation (build_eval_timeline)
+    engineWait      waiting for engine searches
+    classification  move classification and per-game scoring (analyze_game)
+    summary         round awards
+    serialization   JSON output, checkpoint and ply file writes
+
+Every process records into its own Metrics object; pool workers ship their
+pending measurements back with each result (drain) and the main process merges
+them into the run total, so phase times are summed across processes. Pipeline
+producer threads (see analysis/pipeline.py) record into the same object as the
+thread consuming their items, so every update holds a lock.
+
+Pipeline stages add their queue wait times under their name (stages).
+
+EtaTracker turns the measured plies/sec into a live ETA over the plies left.
+"""
+
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+PHASES = ('pgnParse', 'replay', 'engineWait', 'classification', 'summary', 'serialization')
+
+# Upper bounds (ms) of the engine latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Metrics:
+    """Phase timers, engine call counts and latency histogram of one process."""
+
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.engine_calls = 0
+        self.engine_seconds = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.calls_per_game = {}
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] += seconds
+
+    @contextmanager
+    def timer(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def engine_call(self, seconds, game_index=None):
+        """Record one engine search that took `seconds` (waiting included)."""
+        with self._lock:
+            self.phases['engineWait'] += seconds
+            self.engine_calls += 1
+            self.engine_seconds += seconds
+            self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+            if game_index is not None:
+                self.calls_per_game[game_index] = self.calls_per_game.get(game_index, 0) + 1
+
+    def stage(self, name, stats):
+        """Add the item count and wait times of a pipeline stage."""
+        with self._lock:
+            totals = self.stages.setdefault(name, {})
+            for key, value in stats.items():
+                totals[key] = value if key == 'queueSize' else totals.get(key, 0) + value
+
+    def drain(self):
+        """Pending measurements as a plain dict (picklable), resetting this object."""
+        with self._lock:
+            pending = {
+                'phases': self.phases,
+                'engineCalls': self.engine_calls,
+                'engineSeconds': self.engine_seconds,
+                'latencyHistogram': self.latency_histogram,
+                'callsPerGame': self.calls_per_game,
+                'stages': self.stages
+            }
+            self.phases = dict.fromkeys(PHASES, 0.0)
+            self.engine_calls = 0
+            self.engine_seconds = 0.0
+            self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            self.calls_per_game = {}
+            self.stages = {}
+        return pending
+
+    def merge(self, pending):
+        """Add measurements drained from this or another process."""
+        with self._lock:
+            for phase, seconds in pending['phases'].items():
+                self.phases[phase] += seconds
+            self.engine_calls += pending['engineCalls']
+            self.engine_seconds += pending['engineSeconds']
+            for bucket, count in enumerate(pending['latencyHistogram']):
+                self.latency_histogram[bucket] += count
+            for game_index, calls in pending['callsPerGame'].items():
+                self.calls_per_game[game_index] = self.calls_per_game.get(game_index, 0) + calls
+        for name, stats in pending.get('stages', {}).items():
+            self.stage(name, stats)
+
+    def report(self, wall_seconds, games, plies, workers, counters=None):
+        """Metrics JSON of a finished run."""
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+        calls = sorted(self.calls_per_game.items())
+        return {
+            'wallSeconds': round(wall_seconds, 3),
+            'workers': workers,
+            'games': games,
+            'plies': plies,
+            'pliesPerSecond': round(plies / wall_seconds, 2) if wall_seconds > 0 else None,
+            'phases': {phase: round(seconds, 3) for phase, seconds in self.phases.items()},
+            'engine': {
+                'calls': self.engine_calls,
+                'meanLatencyMs': round(self.engine_seconds / self.engine_calls * 1000, 3) if self.engine_calls else None,
+                'latencyHistogramMs': dict(zip(labels, self.latency_histogram)),
+                'callsPerGame': {str(game_index): count for game_index, count in calls}
+            },
+            'pipeline': {name: {key: round(value, 3) if isinstance(value, float) else value
+                                for key, value in stats.items()}
+                         for name, stats in self.stages.items()},
+            'counters': counters or {}
+        }
+
+
+# Move text tokens that are not moves: move numbers, results, NAGs
+NON_MOVE_TOKEN = re.compile(r'^(\d+\.+|1-0|0-1|1/2-1/2|\*|\$\d+)$')
+
+
+def count_plies(pgn_text):
+    """
+    Quick mainline ply count of a PGN text (no move parsing), for the ETA.
+
+    Header lines, {comments}, ;comments and (variations) are skipped; every
+    other token that is not a move number, result or NAG counts as a ply.
+    """
+    text = '\n'.join(line for line in pgn_text.splitlines() if not line.startswith('['))
+    text = re.sub(r'\{[^}]*\}|;[^\n]*', ' ', text)
+    while True:
+        stripped = re.sub(r'\([^()]*\)', ' ', text)
+        if stripped == text:
+            break
+        text = stripped
+    return sum(1 for token in text.replace('.', '. ').split() if not NON_MOVE_TOKEN.match(token))
+
+
+class EtaTracker:
+    """Live ETA from the plies analyzed so far."""
+
+    def __init__(self, total_plies):
+        self.total_plies = total_plies
+        self.done_plies = 0
+        self.started = time.perf_counter()
+
+    def skip(self, plies):
+        """Plies that will not be analyzed in this run (e.g. resumed games)."""
+        if self.total_plies is not None:
+            self.total_plies = max(0, self.total_plies - plies)
+
+    def advance(self, plies):
+        self.done_plies += plies
+
+    def plies_per_second(self):
+        elapsed = time.perf_counter() - self.started
+        return self.done_plies / elapsed if elapsed > 0 and self.done_plies else None
+
+    def eta_seconds(self):
+        rate = self.plies_per_second()
+        if rate is None or self.total_plies is None:
+            return None
+        return max(0, self.total_plies - self.done_plies) / rate
+
+
+def format_duration(seconds):
+    """m:ss (or h:mm:ss) for the progress line."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
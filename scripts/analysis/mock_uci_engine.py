@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Mock UCI Engine
+===============
+
+Scripted stand-in for Stockfish used by scripts/benchmark-analysis.py, so the
+analyzer's own (Python-side) cost can be measured deterministically on any
+machine without an engine installed.
+
+Speaks enough UCI for both engine backends of analyze-pgn.py (uci, isready,
+setoption, ucinewgame, position, go depth, d, quit). Every search answers
+with a canned score: checkmate is mate 0, stalemate and insufficient material
+are 0, anything else is the material balance plus a fixed per-position offset
+(hash of the position and depth), so repeated runs give identical output.
+
+Environment:
+    MOCK_UCI_LATENCY_MS   sleep this long per search (default: 0)
+    MOCK_UCI_STATS        append {"searches": N, "busySeconds": S} to this file on quit
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import chess
+
+PIECE_VALUES = {chess.PAWN: 100, chess.KNIGHT: 300, chess.BISHOP: 310, chess.ROOK: 500, chess.QUEEN: 900, chess.KING: 0}
+
+DEFAULT_DEPTH = 15
+
+
+def canned_score(board, depth):
+    """(score type, value) from the side to move's perspective, as UCI reports it."""
+    if board.is_checkmate():
+        return 'mate', 0
+    if board.is_stalemate() or board.is_insufficient_material():
+        return 'cp', 0
+
+    material = 0
+    for piece in board.piece_map().values():
+        value = PIECE_VALUES[piece.piece_type]
+        material += value if piece.color == chess.WHITE else -value
+
+    digest = hashlib.blake2b(f"{board.board_fen()} {board.turn} {depth}".encode(), digest_size=4).digest()
+    cp = material + int.from_bytes(digest, 'big') % 201 - 100
+    return 'cp', cp if board.turn == chess.WHITE else -cp
+
+
+def set_position(tokens):
+    """Board for a `position startpos|fen ... [moves ...]` command."""
+    if 'moves' in tokens:
+        split = tokens.index('moves')
+        setup, moves = tokens[:split], tokens[split + 1:]
+    else:
+        setup, moves = tokens, []
+
+    board = chess.Board() if setup[0] == 'startpos' else chess.Board(' '.join(setup[1:]))
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+def main():
+    latency = float(os.environ.get('MOCK_UCI_LATENCY_MS', '0')) / 1000
+    stats_path = os.environ.get('MOCK_UCI_STATS')
+
+    board = chess.Board()
+    searches = 0
+    busy = 0.0
+
+    def send(text):
+        sys.stdout.write(text + '\n')
+        sys.stdout.flush()
+
+    for line in sys.stdin:
+        tokens = line.split()
+        if not tokens:
+            continue
+        command = tokens[0]
+
+        if command == 'uci':
+            send('id name MockUCI 1.0')
+            send('id author fide-worldcup-stats')
+            send('option name Threads type spin default 1 min 1 max 1024')
+            send('option name Hash type spin default 16 min 1 max 33554432')
+            send('uciok')
+        elif command == 'isready':
+            send('readyok')
+        elif command == 'position':
+            board = set_position(tokens[1:])
+        elif command == 'go':
+            started = time.perf_counter()
+            depth = int(tokens[tokens.index('depth') + 1]) if 'depth' in tokens else DEFAULT_DEPTH
+            if latency:
+                time.sleep(latency)
+            score_type, value = canned_score(board, depth)
+            best = next(iter(board.legal_moves), None)
+            pv = f' pv {best.uci()}' if best else ''
+            send(f'info depth {depth} seldepth {depth} multipv 1 score {score_type} {value} nodes 1 nps 1 time 0{pv}')
+            send(f'bestmove {best.uci() if best else "(none)"}')
+            searches += 1
+            busy += time.perf_counter() - started
+        elif command == 'd':
+            # The stockfish wrapper reads the FEN and checkers back from `d`
+            send(f'Fen: {board.fen()}')
+            send('Checkers: ' + ' '.join(chess.square_name(square) for square in board.checkers()))
+        elif command == 'quit':
+            break
+        # setoption, ucinewgame and stop need no answer
+
+    if stats_path:
+        with open(stats_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'searches': searches, 'busySeconds': busy}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
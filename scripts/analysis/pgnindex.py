@@ -0,0 +1,178 @@
+"""
+PGN Game Index
+==============
+
+Byte-offset index over PGN files, so analyze-pgn.py --pgn FILE... can count,
+shard, resume and pick games without parsing the games before them.
+
+Each input file is memory-mapped and scanned once for game boundaries (a
+header block following movetext or the start of the file). For every game the
+index records its byte offset and length, the header fields analysis jobs
+need and its mainline ply count (see metrics.count_plies). The index is kept
+in a sidecar in an index directory (.cache/pgn-index/ for analyze-pgn.py),
+not next to the file, so input trees such as the downloaded _SRC/cup2025 are
+left untouched. Sidecars are named after the file's absolute path
+(<path hash>-games.pgn.idx.json) and rebuilt when the file's size or
+modification time changes.
+
+Sidecar layout (JSON, one row per game in file order):
+
+    {
+        "version": 2, "path": "/abs/path/games.pgn",
+        "size": 123456, "mtimeNs": 1731600000000000000,
+        "fields": ["offset", "length", "plies", "white", "black",
+                   "whiteRating", "blackRating", "result", "gameId"],
+        "games": [[0, 2211, 135, "Sindarov, Javokhir", ...], ...]
+    }
+
+A game's text is read back with game_text(), through one cached mmap per file
+and process (pool workers read their games themselves).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+
+from .metrics import count_plies
+
+VERSION = 2
+
+FIELDS = ('offset', 'length', 'plies', 'white', 'black', 'whiteRating', 'blackRating', 'result', 'gameId')
+
+HEADER_LINE = re.compile(rb'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+
+# Memory maps of the files games were read from, per process
+_maps = {}
+
+
+def header_rating(value):
+    """Rating from a WhiteElo/BlackElo header value (None if missing or invalid)."""
+    try:
+        rating = int(value or 0)
+    except (ValueError, TypeError):
+        return None
+    return rating if rating > 0 else None
+
+
+def header_game_id(headers):
+    """gameId of a game: its GameId header, or the last part of its Site URL."""
+    game_id = headers.get('GameId')
+    if not game_id:
+        site = headers.get('Site', '')
+        game_id = site.split('/')[-1] if site else None
+    return game_id
+
+
+def sidecar_path(path, index_dir):
+    """Sidecar of a PGN file's index in index_dir, named after the file's absolute path."""
+    path = os.path.abspath(path)
+    digest = hashlib.blake2b(path.encode(), digest_size=8).hexdigest()
+    return os.path.join(index_dir, f'{digest}-{os.path.basename(path)}.idx.json')
+
+
+def scan_games(data):
+    """(offset, length) of every game in a memory-mapped PGN file."""
+    starts = []
+    in_headers = False
+    offset = 0
+    data.seek(0)
+    for line in iter(data.readline, b''):
+        stripped = line.strip()
+        if HEADER_LINE.match(stripped):
+            if not in_headers:
+                starts.append(offset)
+                in_headers = True
+        elif stripped and not stripped.startswith(b'%'):
+            in_headers = False
+        offset += len(line)
+    ends = starts[1:] + [len(data)]
+    return [(start, end - start) for start, end in zip(starts, ends)]
+
+
+def index_game(text):
+    """Index row fields of one game's PGN text (everything but offset/length)."""
+    headers = {}
+    lines = text.split(b'\n')
+    body_start = 0
+    for number, line in enumerate(lines):
+        match = HEADER_LINE.match(line.strip())
+        if match:
+            headers[match.group(1).decode('utf-8', 'replace')] = \
+                re.sub(rb'\\(.)', rb'\1', match.group(2)).decode('utf-8', 'replace')
+            body_start = number + 1
+        elif line.strip():
+            break
+    movetext = b'\n'.join(lines[body_start:]).decode('utf-8', 'replace')
+    return {
+        'plies': count_plies(movetext),
+        'white': headers.get('White', 'Unknown'),
+        'black': headers.get('Black', 'Unknown'),
+        'whiteRating': header_rating(headers.get('WhiteElo')),
+        'blackRating': header_rating(headers.get('BlackElo')),
+        'result': headers.get('Result'),
+        'gameId': header_game_id(headers)
+    }
+
+
+def build_index(path):
+    """Scan a PGN file into a list of game dicts (FIELDS keys)."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            games = []
+            for offset, length in scan_games(data):
+                games.append({'offset': offset, 'length': length, **index_game(data[offset:offset + length])})
+            return games
+
+
+def load_index(path, index_dir):
+    """
+    Game index of a PGN file, from its sidecar in index_dir when it is
+    current, otherwise rebuilt (and the sidecar rewritten, if index_dir is
+    writable).
+    """
+    stat = os.stat(path)
+    sidecar = sidecar_path(path, index_dir)
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if (saved.get('version') == VERSION and saved.get('path') == os.path.abspath(path)
+                and saved.get('size') == stat.st_size and saved.get('mtimeNs') == stat.st_mtime_ns
+                and saved.get('fields') == list(FIELDS)):
+            return [dict(zip(FIELDS, row)) for row in saved['games']]
+    except (OSError, ValueError):
+        pass
+
+    games = build_index(path)
+    try:
+        os.makedirs(index_dir, exist_ok=True)
+        temp_path = sidecar + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': VERSION,
+                'path': os.path.abspath(path),
+                'size': stat.st_size,
+                'mtimeNs': stat.st_mtime_ns,
+                'fields': list(FIELDS),
+                'games': [[game[field] for field in FIELDS] for game in games]
+            }, f, separators=(',', ':'))
+        os.replace(temp_path, sidecar)
+    except OSError:
+        pass  # Read-only index directory: the index only lives for this run
+    return games
+
+
+def game_text(path, offset, length):
+    """
+    PGN text of one indexed game, with \n line endings as a text-mode read
+    gives: python-chess takes a single whitespace character after [%emt, so
+    a CRLF inside the comment would hide the annotation.
+    """
+    data = _maps.get(path)
+    if data is None:
+        with open(path, 'rb') as f:
+            data = _maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return data[offset:offset + length].decode('utf-8', 'replace').replace('\r\n', '\n')
@@ -0,0 +1,121 @@
+"""
+Analysis Pipeline
+=================
+
+Overlaps game preparation (PGN parsing, board replay, FEN and SAN generation)
+with engine search, so the engines do not sit idle while Python gets the next
+positions ready.
+
+A PipelineStage consumes an iterator of prepared items (e.g. replayed games or
+position batches) in a producer thread and hands them to the consumer through a
+bounded queue. The producer blocks once the queue is full, so preparation never
+runs more than `maxsize` items ahead of the engines and memory stays bounded.
+Engine searches run in Stockfish processes and python-chess waits on their
+pipes without holding the GIL, so the producer really runs alongside them.
+
+The producer thread only starts when the first item is requested. By then a
+worker pool consuming the stage has already forked its processes, so no
+process is forked while the producer thread is running.
+
+Each stage records how long either side waited (see Metrics.stage):
+
+    items                 items passed through the queue
+    queueSize             maxsize of the queue
+    consumerWaitSeconds   consumer (engine side) waiting for a prepared item:
+                          preparation is the bottleneck
+    producerWaitSeconds   producer waiting for room in the full queue: the
+                          engines are the bottleneck (the normal case)
+"""
+
+import queue
+import threading
+import time
+
+# How often a blocked producer checks whether the consumer has gone away
+PUT_POLL_SECONDS = 0.1
+
+# How long closing a stage waits for its producer to notice (it may be blocked reading input)
+CLOSE_TIMEOUT_SECONDS = 1.0
+
+_DONE = object()
+
+
+class _Failure:
+    """An exception raised by the producer, re-raised in the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class PipelineStage:
+    """Iterate `items` in a producer thread, through a queue of at most `maxsize` items."""
+
+    def __init__(self, name, items, maxsize, metrics=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.metrics = metrics
+        self.items = 0
+        self.consumer_wait = 0.0
+        self.producer_wait = 0.0
+        self._source = items
+        self._queue = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._thread = None
+
+    def _produce(self):
+        try:
+            for item in self._source:
+                if not self._put(item):
+                    return
+            self._put(_DONE)
+        except BaseException as e:
+            self._put(_Failure(e))
+
+    def _put(self, item):
+        """Queue an item, waiting for room; False if the consumer closed the stage meanwhile."""
+        started = time.perf_counter()
+        try:
+            while not self._closed.is_set():
+                try:
+                    self._queue.put(item, timeout=PUT_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.producer_wait += time.perf_counter() - started
+
+    def __iter__(self):
+        self._thread = threading.Thread(target=self._produce, name=f'pipeline-{self.name}', daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                started = time.perf_counter()
+                item = self._queue.get()
+                self.consumer_wait += time.perf_counter() - started
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                self.items += 1
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the producer (if still running) and record this stage's wait times."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(CLOSE_TIMEOUT_SECONDS)
+        if self.metrics is not None:
+            self.metrics.stage(self.name, self.stats())
+
+    def stats(self):
+        return {
+            'items': self.items,
+            'queueSize': self.maxsize,
+            'consumerWaitSeconds': self.consumer_wait,
+            'producerWaitSeconds': self.producer_wait
+        }
@@ -0,0 +1,208 @@
+"""
+Per-Ply Evaluation File
+=======================
+
+Compact binary home for the per-ply `moveTimes` records of an analysis run
+(analyze-pgn.py --ply-file), so the analysis JSON only carries per-game and
+summary fields. Read back with read_ply_file() here or with
+scripts/utils/analysis-reader.js, which loads one game's plies at a time.
+
+Layout (little-endian, every array starts on a multiple of its item size):
+
+    header      magic b'PLYS', uint16 version, uint16 reserved,
+                uint32 gameCount, uint32 plyCount                  (16 bytes)
+    gameIndex   int32[gameCount]       games in gameIndex order
+    plyStart    uint32[gameCount + 1]  first ply row of each game (+ end)
+    sanStart    uint32[plyCount + 1]   byte offset of each SAN in the blob
+    clock       int32[plyCount]        clock left after the move ([%clk]), in
+                                       milliseconds; -1 if not annotated
+    elapsed     int32[plyCount]        time spent on the move ([%emt]), in
+                                       milliseconds; -1 if not annotated
+    ply         uint16[plyCount]       ply number (1 = White's first move)
+    evalBefore  int16[plyCount]        centipawns, White's perspective
+    evalAfter   int16[plyCount]
+    san         UTF-8 bytes            SAN of every ply, back to back
+
+moveNumber and color are derived from the ply number, exactly as analyze_game
+computes them. Evaluations are stored in centipawns (the JSON stores pawns);
+mate scores are already folded to +/-(10000 - N * 10) cp, so they fit int16.
+Clock times are read back as seconds (clockRemaining / timeSpent).
+
+Version 1 files (no clock and elapsed sections) are still read, with no clock
+times.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+MAGIC = b'PLYS'
+VERSION = 2
+HEADER_SIZE = 16
+
+INT16_LIMIT = 32767
+
+# Stored for clock times that were not annotated
+NO_CLOCK = -1
+
+
+def ply_file_path(json_path):
+    """Default ply file next to an analysis JSON (round-1-analysis.json -> round-1-analysis.plies.bin)."""
+    root, _ = os.path.splitext(json_path)
+    return root + '.plies.bin'
+
+
+def ply_file_reference(ply_path, json_path):
+    """plyFile of an analysis JSON: the ply file's path relative to the JSON's directory, where readers resolve it."""
+    return os.path.relpath(ply_path, os.path.dirname(os.path.abspath(json_path))).replace(os.sep, '/')
+
+
+class PlyFileWriter:
+    """
+    Writes a ply file from the moveTimes of each game, added in any order.
+
+    add() converts a game's plies to their column values right away and
+    appends them to one spool file per column, so a --stream run keeps only a
+    few numbers per game in memory, not its records. close() writes the ply
+    file with the games put in gameIndex order.
+    """
+
+    # Per-ply columns spooled by add(): (spool name, dtype)
+    COLUMNS = (('sanLength', '<u4'), ('clock', '<i4'), ('elapsed', '<i4'), ('ply', '<u2'),
+               ('evalBefore', '<i2'), ('evalAfter', '<i2'))
+
+    def __init__(self, path):
+        self.path = path
+        self._spools = {name: tempfile.TemporaryFile() for name, _ in self.COLUMNS + (('san', None),)}
+        self._ply_count = 0
+        self._san_size = 0
+        # gameIndex -> (first ply row, ply count, first SAN byte, SAN bytes) in the spools
+        self._games = {}
+
+    def add(self, game_index, move_times):
+        sans = [move['move'].encode('utf-8') for move in move_times]
+
+        def centipawns(key):
+            values = np.rint([move[key] * 100 for move in move_times])
+            return np.clip(values, -INT16_LIMIT, INT16_LIMIT)
+
+        def milliseconds(key):
+            return [NO_CLOCK if move.get(key) is None else round(move[key] * 1000) for move in move_times]
+
+        columns = {
+            'sanLength': [len(san) for san in sans],
+            'clock': milliseconds('clockRemaining'),
+            'elapsed': milliseconds('timeSpent'),
+            'ply': [move['ply'] for move in move_times],
+            'evalBefore': centipawns('evalBefore'),
+            'evalAfter': centipawns('evalAfter'),
+        }
+        for name, dtype in self.COLUMNS:
+            self._spools[name].write(np.asarray(columns[name], dtype=dtype).tobytes())
+        san_bytes = b''.join(sans)
+        self._spools['san'].write(san_bytes)
+
+        self._games[game_index] = (self._ply_count, len(move_times), self._san_size, len(san_bytes))
+        self._ply_count += len(move_times)
+        self._san_size += len(san_bytes)
+
+    def _column(self, name, dtype, game_indexes):
+        """A spooled column's rows, game by game in the given order (as bytes)."""
+        spool = self._spools[name]
+        item_size = np.dtype(dtype).itemsize
+        for game_index in game_indexes:
+            first_row, count, _, _ = self._games[game_index]
+            spool.seek(first_row * item_size)
+            yield spool.read(count * item_size)
+
+    def close(self):
+        game_indexes = sorted(self._games)
+        ply_count = sum(self._games[game_index][1] for game_index in game_indexes)
+
+        ply_start = np.zeros(len(game_indexes) + 1, dtype='<u4')
+        ply_start[1:] = np.cumsum([self._games[game_index][1] for game_index in game_indexes])
+
+        san_lengths = np.frombuffer(b''.join(self._column('sanLength', '<u4', game_indexes)), dtype='<u4')
+        san_start = np.zeros(ply_count + 1, dtype='<u4')
+        san_start[1:] = np.cumsum(san_lengths)
+
+        header = MAGIC + np.array([VERSION, 0], dtype='<u2').tobytes() + \
+            np.array([len(game_indexes), ply_count], dtype='<u4').tobytes()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'wb') as f:
+            f.write(header)
+            f.write(np.asarray(game_indexes, dtype='<i4').tobytes())
+            f.write(ply_start.tobytes())
+            f.write(san_start.tobytes())
+            for name, dtype in self.COLUMNS[1:]:
+                for rows in self._column(name, dtype, game_indexes):
+                    f.write(rows)
+            san_spool = self._spools['san']
+            for game_index in game_indexes:
+                _, _, san_offset, san_size = self._games[game_index]
+                san_spool.seek(san_offset)
+                f.write(san_spool.read(san_size))
+
+        for spool in self._spools.values():
+            spool.close()
+
+
+def _seconds(milliseconds):
+    """Stored clock time back in seconds as analyze_game writes it (whole seconds as int), or None."""
+    if milliseconds == NO_CLOCK:
+        return None
+    return milliseconds // 1000 if milliseconds % 1000 == 0 else milliseconds / 1000
+
+
+def read_ply_file(path):
+    """Read a whole ply file back into {gameIndex: moveTimes list}."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a ply file")
+    version = int(np.frombuffer(data, dtype='<u2', count=1, offset=4)[0])
+    if version not in (1, VERSION):
+        raise ValueError(f"{path} has unsupported ply file version {version}")
+    game_count, ply_count = (int(n) for n in np.frombuffer(data, dtype='<u4', count=2, offset=8))
+
+    offset = HEADER_SIZE
+
+    def section(dtype, count):
+        nonlocal offset
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += values.nbytes
+        return values
+
+    game_indexes = section('<i4', game_count)
+    ply_start = section('<u4', game_count + 1)
+    san_start = section('<u4', ply_count + 1)
+    if version >= 2:
+        clocks = section('<i4', ply_count)
+        elapsed = section('<i4', ply_count)
+    else:
+        clocks = elapsed = np.full(ply_count, NO_CLOCK, dtype='<i4')
+    ply_numbers = section('<u2', ply_count)
+    evals_before = section('<i2', ply_count)
+    evals_after = section('<i2', ply_count)
+    sans = data[offset:]
+
+    games = {}
+    for game, game_index in enumerate(game_indexes):
+        move_times = []
+        for row in range(ply_start[game], ply_start[game + 1]):
+            ply = int(ply_numbers[row])
+            move_times.append({
+                'ply': ply,
+                'moveNumber': (ply - 1) // 2 + 1,
+                'color': 'white' if (ply - 1) % 2 == 0 else 'black',
+                'move': sans[san_start[row]:san_start[row + 1]].decode('utf-8'),
+                'evalBefore': int(evals_before[row]) / 100.0,
+                'evalAfter': int(evals_after[row]) / 100.0,
+                'clockRemaining': _seconds(int(clocks[row])),
+                'timeSpent': _seconds(int(elapsed[row]))
+            })
+        games[int(game_index)] = move_times
+    return games
@@ -0,0 +1,89 @@
+"""
+Engine-Free Position Resolution
+===============================
+
+Positions whose evaluation is already known without a search:
+
+    terminal     checkmate (mate 0, as the engine reports it), stalemate and
+                 insufficient material (cp 0)
+    tablebase    few-piece positions found in local Syzygy tables
+                 (analyze-pgn.py --syzygy DIR)
+    forced       a single legal move: the position is worth what the position
+                 after that move is worth (see forced_reply_evaluation)
+
+Evaluations use the engine format: {'type': 'cp'|'mate', 'value': int} from
+White's perspective.
+"""
+
+import chess
+import chess.syzygy
+
+# Syzygy tables exist for at most 7 pieces (kings included)
+SYZYGY_MAX_PIECES = 7
+
+# Tablebase wins are scored as a large centipawn advantage below the mate range
+# (mate-in-N maps to 10000 - N * 10), minus the distance to zeroing so faster
+# conversions score higher
+TABLEBASE_WIN_CP = 5000
+
+
+def open_tablebase(path):
+    """Open the Syzygy tables in a directory (None if no path is given)."""
+    if not path:
+        return None
+    return chess.syzygy.open_tablebase(path)
+
+
+def resolve_position(board, tablebase=None):
+    """
+    Evaluate a position without an engine, if possible.
+
+    Returns an evaluation dict for terminal positions and (with a tablebase)
+    for tablebase positions, or None when the position needs a search.
+    """
+    if board.is_checkmate():
+        return {'type': 'mate', 'value': 0}
+    if board.is_stalemate() or board.is_insufficient_material():
+        return {'type': 'cp', 'value': 0}
+
+    if tablebase is None or chess.popcount(board.occupied) > SYZYGY_MAX_PIECES or board.castling_rights:
+        return None
+
+    wdl = tablebase.get_wdl(board)
+    if wdl is None:
+        return None
+    if abs(wdl) < 2:
+        # Draws, and cursed wins / blessed losses (drawn by the fifty-move rule)
+        return {'type': 'cp', 'value': 0}
+
+    dtz = tablebase.get_dtz(board)
+    cp = TABLEBASE_WIN_CP - min(abs(dtz), 1000) if dtz is not None else TABLEBASE_WIN_CP
+    if (wdl > 0) != (board.turn == chess.WHITE):
+        cp = -cp
+    return {'type': 'cp', 'value': cp}
+
+
+def has_single_legal_move(board):
+    """True if the side to move has exactly one legal move."""
+    legal_moves = iter(board.legal_moves)
+    return next(legal_moves, None) is not None and next(legal_moves, None) is None
+
+
+def forced_reply_evaluation(evaluation, white_to_move):
+    """
+    Evaluation of a position with a single legal move, given the evaluation of
+    the position after it (both from White's perspective).
+
+    Centipawn scores carry over. A mate for the side making the forced move is
+    one move further away; a mate for the opponent is unchanged.
+    """
+    if evaluation['type'] != 'mate':
+        return evaluation
+
+    mate_in = evaluation['value']
+    if mate_in == 0:
+        # The forced move gives mate
+        return {'type': 'mate', 'value': 1 if white_to_move else -1}
+    if (mate_in > 0) == white_to_move:
+        return {'type': 'mate', 'value': mate_in + 1 if mate_in > 0 else mate_in - 1}
+    return evaluation
@@ -0,0 +1,110 @@
+"""
+Game Result Cache
+=================
+
+SQLite-backed store of finished game analyses (the analyze_game result), so
+re-running a round only sends new or changed games to the engine
+(analyze-pgn.py --changed-only).
+
+Results are content-addressed: the key hashes everything the analysis of a
+game depends on, and nothing else:
+
+    analyzer    ANALYZER_VERSION (bumped whenever scoring changes)
+    engine      engine identity (UCI "id name")
+    settings    depth, sample rate, coarse depth, tablebases, windowed accuracy
+    game        starting position, UCI mainline moves, their clock annotations
+                ([%clk] / [%emt], copied to moveTimes) and result (the result
+                decides the comeback check)
+
+Player names, dates and other headers are not part of the key, so a corrected
+header does not cause a re-analysis; a corrected move, clock or result does.
+
+Exact duplicates (same headers and moves, e.g. from concatenating overlapping
+PGN files) are recognized by duplicate_key().
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+# Bump when analyze_game's output changes for the same evaluations
+ANALYZER_VERSION = 3
+
+# Settings that change a game's analysis
+KEY_SETTINGS = ('depth', 'sampleRate', 'coarseDepth', 'syzygyPath', 'windowedAccuracy')
+
+
+def game_fingerprint(game):
+    """(starting FEN, UCI mainline moves, clock annotations, headers) of a parsed or move-list game."""
+    moves = []
+    clocks = []
+    for node in game.mainline():
+        moves.append(node.move.uci())
+        clocks.append((node.clock(), node.emt()))
+    return game.board().fen(), moves, clocks, dict(game.headers)
+
+
+def _digest(value):
+    return hashlib.blake2b(json.dumps(value, separators=(',', ':')).encode(), digest_size=16).hexdigest()
+
+
+def result_key(fingerprint, settings):
+    """Content key of a game's analysis under the given run settings."""
+    fen, moves, clocks, headers = fingerprint
+    key_settings = {name: settings.get(name) for name in KEY_SETTINGS}
+    # Only whether tablebases are used matters, not where they live
+    key_settings['syzygyPath'] = bool(key_settings['syzygyPath'])
+    return _digest([ANALYZER_VERSION, settings['engineId'], key_settings, fen, moves, clocks,
+                    headers.get('Result', '*')])
+
+
+def duplicate_key(fingerprint):
+    """Key shared by exact duplicate games (every header, move and clock annotation equal)."""
+    fen, moves, clocks, headers = fingerprint
+    return _digest([sorted(headers.items()), fen, moves, clocks])
+
+
+class ResultCache:
+    """On-disk store of game analyses by result_key (zlib-compressed JSON)."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.hits = 0
+        self.stores = 0
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, '
+            'analysis BLOB NOT NULL, '
+            'stored INTEGER NOT NULL)'
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """The cached analysis dict for a result key, or None."""
+        row = self._conn.execute('SELECT analysis FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, analysis):
+        blob = zlib.compress(json.dumps(analysis, separators=(',', ':')).encode())
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO results (key, analysis, stored) VALUES (?, ?, ?)',
+                               (key, blob, time.time_ns()))
+        self.stores += 1
+
+    def entry_count(self):
+        return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,173 @@
+"""
+Round JSON Input
+================
+
+Analysis jobs straight from a consolidated or enriched round file
+(data/consolidated/round-N-matches.json, data/enriched/round-N-enriched.json),
+for analyze-pgn.py --round-json.
+
+Games are built from the moveList entries written by consolidate-pgns.js
+(from/to squares plus promotion), so no PGN text is parsed (and moveList has
+no clock annotations: these games get no clockRemaining / timeSpent). The file is read
+incrementally: only one match object is decoded at a time, and the other
+top-level fields (summary, openingStats, ...) are skipped.
+
+Every job keeps the match and game identifiers of the round file:
+
+    gameIndex   running index over matches[].gameDetails[] in file order (the
+                same numbering as generate-stats.js)
+    matchId     e.g. "round-5-match-1"
+    gameNumber  1-based position of the game within its match
+    gameId      "<matchId>-game-<gameNumber>"
+"""
+
+import json
+
+import chess
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+class RoundFileError(ValueError):
+    """The input is not a round file (no top-level matches array)."""
+
+
+class MoveListNode:
+    """Mainline node of a MoveListGame: its move, and no clock annotations."""
+
+    def __init__(self, move):
+        self.move = move
+
+    def clock(self):
+        return None
+
+    def emt(self):
+        return None
+
+
+class MoveListGame:
+    """
+    Just enough of chess.pgn.Game for the analyzer (board, mainline_moves,
+    mainline, headers), built from UCI moves. Small and cheap to send to pool
+    workers.
+    """
+
+    def __init__(self, ucis, headers):
+        self.ucis = tuple(ucis)
+        self.headers = headers
+
+    def board(self):
+        return chess.Board()
+
+    def mainline_moves(self):
+        return [chess.Move.from_uci(uci) for uci in self.ucis]
+
+    def mainline(self):
+        return [MoveListNode(move) for move in self.mainline_moves()]
+
+
+class _Reader:
+    """Incremental JSON value reader over a text stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        chunk = self.stream.read(size or CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character (without consuming it), or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise RoundFileError(f"expected {char!r} in round file, got {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value, reading more input as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value: at least double what is buffered before decoding again
+                if self.eof or not self._fill(max(CHUNK_SIZE, len(self.buffer) - self.pos)):
+                    raise
+                continue
+            # A number may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_matches(stream):
+    """Yield the match objects of a round file one at a time."""
+    reader = _Reader(stream)
+    reader.expect('{')
+    found = False
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key == 'matches':
+            found = True
+            reader.expect('[')
+            while reader.peek() != ']':
+                yield reader.value()
+                if reader.peek() == ',':
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            reader.value()  # Skipped (roundNumber, summary, openingStats, ...)
+        if reader.peek() == ',':
+            reader.expect(',')
+    if not found:
+        raise RoundFileError('round file has no "matches" array')
+
+
+def move_uci(move):
+    """UCI of a moveList entry (chess.js castling is already king from/to)."""
+    return move['from'] + move['to'] + (move.get('promotion') or '')
+
+
+def iter_round_jobs(stream):
+    """Read a round file and yield one analysis job per game, in gameIndex order."""
+    game_index = 0
+    for match in iter_matches(stream):
+        ratings = {player['name']: player.get('elo') or None for player in match.get('players', [])}
+        for number, game in enumerate(match.get('gameDetails', []), 1):
+            game_number = game.get('gameNumberInMatch', number)
+            move_list = game.get('moveList') or []
+            headers = {'White': game['white'], 'Black': game['black'], 'Result': game.get('result', '*')}
+            yield {
+                'gameIndex': game_index,
+                'gameId': f"{match['matchId']}-game-{game_number}",
+                'matchId': match['matchId'],
+                'gameNumber': game_number,
+                'white': game['white'],
+                'black': game['black'],
+                'whiteRating': ratings.get(game['white']),
+                'blackRating': ratings.get(game['black']),
+                'result': headers['Result'],
+                'moveCount': len(move_list),
+                'game': MoveListGame((move_uci(move) for move in move_list), headers)
+            }
+            game_index += 1
@@ -0,0 +1,251 @@
+"""
+Game Scoring
+============
+
+Vectorized per-game metrics over a game's evaluation vector: every sampled
+ply of a game is scored in one NumPy pass instead of one ply at a time.
+
+Input is one row per sampled ply (see ply_columns):
+
+    ply         0-based ply number (even = White's move)
+    cpBefore    evaluation before the move, centipawns from White's side,
+                mate scores folded to +/-(10000 - N * 10) (see eval_to_cp)
+    cpAfter     evaluation after the move
+    mateBefore  whether cpBefore is a folded mate score
+    mateAfter
+
+From it score_plies() derives Lichess win percentages, per-side win% losses,
+move quality buckets, capped ACPL, accuracy, engine moves, the biggest blunder
+(by severity) and the lucky escape. The engine loop only collects
+evaluations. Re-scoring an analysis, e.g. with other QUALITY_THRESHOLDS, needs
+nothing but its moveTimes (see move_times_columns).
+
+The optional windowed accuracy is Lichess' game accuracy (lila
+AccuracyPercent.gameAccuracy): each move's accuracy is weighted by the
+volatility (standard deviation of win%) of the window of positions around
+it, and the weighted mean is averaged with the harmonic mean. Like lila, the
+win% series starts from Lichess' fixed initial evaluation (Cp.initial), and it
+needs every ply scored (analyze-pgn.py rejects it with --sample > 1).
+
+Results match the former per-ply loop: sums run in ply order (np.add.accumulate,
+not the pairwise np.sum) and ties go to the earliest ply. Only unrounded
+values (a blunder's winLoss and severity) may differ in the last digit, where
+NumPy's exp and math.exp round differently.
+"""
+
+import math
+
+import numpy as np
+
+# Win% loss upper bounds of excellent, good, inaccuracies and mistakes; anything above is a blunder
+QUALITY_THRESHOLDS = (2, 5, 10, 20)
+
+# Move quality buckets, best first (index = thresholds a win% loss reaches)
+QUALITIES = ('excellent', 'good', 'inaccuracies', 'mistakes', 'blunders')
+BLUNDER = QUALITIES.index('blunders')
+
+# Win% loss above the last threshold is only a blunder if the position was not decided yet
+DECIDED_WIN_PERCENT = 10
+
+# Per-move centipawn losses are capped here before averaging (ACPL reflects typical play, not the worst blunders)
+MAX_CP_LOSS_FOR_ACPL = 150
+
+# Lichess clamps evaluations to +/-10 pawns before windowed accuracy
+WINDOWED_CP_CEILING = 1000
+
+# lila Cp.initial: the windowed accuracy's win% series starts from it, not from the engine's first evaluation
+WINDOWED_INITIAL_CP = 15
+
+# Folded mate scores are +/-(MATE_SCORE - N * 10), see eval_to_cp in analyze-pgn.py
+MATE_SCORE = 10000
+MATE_STEP = 10
+
+# moveTimes only keep centipawns: folded scores of mates within this many moves are read back as mates
+MAX_MATE_MOVES = 100
+
+# Lucky escape: the opponent had at least this advantage and let it fall back to at most NEUTRAL_CP
+ESCAPE_ADVANTAGE_CP = 200
+ESCAPE_NEUTRAL_CP = 50
+
+
+def win_percentages(cp):
+    """
+    Lichess win percentage of centipawn evaluations (White's side).
+    https://lichess.org/page/accuracy
+    """
+    return 50 + 50 * (2 / (1 + np.exp(-0.00368208 * np.asarray(cp, dtype=float))) - 1)
+
+
+def accuracy_from_win_losses(win_losses):
+    """Lichess accuracy (0-100) from the mean win% loss of a side's moves; 100 without moves."""
+    if not len(win_losses):
+        return 100
+    average = sequential_sum(win_losses) / len(win_losses)
+    return max(0, min(100, 103.1668 * math.exp(-0.04354 * average) - 3.1669))
+
+
+def sequential_sum(values):
+    """Sum in order, like the builtin sum (np.sum adds pairwise and may differ in the last bits)."""
+    return float(np.add.accumulate(values)[-1]) if len(values) else 0
+
+
+def mover_win_losses(columns, win_before, win_after):
+    """Win% lost by the mover on each scored ply (Black's win% is 100 - White's)."""
+    white = columns['ply'] % 2 == 0
+    return np.maximum(0, np.where(white, win_before - win_after, (100 - win_before) - (100 - win_after)))
+
+
+def ply_columns(plies, cp_before, cp_after, mate_before, mate_after):
+    """Score input columns of one game (see the module docstring)."""
+    return {
+        'ply': np.asarray(plies, dtype=np.int64),
+        'cpBefore': np.asarray(cp_before, dtype=np.int64),
+        'cpAfter': np.asarray(cp_after, dtype=np.int64),
+        'mateBefore': np.asarray(mate_before, dtype=bool),
+        'mateAfter': np.asarray(mate_after, dtype=bool)
+    }
+
+
+def folded_mates(cp):
+    """Which centipawn values are folded mate scores (mate in at most MAX_MATE_MOVES)."""
+    distance = MATE_SCORE - np.abs(cp)
+    return (distance >= 0) & (distance <= MAX_MATE_MOVES * MATE_STEP) & (distance % MATE_STEP == 0)
+
+
+def move_times_columns(move_times):
+    """Score input columns from a game's moveTimes records (pawns, as written to the analysis JSON)."""
+    cp_before = np.rint([move['evalBefore'] * 100 for move in move_times]).astype(np.int64)
+    cp_after = np.rint([move['evalAfter'] * 100 for move in move_times]).astype(np.int64)
+    return ply_columns([move['ply'] - 1 for move in move_times], cp_before, cp_after,
+                       folded_mates(cp_before), folded_mates(cp_after))
+
+
+def windowed_accuracies(cp_after, white):
+    """
+    Lichess volatility-weighted windowed game accuracy of White and Black
+    (None for a side without moves), from the evaluation after every ply.
+
+    As in lila, the win% series is Cp.initial followed by the position after
+    each ply, and each move is scored from its two neighbours in the series.
+    """
+    moves = len(cp_after)
+    if not moves:
+        return [None, None]
+    cps = np.concatenate(([WINDOWED_INITIAL_CP], cp_after))
+    series = win_percentages(np.clip(cps, -WINDOWED_CP_CEILING, WINDOWED_CP_CEILING))
+    win_before = series[:-1]
+    win_after = series[1:]
+    window = min(max(moves // 10, 2), 8)
+    # The first windows repeat the opening window, so there is one window (and weight) per move
+    starts = np.concatenate((np.zeros(window - 2, dtype=np.int64), np.arange(len(series) - window + 1)))
+    windows = np.lib.stride_tricks.sliding_window_view(series, window)[starts]
+    weights = np.clip(windows.std(axis=1), 0.5, 12)
+
+    # Per-move accuracy from the mover's win% before and after (Lichess adds 1 for analysis uncertainty)
+    mover_before = np.where(white, win_before, 100 - win_before)
+    mover_after = np.where(white, win_after, 100 - win_after)
+    raw = 103.1668100711649 * np.exp(-0.04354415386753951 * (mover_before - mover_after)) - 3.166924740191411 + 1
+    accuracies = np.where(mover_after >= mover_before, 100, np.clip(raw, 0, 100))
+
+    results = []
+    for side in (white, ~white):
+        if not side.any():
+            results.append(None)
+            continue
+        weighted = (accuracies[side] * weights[side]).sum() / weights[side].sum()
+        harmonic = side.sum() / (1 / np.maximum(accuracies[side], 1)).sum()
+        results.append(float((weighted + harmonic) / 2))
+    return results
+
+
+def first_max(values, candidates):
+    """Row of the largest value among candidate rows (earliest on ties), or None."""
+    rows = np.flatnonzero(candidates)
+    return int(rows[np.argmax(values[rows])]) if len(rows) else None
+
+
+def score_plies(columns, sans, thresholds=QUALITY_THRESHOLDS, windowed_accuracy=False):
+    """
+    Per-game metrics of one game from its score input columns and the SAN of
+    each scored ply, as the analysis record fields whiteACPL ... luckyEscape
+    (without biggestComeback and moveTimes), plus whiteWindowedAccuracy and
+    blackWindowedAccuracy with windowed_accuracy.
+    """
+    plies = columns['ply']
+    cp_before = columns['cpBefore']
+    cp_after = columns['cpAfter']
+    both_cp = ~columns['mateBefore'] & ~columns['mateAfter']
+    white = plies % 2 == 0
+    move_numbers = plies // 2 + 1
+
+    win_before = win_percentages(cp_before)
+    win_after = win_percentages(cp_after)
+
+    # Win% and centipawn loss from the mover's side
+    win_losses = mover_win_losses(columns, win_before, win_after)
+    cp_losses = np.maximum(0, np.where(white, cp_before - cp_after, cp_after - cp_before))
+
+    quality = np.searchsorted(np.asarray(thresholds, dtype=float), win_losses, side='right')
+    # Losing a decided position is a mistake at most
+    decided = (win_before <= DECIDED_WIN_PERCENT) | (win_before >= 100 - DECIDED_WIN_PERCENT)
+    quality = np.where((quality == BLUNDER) & decided, BLUNDER - 1, quality)
+
+    fields = {}
+    for side, mask in (('white', white), ('black', ~white)):
+        losses = np.minimum(cp_losses[mask & both_cp], MAX_CP_LOSS_FOR_ACPL)
+        fields[f'{side}ACPL'] = round(sequential_sum(losses) / len(losses), 1) if len(losses) else 0
+    for side, mask in (('white', white), ('black', ~white)):
+        fields[f'{side}Accuracy'] = round(accuracy_from_win_losses(win_losses[mask]), 1)
+    if windowed_accuracy:
+        for side, accuracy in zip(('white', 'black'), windowed_accuracies(cp_after, white)):
+            fields[f'{side}WindowedAccuracy'] = round(accuracy, 1) if accuracy is not None else None
+    for side, mask in (('white', white), ('black', ~white)):
+        counts = np.bincount(quality[mask], minlength=len(QUALITIES))
+        fields[f'{side}MoveQuality'] = {name: int(counts[QUALITIES.index(name)]) for name in reversed(QUALITIES)}
+    for side, mask in (('white', white), ('black', ~white)):
+        fields[f'{side}EngineMoves'] = int(np.count_nonzero(quality[mask] == 0))
+
+    # Blunder severity: win% loss, plus a penalty for allowing mate (sooner is worse),
+    # times up to 3x when the mover was clearly ahead (always 3x when they had a mate)
+    mover_before = np.where(white, cp_before, -cp_before)
+    mover_after = np.where(white, cp_after, -cp_after)
+    severity = win_losses + np.where(columns['mateAfter'], 100 / (np.abs(mover_after) + 1), 0)
+    margin = np.abs(mover_before)
+    multiplier = np.where(columns['mateBefore'], np.where(mover_before > 0, 3, 1),
+                          np.where(margin > 200, 1 + np.minimum(2, (margin - 200) / 400), 1))
+    severity = severity * multiplier
+
+    row = first_max(severity, quality == BLUNDER)
+    fields['biggestBlunder'] = None if row is None else {
+        'moveNumber': int(move_numbers[row]),
+        'player': 'white' if white[row] else 'black',
+        'cpLoss': int(cp_losses[row]) if both_cp[row] else 0,
+        'winLoss': float(win_losses[row]),
+        'severity': float(severity[row]),
+        'move': sans[row],
+        'evalBefore': int(cp_before[row]),
+        'evalAfter': int(cp_after[row])
+    }
+
+    # Lucky escape: the previous scored ply left one side clearly ahead and this one gave it back
+    # (the first ply has no previous one; its stand-in 0 never qualifies)
+    previous = np.concatenate(([0], cp_after[:-1]))
+    white_escapes = (previous < -ESCAPE_ADVANTAGE_CP) & (cp_after > -ESCAPE_NEUTRAL_CP)
+    black_escapes = (previous > ESCAPE_ADVANTAGE_CP) & (cp_after < ESCAPE_NEUTRAL_CP)
+    escape_amounts = np.abs(previous) - np.abs(cp_after)
+    row = first_max(escape_amounts, white_escapes | black_escapes)
+    fields['luckyEscape'] = None if row is None else {
+        'player': 'white' if white_escapes[row] else 'black',
+        'escapeAmount': int(escape_amounts[row]),
+        'evalBefore': int(previous[row]),
+        'evalAfter': int(cp_after[row]),
+        'moveNumber': int(move_numbers[row])
+    }
+    return fields
+
+
+def eval_extremes(columns):
+    """Rows of the lowest and highest evaluation after a scored ply (earliest on ties), or (None, None)."""
+    if not len(columns['cpAfter']):
+        return None, None
+    return int(np.argmin(columns['cpAfter'])), int(np.argmax(columns['cpAfter']))
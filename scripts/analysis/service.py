@@ -0,0 +1,137 @@
+"""
+Analysis Service
+================
+
+Localhost HTTP plumbing of `analyze-pgn.py serve`, a long-lived analyzer that
+keeps its engines (and their hash tables), cache connections and finished
+game results warm between requests, and of its thin clients
+(scripts/analysis-client.py, scripts/utils/analysis-service.js).
+
+Only the standard library is used here, so a client starts without loading
+python-chess or NumPy.
+
+Endpoints (JSON responses):
+
+    POST /analyze    body: PGN text, or the --json-input document
+                     ({"games": [{"pgn": ..., "gameIndex": ..., "white": ...}]})
+                     query: depth, sample (optional; must match the service)
+                     -> {"games": [...], "summary": {...}}, exactly what
+                        analyze-pgn.py prints for the same input and settings
+    GET  /status     settings, engine and request counters of the service
+    POST /shutdown   stop the service (engines are closed)
+
+Requests are handled one at a time: the parallelism is the service's engine
+pool. Errors are {"error": "..."} with a 4xx/5xx status.
+"""
+
+import http.server
+import json
+import sys
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8737
+DEFAULT_URL = f'http://{DEFAULT_HOST}:{DEFAULT_PORT}'
+
+# Largest request body accepted (a whole round of PGN is a few MB)
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+
+class ServiceError(Exception):
+    """A request the service rejected (or could not be reached), with its HTTP status."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server_version = 'analyze-pgn'
+
+    def do_GET(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/status':
+            self._respond(200, self.server.status())
+        else:
+            self._respond(404, {'error': f'no such endpoint: GET {path}'})
+
+    def do_POST(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/shutdown':
+            self._respond(200, {'status': 'stopping'})
+            # shutdown() waits for serve_forever(), which is waiting for this handler
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if url.path != '/analyze':
+            self._respond(404, {'error': f'no such endpoint: POST {url.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self._respond(413, {'error': f'request body over {MAX_BODY_BYTES} bytes'})
+            return
+        body = self.rfile.read(length).decode('utf-8', 'replace')
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            result = self.server.analyze(body, params)
+        except ServiceError as e:
+            self._respond(e.status, {'error': str(e)})
+        except Exception as e:
+            print(f"❌ Request failed: {e!r}", file=sys.stderr)
+            self._respond(500, {'error': f'analysis failed: {e!r}'})
+        else:
+            self._respond(200, result)
+
+    def _respond(self, status, payload):
+        data = json.dumps(payload, indent=2).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # The analyzer prints its own line per request
+
+
+class AnalysisServer(http.server.HTTPServer):
+    """
+    HTTP server of the analysis service. `analyze(body, params)` returns the
+    response of an /analyze request (or raises ServiceError); `status()` the
+    response of /status.
+    """
+
+    def __init__(self, host, port, analyze, status):
+        super().__init__((host, port), _Handler)
+        self.analyze = analyze
+        self.status = status
+
+
+def request(url, path, body=None, params=None, timeout=None):
+    """
+    Call the service at `url` (POST when there is a body or for /shutdown) and
+    return its decoded JSON response. Raises ServiceError when the service
+    rejects the request or cannot be reached.
+    """
+    target = url.rstrip('/') + path
+    if params:
+        target += '?' + urllib.parse.urlencode(params)
+    data = body.encode() if isinstance(body, str) else body
+    method = 'POST' if data is not None or path == '/shutdown' else 'GET'
+    http_request = urllib.request.Request(target, data=data, method=method,
+                                          headers={'Content-Type': 'text/plain; charset=utf-8'})
+    try:
+        with urllib.request.urlopen(http_request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e).get('error', e.reason)
+        except ValueError:
+            message = e.reason
+        raise ServiceError(message, e.code)
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, 'reason', e)
+        raise ServiceError(f'cannot reach the analysis service at {url}: {reason}', 503)
@@ -0,0 +1,94 @@
+"""
+Analysis Shards
+===============
+
+Splits one round across several analyze-pgn.py runs (--shard i/N) and merges
+their outputs back into a single analysis (analyze-pgn.py merge).
+
+Games are assigned to shards by ply count, not by position in the input: the
+longest game goes first, each game to the shard with the fewest plies so far
+(ties to the earlier game and the lower shard), so every shard gets about the
+same amount of engine work. The assignment only depends on the input, so every
+shard computes the same split independently.
+
+Each shard writes a normal analysis JSON with its own games (original
+gameIndex values) plus {"shard": {"index": i, "count": N}}. Merging restores
+gameIndex order and recomputes the summary from the game records, without an
+engine.
+"""
+
+import heapq
+
+from .awards import summarize
+
+
+class ShardError(Exception):
+    """Shard outputs that cannot be merged (missing, overlapping or mixed shards)."""
+
+
+def parse_shard(value):
+    """(index, count) of an `i/N` shard spec, 1 <= i <= N; ValueError otherwise."""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and N, got {value!r}")
+    return index, count
+
+
+def assign_shards(weights, count):
+    """
+    Shard (1..count) of every item, balancing the summed weights.
+
+    Greedy longest-first: items in decreasing weight order (ties in input
+    order) each go to the currently lightest shard (ties to the lowest shard).
+    """
+    shards = [None] * len(weights)
+    loads = [(0, shard) for shard in range(1, count + 1)]
+    for item in sorted(range(len(weights)), key=lambda item: (-weights[item], item)):
+        load, shard = heapq.heappop(loads)
+        shards[item] = shard
+        heapq.heappush(loads, (load + weights[item], shard))
+    return shards
+
+
+def select_shard(jobs, index, count):
+    """The jobs of shard `index` of `count` (weighted by moveCount), in input order."""
+    jobs = list(jobs)
+    shards = assign_shards([job['moveCount'] for job in jobs], count)
+    return [job for job, shard in zip(jobs, shards) if shard == index]
+
+
+def merge_outputs(outputs):
+    """
+    Merge shard analysis outputs into one {'games', 'summary'} analysis.
+
+    Raises ShardError if two outputs contain the same game, or if the outputs
+    carry shard info and do not cover every shard of one split exactly once.
+    """
+    shards = [output['shard'] for output in outputs if output.get('shard')]
+    if shards:
+        counts = {shard['count'] for shard in shards}
+        if len(counts) > 1 or len(shards) != len(outputs):
+            raise ShardError(f"outputs come from different splits: {sorted(counts)}")
+        count = counts.pop()
+        indexes = sorted(shard['index'] for shard in shards)
+        if indexes != list(range(1, count + 1)):
+            missing = sorted(set(range(1, count + 1)) - set(indexes))
+            duplicate = sorted({index for index in indexes if indexes.count(index) > 1})
+            raise ShardError(f"expected shards 1-{count} once each "
+                             f"(missing: {missing or 'none'}, duplicated: {duplicate or 'none'})")
+
+    games = {}
+    for output in outputs:
+        for record in output['games']:
+            if record['gameIndex'] in games:
+                raise ShardError(f"game {record['gameIndex']} appears in more than one output")
+            games[record['gameIndex']] = record
+
+    records = [games[game_index] for game_index in sorted(games)]
+    return {
+        'games': records,
+        'summary': summarize(records)
+    }
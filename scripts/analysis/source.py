@@ -0,0 +1,45 @@
+"""
+FIDE Source Tree
+================
+
+Round discovery in the extracted FIDE download (_SRC/cup2025) for
+analyze-pgn.py --source, the layout read by scripts/consolidate-pgns.js: a
+round{N}game{M}/ directory holds a games.pgn with game slot M of round N for
+many pairings, not one match (consolidate-pgns.js groups the games back into
+matches by player pair).
+
+The files of a round are listed in sorted directory name order (the order of
+consolidate-pgns.js and of `find ... | sort`), and games are numbered as if
+the files were concatenated. gameIndex therefore goes slot directory by slot
+directory, each holding several pairings, unlike the match-grouped order of
+the consolidated and enriched data (see attachAnalysisMoveTimes in
+scripts/utils/analysis-reader.js).
+"""
+
+import os
+import re
+
+from .live import PGN_FILE_NAME
+
+ROUND_DIR_PATTERN = re.compile(r'^round(\d+)game(\d+)$')
+
+# Replaced by the round number in a --ply-file path given with --source
+ROUND_PLACEHOLDER = '{round}'
+
+
+def round_pgn_files(source):
+    """{round number: games.pgn paths of its game slot directories} of a source tree."""
+    rounds = {}
+    for entry in sorted(os.listdir(source)):
+        match = ROUND_DIR_PATTERN.match(entry)
+        if not match:
+            continue
+        path = os.path.join(source, entry, PGN_FILE_NAME)
+        if os.path.isfile(path):
+            rounds.setdefault(int(match.group(1)), []).append(path)
+    return rounds
+
+
+def round_output_path(directory, round_number):
+    """Analysis JSON of a round in an output directory (data/analysis/round-N-analysis.json)."""
+    return os.path.join(directory, f'round-{round_number}-analysis.json')
@@ -0,0 +1,95 @@
+"""
+Engine Resource Tuning
+======================
+
+Picks the engine layout (worker processes x Threads per engine x Hash MB, and
+whether each worker is pinned to its own CPUs) with the highest positions/sec
+on this machine, and keeps it in a profile file (analyze-pgn.py --tune and
+--profile PATH).
+
+Calibration searches the same sample of positions from the actual input with
+every candidate layout, at the requested depth and without the eval cache.
+Candidates use every available CPU: for each Threads value, as many workers
+as fit. Pinning is only tried on the fastest unpinned layout.
+
+Profile file (JSON):
+
+    {
+        "workers": 4, "threads": 1, "hash": 64, "pinCpus": true,
+        "positionsPerSecond": 41.7,
+        "depth": 15, "cpus": 4, "engineId": "Stockfish 17.1",
+        "candidates": [{"workers": 4, "threads": 1, "hash": 16, "pinCpus": false,
+                        "positionsPerSecond": 39.2}, ...]
+    }
+"""
+
+import json
+import os
+
+THREAD_CHOICES = (1, 2, 4)
+HASH_CHOICES_MB = (16, 64, 256)
+
+# Engines may use at most this share of physical memory for hash tables
+MAX_HASH_MEMORY_SHARE = 0.5
+
+PROFILE_KEYS = ('workers', 'threads', 'hash', 'pinCpus')
+
+
+def available_cpus():
+    """CPUs this process may run on, in order."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def physical_memory_mb():
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def candidate_layouts(cpu_count, memory_mb=None):
+    """Unpinned {'workers', 'threads', 'hash', 'pinCpus'} layouts worth trying on `cpu_count` CPUs."""
+    layouts = []
+    for threads in THREAD_CHOICES:
+        if threads > cpu_count:
+            break
+        workers = cpu_count // threads
+        for hash_mb in HASH_CHOICES_MB:
+            if memory_mb and workers * hash_mb > memory_mb * MAX_HASH_MEMORY_SHARE:
+                continue
+            layouts.append({'workers': workers, 'threads': threads, 'hash': hash_mb, 'pinCpus': False})
+    return layouts
+
+
+def can_pin():
+    return hasattr(os, 'sched_setaffinity')
+
+
+def pin_cpus(slot, threads):
+    """
+    Pin this process (and the engine it starts afterwards) to the CPUs of
+    worker `slot`: `threads` consecutive CPUs, wrapping around.
+    """
+    cpus = available_cpus()
+    start = slot * threads
+    os.sched_setaffinity(0, {cpus[(start + offset) % len(cpus)] for offset in range(threads)})
+
+
+def load_profile(path):
+    """The layout stored in a profile file, plus its metadata."""
+    with open(path, 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+    missing = [key for key in PROFILE_KEYS if key not in profile]
+    if missing:
+        raise ValueError(f"{path} is not an engine profile (missing {', '.join(missing)})")
+    return profile
+
+
+def save_profile(path, profile):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
@@ -7,11 +7,39 @@ Analyzes chess games from PGN data using Stockfish engine.
 Calculates accuracy, ACPL, blunders, mistakes, and inaccuracies.
 
 Requirements:
-    pip install python-chess stockfish
+    pip install python-chess stockfish numpy
 
 Usage:
     python analyze-pgn.py < games.pgn > analysis.json
     python analyze-pgn.py --depth 15 --sample 1 < games.pgn > analysis.json
+    python analyze-pgn.py --workers 4 < games.pgn > analysis.json
+    python analyze-pgn.py --no-cache < games.pgn > analysis.json
+    python analyze-pgn.py --checkpoint round-1.jsonl --resume < games.pgn > analysis.json
+    python analyze-pgn.py --stream < archive.pgn > analysis.jsonl
+    python analyze-pgn.py --engine-backend stockfish --threads 2 --hash 256 < games.pgn > analysis.json
+    python analyze-pgn.py --depth 18 --coarse-depth 8 < games.pgn > analysis.json
+    python analyze-pgn.py --syzygy ~/syzygy < games.pgn > analysis.json
+    python analyze-pgn.py --ply-file round-1-analysis.plies.bin --out round-1-analysis.json < games.pgn
+    python analyze-pgn.py --metrics metrics.json < games.pgn > analysis.json
+    python analyze-pgn.py --shard 3/16 < games.pgn > shard-3.json
+    python analyze-pgn.py --tune < games.pgn > analysis.json
+    python analyze-pgn.py --profile .cache/engine-profile.json < games.pgn > analysis.json
+    python analyze-pgn.py --time-budget 110 < games.pgn > analysis.json
+    python analyze-pgn.py --round-json < data/consolidated/round-5-matches.json > round-5-analysis.json
+    python analyze-pgn.py --pgn _SRC/cup2025/*round5*/games.pgn > round-5-analysis.json
+    python analyze-pgn.py --pgn round-5.pgn --games 3,7,12-15 > reanalyzed.json
+    python analyze-pgn.py index _SRC/cup2025/*/games.pgn
+    python analyze-pgn.py merge shard-*.json > analysis.json
+    python analyze-pgn.py --windowed-accuracy < games.pgn > analysis.json
+    python analyze-pgn.py rescore analysis.json --thresholds 3,6,12,25 > rescored.json
+    python analyze-pgn.py --changed-only < republished-round.pgn > analysis.json
+    python analyze-pgn.py --follow _SRC/cup2025/round5game* --out data/analysis/round-5-analysis.json
+    python analyze-pgn.py --source _SRC/cup2025 --rounds 1-6 --out data/analysis/
+    python analyze-pgn.py --source _SRC/cup2025 --out data/analysis/ --ply-file 'data/analysis/round-{round}-plies.bin'
+    python analyze-pgn.py serve --depth 15 --workers 4   # then: python analysis-client.py < games.pgn
+
+Evaluations are cached across runs in .cache/eval-cache.sqlite (--cache PATH to move it),
+finished games in .cache/game-results.sqlite (--result-cache PATH, reused with --changed-only).
 
 Output JSON format:
     {
@@ -37,339 +65,344 @@ Output JSON format:
 """
 
 import sys
+import io
 import json
 import argparse
 import os
 import shutil
+import signal
+import subprocess
+import collections
+import multiprocessing
+import time
 import chess
 import chess.pgn
-from stockfish import Stockfish
-
-def cp_to_win_percentage(cp):
-    """
-    Convert centipawn evaluation to win percentage.
-    Official Lichess formula: https://lichess.org/page/accuracy
-    Win% = 50 + 50 * (2 / (1 + exp(-0.00368208 * centipawns)) - 1)
+import numpy as np
+
+from analysis.awards import AwardTable, summarize
+from analysis.budget import BudgetScheduler
+from analysis.cache import EvalCache, DEFAULT_MAX_ENTRIES, normalize_fen
+from analysis.checkpoint import CheckpointWriter, CheckpointMismatch, load_checkpoint
+from analysis.engines import ENGINE_BACKENDS, open_engine
+from analysis.live import LiveRound, write_json_atomic
+from analysis.metrics import EtaTracker, Metrics, count_plies, format_duration
+from analysis.pgnindex import game_text, header_game_id, header_rating, load_index, sidecar_path
+from analysis.pipeline import PipelineStage
+from analysis.plies import PlyFileWriter, ply_file_reference, read_ply_file
+from analysis.resolver import forced_reply_evaluation, has_single_legal_move, open_tablebase, resolve_position
+from analysis.results import ResultCache, duplicate_key, game_fingerprint, result_key
+from analysis.rounds import RoundFileError, iter_round_jobs
+from analysis.scoring import (QUALITY_THRESHOLDS, eval_extremes, move_times_columns, mover_win_losses, ply_columns,
+                              score_plies, win_percentages)
+from analysis.service import DEFAULT_HOST, DEFAULT_PORT, AnalysisServer, ServiceError
+from analysis.shards import ShardError, merge_outputs, parse_shard, select_shard
+from analysis.source import ROUND_PLACEHOLDER, round_output_path, round_pgn_files
+from analysis.tuning import (available_cpus, can_pin, candidate_layouts, load_profile, physical_memory_mb,
+                             pin_cpus, save_profile)
+
+# Phase timers and engine call stats of this process (see analysis/metrics.py)
+metrics = Metrics()
+
+def eval_to_cp(evaluation):
     """
-    import math
-    return 50 + 50 * (2 / (1 + math.exp(-0.00368208 * cp)) - 1)
-
-def classify_move_by_win_percentage(win_before, win_after, is_white):
-    """
-    Classify move quality based on win percentage change.
-    Based on Lichess algorithm: https://github.com/lichess-org/lila/blob/master/modules/analyse/src/main/AccuracyPercent.scala
-
-    Returns: (quality, win_loss) where quality is 'excellent', 'good', 'inaccuracies', 'mistakes', or 'blunders'
+    Convert a Stockfish evaluation dict to centipawns from White's perspective.
+    Uses granular mate scoring: mate-in-N = 10000 - (N * 10).
     """
-    # Calculate win percentage loss (from player's perspective)
-    if is_white:
-        win_loss = win_before - win_after
-    else:
-        # For black, we need to flip the percentages
-        win_loss = (100 - win_before) - (100 - win_after)
-
-    # Normalize to 0-100 range
-    win_loss = max(0, win_loss)
-
-    # Lichess classification thresholds (based on win% loss)
-    if win_loss < 2:
-        return 'excellent', win_loss
-    elif win_loss < 5:
-        return 'good', win_loss
-    elif win_loss < 10:
-        return 'inaccuracies', win_loss
-    elif win_loss < 20:
-        return 'mistakes', win_loss
-    else:
-        # Only count as blunder if the position actually swings significantly
-        # Don't count blunders when already completely winning/losing
-        if win_before > 10 and win_before < 90:  # Position wasn't already decided
-            return 'blunders', win_loss
-        else:
-            return 'mistakes', win_loss
-
-def calculate_accuracy_from_win_percentage(win_losses):
+    if evaluation['type'] == 'cp':
+        return evaluation['value']
+    elif evaluation['type'] == 'mate':
+        mate_in = evaluation['value']
+        return (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
+    return 0
+
+def timeline_columns(timeline, evals):
+    """Score input columns (see analysis/scoring.py) of a timeline's sampled plies."""
+    sampled = timeline['sampled']
+    return ply_columns(
+        sampled,
+        [eval_to_cp(evals[move_num]) for move_num in sampled],
+        [eval_to_cp(evals[move_num + 1]) for move_num in sampled],
+        [evals[move_num]['type'] == 'mate' for move_num in sampled],
+        [evals[move_num + 1]['type'] == 'mate' for move_num in sampled]
+    )
+
+def build_eval_timeline(game, sample_rate=1, tablebase=None):
     """
-    Calculate accuracy percentage from list of win percentage losses.
-    Based on Lichess formula.
+    Replay a game's mainline once and prepare its evaluation timeline.
+
+    Position i is the position before ply i (position 0 is the start, position
+    len(moves) is the final position), so the "after" position of ply N is the
+    "before" position of ply N+1 and only has to be searched once.
+
+    Returns a dict with:
+        board   - starting position
+        moves   - mainline moves
+        sans    - SAN of each move (None for moves skipped by sampling)
+        clocks  - (clock left, elapsed move time) of each move in seconds,
+                  from its [%clk] / [%emt] comments (None when missing)
+        fens    - FEN of every position
+        sampled - ply indices selected by the sample rate
+        evals   - per-position evaluation vector (filled by evaluate_timeline)
+        resolved - per-position evaluation known without a search, or None
+                   (terminal and tablebase positions, see analysis/resolver.py)
+        forced  - positions whose only legal move was played (scored from the
+                  position after it)
     """
-    if not win_losses:
-        return 100
-
-    # Lichess formula: 103.1668 * e^(-0.04354 * average_win_loss) - 3.1669
-    import math
-    avg_loss = sum(win_losses) / len(win_losses)
-    accuracy = 103.1668 * math.exp(-0.04354 * avg_loss) - 3.1669
+    board = game.board()
+    timeline = {
+        'board': board.copy(),
+        'moves': [],
+        'sans': [],
+        'clocks': [],
+        'fens': [board.fen()],
+        'sampled': [],
+        'evals': [None],
+        'resolved': [resolve_position(board, tablebase)],
+        'forced': set()
+    }
+    return extend_eval_timeline(timeline, game.mainline(), sample_rate, tablebase)
 
-    return max(0, min(100, accuracy))
+def clock_seconds(seconds):
+    """A clock annotation in seconds as written to moveTimes (whole seconds as int), or None."""
+    if seconds is None or not seconds.is_integer():
+        return seconds
+    return int(seconds)
 
-def calculate_blunder_severity(eval_before, eval_after, eval_before_type, eval_after_type, win_loss):
+def extend_eval_timeline(timeline, nodes, sample_rate=1, tablebase=None):
     """
-    Calculate blunder severity considering position context and mate threats.
-
-    A blunder from a winning position to mate is much worse than a small cp loss in a losing position.
-    Returns a severity score for comparison (higher = worse blunder).
+    Append the mainline nodes (moves and their clock annotations) played from
+    a timeline's final position (--follow: the plies that arrived since the
+    last update). Evaluations of the positions already in the timeline are
+    kept, except for a final position whose only legal move was then played
+    (it is scored from the position after it, as in a full replay).
     """
-    import math
-
-    # Base severity from win percentage loss
-    severity = win_loss
-
-    # Check if blunder leads to mate (extremely severe)
-    if eval_after_type == 'mate':
-        mate_in = abs(eval_after)
-        # Mate threats are catastrophic - add huge penalty, scaled by how soon mate arrives
-        # Mate in 1-3 moves is devastating, longer mates less so
-        mate_penalty = 100 / (mate_in + 1)  # M1 = 50, M2 = 33, M3 = 25, etc.
-        severity += mate_penalty
-
-    # Check if position was winning before blunder (amplify severity)
-    if eval_before_type == 'cp':
-        # If player was winning by 200+ cp (or equivalent for black)
-        winning_margin = abs(eval_before)
-        if winning_margin > 200:
-            # Blundering from a winning position is worse - multiply by how much you were winning
-            # Cap the multiplier at 3x for positions > 600 cp advantage
-            position_multiplier = 1 + min(2, (winning_margin - 200) / 400)
-            severity *= position_multiplier
-    elif eval_before_type == 'mate' and eval_before > 0:
-        # Was delivering mate but blundered it away - extremely severe
-        severity *= 3
-
-    return severity
-
-def analyze_game(game, stockfish, depth=15, sample_rate=1):
-    """Analyze a single game with Stockfish using Lichess-style win percentage."""
-
-    board = game.board()
-    moves = list(game.mainline_moves())
-
-    white_win_losses = []  # Track win% losses for accuracy calculation
-    black_win_losses = []
-    white_cp_losses = []  # Track actual centipawn losses for ACPL
-    black_cp_losses = []
-
-    white_quality = {'blunders': 0, 'mistakes': 0, 'inaccuracies': 0, 'good': 0, 'excellent': 0}
-    black_quality = {'blunders': 0, 'mistakes': 0, 'inaccuracies': 0, 'good': 0, 'excellent': 0}
-
-    # Track engine-level moves (win% loss < 2%)
-    white_engine_moves = 0
-    black_engine_moves = 0
-
-    biggest_blunder = None
-    lucky_escape = None  # Track when opponent didn't punish a blunder
-
-    # Track worst positions for each player (for comeback detection)
-    min_eval_white = float('inf')  # Track White's worst position (most negative)
-    max_eval_white = float('-inf')  # Track White's best position (most positive)
-    min_eval_metadata = None  # Store metadata for White's worst position
-    max_eval_metadata = None  # Store metadata for Black's worst position
-
-    # Track previous move eval to detect missed punishments
-    prev_eval = None
+    started = time.perf_counter()
+    board = timeline['board'].copy()
+    for move in timeline['moves']:
+        board.push(move)
 
-    # Track move-level data for Sad Times award
-    move_times = []
+    sans = timeline['sans']
+    clocks = timeline['clocks']
+    fens = timeline['fens']
+    sampled = timeline['sampled']
+    resolved = timeline['resolved']
+    forced = timeline['forced']
 
-    for move_num, move in enumerate(moves):
-        is_white_move = move_num % 2 == 0
+    for node in nodes:
+        move = node.move
+        move_num = len(timeline['moves'])
+        if resolved[move_num] is None and has_single_legal_move(board):
+            forced.add(move_num)
+            timeline['evals'][move_num] = None
 
         # Sample every Nth move FOR EACH PLAYER to save time
         # White moves: 0, 2, 4, 6... -> sample 0, 4, 8...
         # Black moves: 1, 3, 5, 7... -> sample 1, 5, 9...
         move_index_for_player = move_num // 2
-        if move_index_for_player % sample_rate != 0:
-            board.push(move)
-            continue
+        if move_index_for_player % sample_rate == 0:
+            sampled.append(move_num)
+            sans.append(board.san(move))
+        else:
+            sans.append(None)
+        clocks.append((clock_seconds(node.clock()), clock_seconds(node.emt())))
+        board.push(move)
+        timeline['moves'].append(move)
+        fens.append(board.fen())
+        resolved.append(resolve_position(board, tablebase))
+        timeline['evals'].append(None)
 
-        # Get SAN notation before making the move
-        move_san = board.san(move)
+    metrics.add('replay', time.perf_counter() - started)
+    return timeline
 
-        # Get evaluation before move
-        stockfish.set_fen_position(board.fen())
-        eval_before = stockfish.get_evaluation()
+def timeline_positions(timeline):
+    """Indices of the positions needed to score the sampled moves (before and after each)."""
+    return sorted({p for move_num in timeline['sampled'] for p in (move_num, move_num + 1)})
 
-        # Convert to centipawns from white's perspective
-        # Use more granular mate scoring: mate-in-N = 10000 - (N * 10)
-        if eval_before['type'] == 'cp':
-            cp_before = eval_before['value']
-        elif eval_before['type'] == 'mate':
-            mate_in = eval_before['value']
-            cp_before = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-        else:
-            cp_before = 0
+def engine_positions(timeline, positions):
+    """
+    Positions the engine has to search so every listed position can be scored:
+    resolved positions are dropped and forced positions are replaced by the
+    position after their only move.
+    """
+    searched = set()
+    for index in positions:
+        while index in timeline['forced']:
+            index += 1
+        if timeline['resolved'][index] is None:
+            searched.add(index)
+    return sorted(searched)
+
+def fill_resolved(timeline, evals, positions):
+    """Fill the listed positions that were not searched from resolved and searched positions."""
+    for index in positions:
+        chain = []
+        while evals[index] is None and timeline['resolved'][index] is None and index in timeline['forced']:
+            chain.append(index)
+            index += 1
+        if evals[index] is None:
+            evals[index] = timeline['resolved'][index]
+        for forced_index in reversed(chain):
+            white_to_move = timeline['fens'][forced_index].split()[1] == 'w'
+            evals[forced_index] = forced_reply_evaluation(evals[forced_index + 1], white_to_move)
+    return evals
+
+def resolved_counts(timeline):
+    """Counters for the evaluated positions of a timeline that needed no search of their own."""
+    evaluated = [index for index, evaluation in enumerate(timeline['evals']) if evaluation is not None]
+    return {
+        'resolvedPositions': sum(1 for index in evaluated if timeline['resolved'][index] is not None),
+        'forcedPositions': sum(1 for index in evaluated if index in timeline['forced'])
+    }
 
-        # Make the move
-        board.push(move)
+def evaluate_timeline(timeline, engine, positions, cache=None, depth=None):
+    """
+    Search each listed position of the timeline that has not been evaluated yet.
+    Positions found in the persistent cache (if any) are not searched again, and
+    resolved / forced positions are filled in without a search of their own.
+
+    Positions are visited in game order on one board, so the engine gets each
+    position together with the moves that led to it. With a depth, the
+    positions are searched at that (coarse) depth into timeline['coarseEvals']
+    instead of the full-depth evaluation vector. A timeline['depth'] (a game
+    downgraded by --time-budget) replaces the full depth.
+    """
+    if depth is None:
+        evals = timeline['evals']
+        depth = timeline.get('depth')
+    else:
+        evals = timeline.setdefault('coarseEvals', [None] * len(timeline['fens']))
+    board = timeline['board'].copy()
+    for index in engine_positions(timeline, positions):
+        if evals[index] is not None:
+            continue
+        fen = timeline['fens'][index]
+        evaluation = cache.get(fen, depth) if cache else None
+        if evaluation is None:
+            while len(board.move_stack) < index:
+                board.push(timeline['moves'][len(board.move_stack)])
+            started = time.perf_counter()
+            evaluation = engine.evaluate(board, depth)
+            metrics.engine_call(time.perf_counter() - started, timeline.get('gameIndex'))
+            if cache:
+                cache.put(fen, evaluation, depth)
+        evals[index] = evaluation
+    return fill_resolved(timeline, evals, positions)
+
+# Coarse-to-fine analysis: a sampled ply is re-searched at full depth when its
+# coarse win% loss lies within this many points of a classification threshold
+ESCALATION_WIN_MARGIN = 1.5
+# ...or when an evaluation lies within this many centipawns of the +/-200 cp
+# "losing position" line used by the comeback and lucky escape checks
+ESCALATION_CP_MARGIN = 50
+
+def escalation_positions(timeline, coarse_evals):
+    """
+    Pick the positions a coarse pass is not trusted with.
+
+    A sampled ply is escalated (both of its positions re-searched at full depth)
+    when its coarse win% loss is near a move quality threshold or past the
+    blunder line, when either evaluation is a mate score (mate distances shift
+    with depth) or near the +/-200 cp losing line, and for the best and worst
+    position of the game (comeback extremes). The final position is always
+    searched at full depth for the comeback check.
+    Returns (position indices, number of escalated plies).
+    """
+    sampled = timeline['sampled']
+    columns = timeline_columns(timeline, coarse_evals)
+    win_losses = mover_win_losses(columns, win_percentages(columns['cpBefore']), win_percentages(columns['cpAfter']))
+    thresholds = np.asarray(QUALITY_THRESHOLDS)
+
+    near_threshold = (np.abs(win_losses[:, None] - thresholds) < ESCALATION_WIN_MARGIN).any(axis=1)
+    escalate = (near_threshold | (win_losses >= thresholds[-1]) | columns['mateBefore'] | columns['mateAfter']
+                | (np.abs(np.abs(columns['cpAfter']) - 200) < ESCALATION_CP_MARGIN))
+    escalated = {sampled[row] for row in np.flatnonzero(escalate)}
+    escalated.update(sampled[row] for row in eval_extremes(columns) if row is not None)
+
+    positions = {p for move_num in escalated for p in (move_num, move_num + 1)}
+    positions.add(len(timeline['fens']) - 1)
+    return positions, len(escalated)
+
+def refine_timeline(timeline, engine, coarse_depth, cache=None):
+    """
+    Coarse-to-fine evaluation of a timeline.
 
-        # Get evaluation after move
-        stockfish.set_fen_position(board.fen())
-        eval_after = stockfish.get_evaluation()
+    Every needed position is searched at coarse_depth first; only the positions
+    picked by escalation_positions are searched again at the full depth, and the
+    rest keep their coarse evaluation. Returns the number of escalated plies.
+    """
+    positions = timeline_positions(timeline)
+    coarse_evals = evaluate_timeline(timeline, engine, positions, cache, coarse_depth)
+    deep_positions, escalated = escalation_positions(timeline, coarse_evals)
+    evaluate_timeline(timeline, engine, deep_positions, cache)
+    evals = timeline['evals']
+    for index in positions:
+        if evals[index] is None:
+            evals[index] = coarse_evals[index]
+    return escalated
+
+def analyze_game(game, engine, depth=15, sample_rate=1, cache=None, timeline=None, coarse_depth=None,
+                 windowed_accuracy=False):
+    """
+    Analyze a single game with Stockfish using Lichess-style win percentage.
 
-        # Convert to centipawns
-        if eval_after['type'] == 'cp':
-            cp_after = eval_after['value']
-        elif eval_after['type'] == 'mate':
-            mate_in = eval_after['value']
-            cp_after = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-        else:
-            cp_after = 0
-
-        # Convert centipawns to win percentages
-        win_before = cp_to_win_percentage(cp_before)
-        win_after = cp_to_win_percentage(cp_after)
-
-        # Store move-level data for Sad Times award
-        move_times.append({
-            'ply': move_num + 1,
-            'moveNumber': move_num // 2 + 1,
-            'color': 'white' if is_white_move else 'black',
-            'move': move_san,
-            'evalBefore': cp_before / 100.0,  # Convert centipawns to pawns
-            'evalAfter': cp_after / 100.0
-        })
-
-        if is_white_move:
-            # Calculate actual centipawn loss (only if both evals are non-mate)
-            # Skip ACPL calculation when mate scores involved (unreliable centipawn comparison)
-            if eval_before['type'] == 'cp' and eval_after['type'] == 'cp':
-                cp_loss = max(0, cp_before - cp_after)
-                white_cp_losses.append(cp_loss)
-
-            # Classify move and track win% loss
-            quality, win_loss = classify_move_by_win_percentage(win_before, win_after, True)
-            white_quality[quality] += 1
-            white_win_losses.append(win_loss)
-
-            # Track engine-level moves (excellent = win% loss < 2%)
-            if quality == 'excellent':
-                white_engine_moves += 1
-
-            # Track biggest blunder using severity calculation
-            if quality == 'blunders':
-                severity = calculate_blunder_severity(
-                    cp_before, cp_after,
-                    eval_before['type'], eval_after['type'],
-                    win_loss
-                )
-                if biggest_blunder is None or severity > biggest_blunder.get('severity', 0):
-                    biggest_blunder = {
-                        'moveNumber': move_num // 2 + 1,
-                        'player': 'white',
-                        'cpLoss': int(cp_loss) if eval_before['type'] == 'cp' and eval_after['type'] == 'cp' else 0,
-                        'winLoss': win_loss,
-                        'severity': severity,
-                        'move': move_san,
-                        'evalBefore': cp_before,
-                        'evalAfter': cp_after
-                    }
-        else:
-            # Calculate actual centipawn loss (from black's perspective)
-            # Skip ACPL calculation when mate scores involved (unreliable centipawn comparison)
-            if eval_before['type'] == 'cp' and eval_after['type'] == 'cp':
-                cp_loss = max(0, cp_after - cp_before)  # Black wants negative eval
-                black_cp_losses.append(cp_loss)
-
-            # Classify move and track win% loss
-            quality, win_loss = classify_move_by_win_percentage(win_before, win_after, False)
-            black_quality[quality] += 1
-            black_win_losses.append(win_loss)
-
-            # Track engine-level moves (excellent = win% loss < 2%)
-            if quality == 'excellent':
-                black_engine_moves += 1
-
-            # Track biggest blunder using severity calculation (flip evals for black)
-            if quality == 'blunders':
-                severity = calculate_blunder_severity(
-                    -cp_before, -cp_after,  # Flip for black's perspective
-                    eval_before['type'], eval_after['type'],
-                    win_loss
-                )
-                if biggest_blunder is None or severity > biggest_blunder.get('severity', 0):
-                    biggest_blunder = {
-                        'moveNumber': move_num // 2 + 1,
-                        'player': 'black',
-                        'cpLoss': int(cp_loss) if eval_before['type'] == 'cp' and eval_after['type'] == 'cp' else 0,
-                        'winLoss': win_loss,
-                        'severity': severity,
-                        'move': move_san,
-                        'evalBefore': cp_before,
-                        'evalAfter': cp_after
-                    }
-
-        # Track lucky escape: opponent didn't punish a position
-        # If previous move gave opponent an advantage (> +200cp) but they didn't maintain it
-        if prev_eval is not None:
-            # White had advantage, black didn't punish (eval went back to neutral/white favor)
-            if prev_eval < -200 and cp_after > -50:
-                escape_amount = abs(prev_eval) - abs(cp_after)
-                if lucky_escape is None or escape_amount > lucky_escape.get('escapeAmount', 0):
-                    lucky_escape = {
-                        'player': 'white',
-                        'escapeAmount': escape_amount,
-                        'evalBefore': prev_eval,
-                        'evalAfter': cp_after,
-                        'moveNumber': move_num // 2 + 1
-                    }
-
-            # Black had advantage, white didn't punish (eval went back to neutral/black favor)
-            if prev_eval > 200 and cp_after < 50:
-                escape_amount = abs(prev_eval) - abs(cp_after)
-                if lucky_escape is None or escape_amount > lucky_escape.get('escapeAmount', 0):
-                    lucky_escape = {
-                        'player': 'black',
-                        'escapeAmount': escape_amount,
-                        'evalBefore': prev_eval,
-                        'evalAfter': cp_after,
-                        'moveNumber': move_num // 2 + 1
-                    }
-
-        # Update previous eval for next iteration
-        prev_eval = cp_after
-
-        # Track worst positions for each player throughout the game
-        # This is for comeback detection - we'll check at the end if the winner was losing
-        if cp_after < min_eval_white:
-            min_eval_white = cp_after
-            min_eval_metadata = {
-                'eval': cp_after,
-                'evalType': eval_after['type'],
-                'mateIn': eval_after.get('value') if eval_after['type'] == 'mate' else None,
-                'moveNumber': move_num // 2 + 1
-            }
+    A prebuilt timeline whose evaluations are already filled in (see
+    run_deduplicated) is scored without touching the engine. With a
+    coarse_depth, positions are searched coarse-to-fine (see refine_timeline).
+    The evaluations are scored by analysis/scoring.py; windowed_accuracy adds
+    Lichess' windowed game accuracy per side.
+    """
 
-        if cp_after > max_eval_white:
-            max_eval_white = cp_after
-            max_eval_metadata = {
-                'eval': cp_after,
-                'evalType': eval_after['type'],
-                'mateIn': eval_after.get('value') if eval_after['type'] == 'mate' else None,
-                'moveNumber': move_num // 2 + 1
-            }
+    if timeline is None:
+        timeline = build_eval_timeline(game, sample_rate)
+    moves = timeline['moves']
 
-    # Calculate accuracy using Lichess formula (based on win% losses)
-    white_accuracy = calculate_accuracy_from_win_percentage(white_win_losses)
-    black_accuracy = calculate_accuracy_from_win_percentage(black_win_losses)
+    if coarse_depth:
+        timeline['escalatedPlies'] = refine_timeline(timeline, engine, coarse_depth, cache)
 
-    # Calculate ACPL (actual centipawn loss)
-    # Use capped mean to prevent outlier moves from dominating the average
-    # Cap individual move losses at 150 CP to balance accuracy with outlier robustness
-    # This matches Lichess approach: ACPL reflects typical play, not worst blunders
-    MAX_CP_LOSS_FOR_ACPL = 150
+    # Search every position needed by a sampled move exactly once
+    evals = evaluate_timeline(timeline, engine, timeline_positions(timeline), cache)
 
-    if len(white_cp_losses) > 0:
-        # Cap each loss at threshold, then take mean
-        capped_losses = [min(loss, MAX_CP_LOSS_FOR_ACPL) for loss in white_cp_losses]
-        white_acpl = sum(capped_losses) / len(capped_losses)
-    else:
-        white_acpl = 0
+    # Everything from here on is classification (except the comeback check's final search)
+    classify_started = time.perf_counter()
+    engine_seconds_before = metrics.engine_seconds
 
-    if len(black_cp_losses) > 0:
-        capped_losses = [min(loss, MAX_CP_LOSS_FOR_ACPL) for loss in black_cp_losses]
-        black_acpl = sum(capped_losses) / len(capped_losses)
-    else:
-        black_acpl = 0
+    # Every sampled ply is scored at once from the evaluation vector
+    columns = timeline_columns(timeline, evals)
+    sans = [timeline['sans'][move_num] for move_num in timeline['sampled']]
+    scores = score_plies(columns, sans, windowed_accuracy=windowed_accuracy)
+    lucky_escape = scores.pop('luckyEscape')
+
+    # Track move-level data for Sad Times award
+    move_times = [{
+        'ply': move_num + 1,
+        'moveNumber': move_num // 2 + 1,
+        'color': 'white' if move_num % 2 == 0 else 'black',
+        'move': san,
+        'evalBefore': cp_before / 100.0,  # Convert centipawns to pawns
+        'evalAfter': cp_after / 100.0,
+        # Seconds left after the move and spent on it ([%clk] / [%emt], None if not annotated)
+        'clockRemaining': timeline['clocks'][move_num][0],
+        'timeSpent': timeline['clocks'][move_num][1]
+    } for move_num, san, cp_before, cp_after in zip(timeline['sampled'], sans, columns['cpBefore'].tolist(),
+                                                     columns['cpAfter'].tolist())]
+
+    # White's worst and best position after a sampled move (for comeback detection)
+    lowest, highest = eval_extremes(columns)
+
+    def extreme_metadata(row):
+        move_num = timeline['sampled'][row]
+        eval_after = evals[move_num + 1]
+        return {
+            'eval': eval_to_cp(eval_after),
+            'evalType': eval_after['type'],
+            'mateIn': eval_after.get('value') if eval_after['type'] == 'mate' else None,
+            'moveNumber': move_num // 2 + 1
+        }
+
+    min_eval_metadata = extreme_metadata(lowest) if lowest is not None else None
+    max_eval_metadata = extreme_metadata(highest) if highest is not None else None
+    min_eval_white = min_eval_metadata['eval'] if min_eval_metadata else float('inf')
+    max_eval_white = max_eval_metadata['eval'] if max_eval_metadata else float('-inf')
 
     # Calculate comeback based on game result
     # A comeback is when a player was losing (eval < -200) but won the game
@@ -382,16 +415,9 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
     if game_result == '1-0':  # White won
         # Check if White was losing at some point (min_eval_white < -200)
         if min_eval_metadata and min_eval_white < -LOSING_THRESHOLD:
-            # Get final position eval (use last eval from board)
-            stockfish.set_fen_position(board.fen())
-            final_eval = stockfish.get_evaluation()
-            if final_eval['type'] == 'cp':
-                final_cp = final_eval['value']
-            elif final_eval['type'] == 'mate':
-                mate_in = final_eval['value']
-                final_cp = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-            else:
-                final_cp = 0
+            # Get final position eval (reuses the timeline when the last move was searched)
+            final_eval = evaluate_timeline(timeline, engine, [len(moves)], cache)[len(moves)]
+            final_cp = eval_to_cp(final_eval)
 
             # Calculate swing from worst position to final position
             swing = final_cp - min_eval_white
@@ -416,15 +442,8 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
         # Check if Black was losing at some point (max_eval_white > 200, meaning Black was down)
         if max_eval_metadata and max_eval_white > LOSING_THRESHOLD:
             # Get final position eval
-            stockfish.set_fen_position(board.fen())
-            final_eval = stockfish.get_evaluation()
-            if final_eval['type'] == 'cp':
-                final_cp = final_eval['value']
-            elif final_eval['type'] == 'mate':
-                mate_in = final_eval['value']
-                final_cp = (10000 - abs(mate_in) * 10) * (1 if mate_in > 0 else -1)
-            else:
-                final_cp = 0
+            final_eval = evaluate_timeline(timeline, engine, [len(moves)], cache)[len(moves)]
+            final_cp = eval_to_cp(final_eval)
 
             # Calculate swing from worst position to final position
             swing = max_eval_white - final_cp
@@ -445,16 +464,11 @@ def analyze_game(game, stockfish, depth=15, sample_rate=1):
                 'moveNumber': max_eval_metadata['moveNumber']
             }
 
+    metrics.add('classification', time.perf_counter() - classify_started
+                - (metrics.engine_seconds - engine_seconds_before))
+
     return {
-        'whiteACPL': round(white_acpl, 1),
-        'blackACPL': round(black_acpl, 1),
-        'whiteAccuracy': round(white_accuracy, 1),
-        'blackAccuracy': round(black_accuracy, 1),
-        'whiteMoveQuality': white_quality,
-        'blackMoveQuality': black_quality,
-        'whiteEngineMoves': white_engine_moves,
-        'blackEngineMoves': black_engine_moves,
-        'biggestBlunder': biggest_blunder,
+        **scores,
         'biggestComeback': biggest_comeback,
         'luckyEscape': lucky_escape,
         'moveTimes': move_times
@@ -481,390 +495,1789 @@ def find_stockfish_path():
 
     return 'stockfish'  # Fall back to hoping it's in PATH
 
-def main():
-    parser = argparse.ArgumentParser(description='Analyze chess PGN with Stockfish')
-    parser.add_argument('--depth', type=int, default=15, help='Stockfish search depth (default: 15)')
-    parser.add_argument('--sample', type=int, default=1, help='Analyze every Nth move (default: 1 = all moves)')
-    parser.add_argument('--stockfish-path', type=str, default=None, help='Path to Stockfish binary (auto-detected if not specified)')
-    parser.add_argument('--json-input', action='store_true', help='Read JSON format with game metadata (includes ratings)')
-    args = parser.parse_args()
-
-    # Auto-detect Stockfish path if not specified
-    if args.stockfish_path is None:
-        args.stockfish_path = find_stockfish_path()
-
-    # Initialize Stockfish
+def read_engine_id(stockfish_path):
+    """Ask the engine for its UCI "id name" (e.g. "Stockfish 17.1") to tag cached evaluations."""
+    process = subprocess.Popen(
+        [stockfish_path],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True
+    )
     try:
-        stockfish = Stockfish(path=args.stockfish_path, depth=args.depth)
-    except Exception as e:
-        print(f"Error initializing Stockfish: {e}", file=sys.stderr)
-        print("Install Stockfish: brew install stockfish (macOS) or apt-get install stockfish (Linux)", file=sys.stderr)
-        sys.exit(1)
+        process.stdin.write('uci\n')
+        process.stdin.flush()
+        engine_id = None
+        for line in process.stdout:
+            line = line.strip()
+            if line.startswith('id name '):
+                engine_id = line[len('id name '):]
+            elif line == 'uciok':
+                break
+        process.stdin.write('quit\n')
+        process.stdin.flush()
+    finally:
+        process.wait(timeout=10)
+    return engine_id or os.path.basename(stockfish_path)
+
+def default_cache_path():
+    """Default location of the persistent evaluation cache (repo-local, gitignored)."""
+    return os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache', 'eval-cache.sqlite'))
+
+def default_result_cache_path():
+    """Default location of the game result cache (next to the evaluation cache)."""
+    return os.path.join(os.path.dirname(default_cache_path()), 'game-results.sqlite')
+
+def default_index_dir():
+    """Default directory of the PGN game index sidecars (next to the evaluation cache)."""
+    return os.path.join(os.path.dirname(default_cache_path()), 'pgn-index')
+
+def default_profile_path():
+    """Default location of the engine resource profile written by --tune."""
+    return os.path.join(os.path.dirname(default_cache_path()), 'engine-profile.json')
+
+def default_worker_count():
+    """Number of CPU cores available to this process."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Engine and cache connection owned by the current process (one per pool worker)
+worker_engine = None
+worker_cache = None
+worker_tablebase = None
+worker_settings = {}
+
+# Engine processes kept running between requests by `analyze-pgn.py serve` (None: a pool per run)
+warm_pool = None
+
+def init_worker(settings):
+    """Start this process's own Stockfish instance and open its cache connection."""
+    global worker_engine, worker_cache, worker_tablebase
+    worker_settings.update(settings)
+    worker_engine = open_engine(settings['engineBackend'], settings['stockfishPath'], settings['depth'],
+                                settings['threads'], settings['hash'])
+    if settings.get('cachePath'):
+        worker_cache = EvalCache(settings['cachePath'], settings['engineId'], settings['depth'],
+                                 settings['cacheMaxEntries'])
+    worker_tablebase = open_tablebase(settings.get('syzygyPath'))
+
+def init_pool_worker(settings, slots):
+    """
+    Pool initializer: start from empty metrics (a forked worker inherits the
+    parent's) and, with pinCpus, pin this worker to its own CPUs before its
+    engine starts (the engine inherits the affinity).
+    """
+    metrics.drain()
+    if settings.get('pinCpus'):
+        with slots.get_lock():
+            slot = slots.value
+            slots.value += 1
+        pin_cpus(slot, settings['threads'])
+    init_worker(settings)
+
+def close_worker():
+    """Stop this process's engine and close its cache connection."""
+    global worker_engine, worker_cache, worker_tablebase
+    if worker_engine is not None:
+        worker_engine.close()
+        worker_engine = None
+    if worker_cache is not None:
+        worker_cache.close()
+        worker_cache = None
+    if worker_tablebase is not None:
+        worker_tablebase.close()
+        worker_tablebase = None
+
+def prepare_job(job):
+    """
+    Get a queued game ready for the engine: parse it if the job carries PGN
+    text or an index reference, and replay it into its evaluation timeline.
+    Returns (job, game, timeline); game and timeline are None for games with
+    no moves.
+    """
+    game = job.pop('game', None)
+    if job['moveCount'] == 0:
+        job.pop('pgn', None)
+        return job, None, None
+    if game is None:
+        game = parse_job_game(job, worker_settings)
+        if job['moveCount'] == 0:
+            return job, None, None
+
+    timeline = build_eval_timeline(game, worker_settings['sampleRate'], worker_tablebase)
+    timeline['gameIndex'] = job['gameIndex']
+    # Depth picked by the --time-budget scheduler, if any
+    timeline['depth'] = job.get('depth')
+    return job, game, timeline
+
+def search_job(prepared):
+    """
+    Search and score a game prepared by prepare_job with this process's engine.
+    Returns (job info, analysis, counters), where analysis is None for games
+    with no moves and counters holds this game's cache hits/misses.
+    """
+    job, game, timeline = prepared
+    if game is None:
+        return job, None, worker_counters(0, 0)
+
+    hits_before = worker_cache.hits if worker_cache else 0
+    misses_before = worker_cache.misses if worker_cache else 0
+    analysis = analyze_game(game, worker_engine, job.get('depth') or worker_settings['depth'], worker_settings['sampleRate'],
+                            worker_cache, timeline, worker_settings.get('coarseDepth'),
+                            worker_settings.get('windowedAccuracy'))
+    counters = worker_counters(hits_before, misses_before)
+    counters['sampledPlies'] = len(timeline['sampled'])
+    counters['escalatedPlies'] = timeline.get('escalatedPlies', 0)
+    counters.update(resolved_counts(timeline))
+    return job, analysis, counters
+
+def analyze_job(job):
+    """
+    Analyze one queued game with this process's engine (prepare_job, then
+    search_job).
 
-    # Read input from stdin
-    input_text = sys.stdin.read()
+    Jobs sent to pool workers carry the game as PGN text (game trees are deep
+    and expensive to pickle); in-process jobs carry the parsed game.
+    """
+    return search_job(prepare_job(job))
 
-    # Parse input based on format
-    game_metadata = {}  # Maps game_index to {white, black, whiteRating, blackRating}
-    if args.json_input:
-        input_data = json.loads(input_text)
-        games_list = input_data.get('games', [])
-        pgn_text = '\n\n'.join(g['pgn'] for g in games_list)
-        # Build metadata lookup
-        for g in games_list:
-            game_metadata[g['gameIndex']] = {
-                'white': g['white'],
-                'black': g['black'],
-                'whiteRating': g.get('whiteRating'),
-                'blackRating': g.get('blackRating')
-            }
-    else:
-        pgn_text = input_text
+def evaluate_positions_job(positions):
+    """
+    Evaluate a batch of positions with this process's engine (and cache).
 
-    # Parse games
-    games_analyzed = []
+    Each position is (FEN, root FEN, UCI moves from the root, search depth or
+    None for the full depth, gameIndex it is searched for). Consecutive
+    positions usually extend the same game, so the board is only rewound when
+    the next position is not a continuation of the previous one.
+    Returns (evaluations in input order, counters).
+    """
+    hits_before = worker_cache.hits if worker_cache else 0
+    misses_before = worker_cache.misses if worker_cache else 0
+    evaluations = []
+    board = None
+    board_root = None
+    board_history = ()
+    for fen, root_fen, history, depth, game_index in positions:
+        evaluation = worker_cache.get(fen, depth) if worker_cache else None
+        if evaluation is None:
+            if board is None or board_root != root_fen or history[:len(board_history)] != board_history:
+                board = chess.Board(root_fen)
+                board_root = root_fen
+                board_history = ()
+            for uci in history[len(board_history):]:
+                board.push_uci(uci)
+            board_history = history
+            started = time.perf_counter()
+            evaluation = worker_engine.evaluate(board, depth)
+            metrics.engine_call(time.perf_counter() - started, game_index)
+            if worker_cache:
+                worker_cache.put(fen, evaluation, depth)
+        evaluations.append(evaluation)
+    return evaluations, worker_counters(hits_before, misses_before)
+
+def worker_counters(hits_before, misses_before):
+    """
+    Flush this process's cache and return the hits/misses since the given
+    totals, plus the metrics recorded since the last call.
+    """
+    counters = {'cacheHits': 0, 'cacheMisses': 0, 'metrics': metrics.drain()}
+    if worker_cache:
+        worker_cache.flush()
+        counters['cacheHits'] = worker_cache.hits - hits_before
+        counters['cacheMisses'] = worker_cache.misses - misses_before
+    return counters
+
+def parse_job_game(job, settings=None):
+    """
+    Parse the game of a job that carries PGN text ('pgn') or an index
+    reference ('pgnRef': path, offset, length) instead of a parsed game.
+    The job's moveCount is updated to the parsed mainline, and a job not keyed
+    yet gets its result keys (see with_result_keys) if the settings ask for them.
+    """
+    pgn = job.pop('pgn', None)
+    if pgn is None:
+        pgn = game_text(*job['pgnRef'])
+    with metrics.timer('pgnParse'):
+        game = chess.pgn.read_game(io.StringIO(pgn))
+    job['moveCount'] = sum(1 for _ in game.mainline_moves())
+    if settings and settings.get('resultKeys') and 'resultKey' not in job:
+        key_job(job, game, settings)
+    return game
+
+def iter_indexed_jobs(paths):
+    """
+    Yield one analysis job per game of indexed PGN files (see
+    analysis/pgnindex.py), in gameIndex order across the files. Jobs carry a
+    reference to the game's bytes, which are only read and parsed when the
+    game is analyzed.
+    """
     game_index = 0
+    for path, games in paths:
+        for game in games:
+            yield {
+                'gameIndex': game_index,
+                'gameId': game['gameId'],
+                'white': game['white'],
+                'black': game['black'],
+                'whiteRating': game['whiteRating'],
+                'blackRating': game['blackRating'],
+                'result': game['result'],
+                'moveCount': game['plies'],
+                'pgnRef': (path, game['offset'], game['length'])
+            }
+            game_index += 1
 
-    import io
-    pgn_io = io.StringIO(pgn_text)
+def game_job(game, game_index):
+    """Analysis job fields of a parsed game (without the game itself)."""
+    # Ratings from the WhiteElo/BlackElo headers (None if invalid/missing)
+    white_rating = header_rating(game.headers.get('WhiteElo'))
+    black_rating = header_rating(game.headers.get('BlackElo'))
 
-    # First pass: count total games
-    total_games = pgn_text.count('[Event ')
-    print(f"\n🔬 Stockfish Analysis Starting...", file=sys.stderr)
-    print(f"📊 Total games to analyze: {total_games}", file=sys.stderr)
-    print(f"⚙️  Depth: {args.depth} | Sample rate: every {args.sample} move(s)", file=sys.stderr)
-
-    # Format estimated time in human-readable form
-    min_seconds = total_games * 15
-    max_seconds = total_games * 30
-    min_minutes = min_seconds // 60
-    min_secs = min_seconds % 60
-    max_minutes = max_seconds // 60
-    max_secs = max_seconds % 60
-
-    if max_minutes > 0:
-        time_estimate = f"{min_minutes}:{min_secs:02d}-{max_minutes}:{max_secs:02d} minutes"
-    else:
-        time_estimate = f"{min_seconds}-{max_seconds} seconds"
+    # Extract gameId from headers (GameId or Site URL)
+    game_id = header_game_id(game.headers)
+
+    # Count moves in this game
+    move_count = 0
+    for _ in game.mainline_moves():
+        move_count += 1
 
-    print(f"⏱️  Estimated time: {time_estimate}\n", file=sys.stderr)
+    return {
+        'gameIndex': game_index,
+        'gameId': game_id,
+        'white': game.headers.get('White', 'Unknown'),
+        'black': game.headers.get('Black', 'Unknown'),
+        'whiteRating': white_rating,
+        'blackRating': black_rating,
+        'result': game.headers.get('Result'),
+        'moveCount': move_count
+    }
 
+def iter_game_jobs(pgn_io, pack_pgn=False):
+    """Read games from a PGN stream and yield one analysis job per game, in gameIndex order."""
+    game_index = 0
     while True:
-        game = chess.pgn.read_game(pgn_io)
+        with metrics.timer('pgnParse'):
+            game = chess.pgn.read_game(pgn_io)
         if game is None:
             break
 
-        white = game.headers.get('White', 'Unknown')
-        black = game.headers.get('Black', 'Unknown')
+        job = game_job(game, game_index)
+        if pack_pgn:
+            job['pgn'] = str(game)
+        else:
+            job['game'] = game
+        yield job
+
+        game_index += 1
+
+def read_json_input(text):
+    """
+    PGN text and per-game metadata ({gameIndex: {white, black, whiteRating,
+    blackRating}}) of a --json-input document ({"games": [{"pgn": ..., ...}]}).
+    """
+    games_list = json.loads(text).get('games', [])
+    pgn_text = '\n\n'.join(g['pgn'] for g in games_list)
+    game_metadata = {}
+    for g in games_list:
+        game_metadata[g['gameIndex']] = {
+            'white': g['white'],
+            'black': g['black'],
+            'whiteRating': g.get('whiteRating'),
+            'blackRating': g.get('blackRating')
+        }
+    return pgn_text, game_metadata
+
+def skip_finished(jobs, finished, eta=None):
+    """
+    Drop jobs whose game already has a checkpointed result.
 
-        # Extract ratings from PGN headers (WhiteElo/BlackElo)
-        # Try to convert to int, fallback to None if invalid/missing
+    Games are matched by gameIndex and must also agree on gameId and player
+    names; a checkpointed record that no longer matches its game (different
+    input) is discarded and the game is analyzed again. Skipped plies are
+    taken off the ETA.
+    """
+    for job in jobs:
+        record = finished.get(job['gameIndex'])
+        if record is not None:
+            if all(record.get(key) == job[key] for key in ('gameId', 'white', 'black')):
+                if eta:
+                    eta.skip(job['moveCount'])
+                continue
+            del finished[job['gameIndex']]
+        yield job
+
+def key_job(job, game, settings):
+    """Tag a job with the content key of its game's result (resultKey) and its duplicateKey."""
+    fingerprint = game_fingerprint(game)
+    job['resultKey'] = result_key(fingerprint, settings)
+    job['duplicateKey'] = duplicate_key(fingerprint)
+
+def with_result_keys(jobs, settings, parse=False):
+    """
+    Tag the jobs with their result keys (see key_job). Jobs carrying PGN text
+    or an index reference are keyed by parse_job_game when their game is
+    parsed for analysis, so the default path reads every game once; parse
+    reads them here instead, without consuming them, for --changed-only and
+    `serve`, which look the keys up before anything is analyzed.
+    """
+    for job in jobs:
+        game = job.get('game')
+        if game is None and parse:
+            text = job['pgn'] if 'pgn' in job else game_text(*job['pgnRef'])
+            with metrics.timer('pgnParse'):
+                game = chess.pgn.read_game(io.StringIO(text))
+        if game is not None:
+            key_job(job, game, settings)
+        yield job
+
+def reuse_results(jobs, result_cache, eta=None, drop_duplicates=True):
+    """
+    --changed-only and `serve`: split keyed jobs into the games that still
+    need the engine and the unchanged games whose cached analysis can be
+    reused, and drop exact duplicates of earlier games (unless
+    drop_duplicates is False). Reused and dropped plies are taken off the ETA.
+    Returns (jobs to analyze, {gameIndex: (job, analysis)}, dropped duplicate
+    jobs).
+    """
+    pending = []
+    reused = {}
+    dropped = []
+    seen = set()
+    for job in jobs:
+        if drop_duplicates and job.get('duplicateKey') in seen:
+            dropped.append(job)
+        else:
+            if 'duplicateKey' in job:
+                seen.add(job['duplicateKey'])
+            analysis = result_cache.get(job['resultKey']) if job['moveCount'] and 'resultKey' in job else None
+            if analysis is None:
+                pending.append(job)
+                continue
+            job.pop('game', None)
+            job.pop('pgn', None)
+            reused[job['gameIndex']] = (job, analysis)
+        if eta:
+            eta.skip(job['moveCount'])
+    return pending, reused, dropped
+
+def game_record(job, analysis, depth, metadata=None):
+    """
+    Output record of an analyzed game. Ratings given with --json-input
+    (metadata) win over the ones read from the PGN headers.
+    """
+    metadata = metadata or {}
+    record = {
+        'gameIndex': job['gameIndex'],
+        'gameId': job['gameId'],
+        # Round file input: the keys to join results back to their match
+        **({'matchId': job['matchId'], 'gameNumber': job['gameNumber']} if 'matchId' in job else {}),
+        'white': job['white'],
+        'black': job['black'],
+        'whiteRating': metadata.get('whiteRating') or job['whiteRating'],
+        'blackRating': metadata.get('blackRating') or job['blackRating'],
+        **analysis
+    }
+    if job.get('depth') and job['depth'] < depth:
+        # Downgraded by the --time-budget scheduler (not kept in the result cache)
+        record['analysisDepth'] = job['depth']
+    return record
+
+def add_counters(stats, counters):
+    for key, value in counters.items():
+        if key == 'metrics':
+            stats.setdefault('metrics', Metrics()).merge(value)
+        else:
+            stats[key] = stats.get(key, 0) + value
+
+def run_in_workers(function, items, settings, workers):
+    """
+    Apply a worker function to items with `workers` engine processes, yielding
+    results in item order.
+
+    With a single worker everything runs in this process; otherwise a pool of
+    processes (each with its own Stockfish) pulls items as they free up, and
+    results are handed back in submission order so output matches a serial run.
+    At most a few items per worker are in flight, so items are only read from
+    the input iterator as fast as they are analyzed.
+    """
+    if workers <= 1:
+        # The service's warm engine (see serve_main) stays up for the next request
+        warm = worker_engine is not None
+        if not warm:
+            init_worker(settings)
         try:
-            white_elo = int(game.headers.get('WhiteElo', 0))
-            white_rating = white_elo if white_elo > 0 else None
-        except (ValueError, TypeError):
-            white_rating = None
+            for item in items:
+                yield function(item)
+        finally:
+            if not warm:
+                close_worker()
+        return
+
+    if warm_pool is not None:
+        yield from run_in_pool(warm_pool, function, items, workers)
+        return
+    slots = multiprocessing.Value('i', 0)  # Next CPU slot for pinned workers
+    with multiprocessing.Pool(workers, initializer=init_pool_worker, initargs=(settings, slots)) as pool:
+        yield from run_in_pool(pool, function, items, workers)
+
+def run_in_pool(pool, function, items, workers):
+    """Feed items to a worker pool, at most a few per worker in flight, yielding results in item order."""
+    max_in_flight = workers * 4
+    pending = collections.deque()
+    for item in items:
+        pending.append(pool.apply_async(function, (item,)))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+# Games prepared ahead of the engine (in-process) or read ahead of the pool by the input thread
+PREPARED_GAMES_QUEUE = 4
+
+def run_jobs(jobs, settings, workers, stats, scheduler=None):
+    """
+    Analyze games one by one (each game searches its own positions), yielding
+    (job, analysis). A --time-budget scheduler is told about every finished game.
+
+    Without a scheduler, games are prepared in a pipeline stage (see
+    analysis/pipeline.py): in-process, a producer thread reads, parses and
+    replays the next games while the engine searches the current one; with a
+    pool, it reads and packs the input while the workers search. A scheduler
+    picks each game's depth as it is handed out, so budgeted runs are not
+    read ahead.
+    """
+    function = analyze_job
+    if scheduler is None:
+        if workers <= 1:
+            jobs = PipelineStage('replay', (prepare_job(job) for job in jobs), PREPARED_GAMES_QUEUE, metrics)
+            function = search_job
+        else:
+            jobs = PipelineStage('input', jobs, workers * PREPARED_GAMES_QUEUE, metrics)
+    for job, analysis, counters in run_in_workers(function, jobs, settings, workers):
+        if scheduler:
+            scheduler.finish(job, counters)
+        add_counters(stats, counters)
+        yield job, analysis
+
+# Positions handed to a worker at once (consecutive positions share hash entries)
+POSITION_BATCH_SIZE = 32
 
+# Position batches prepared ahead of the engines by the replay thread
+PREPARED_BATCHES_QUEUE = 8
+
+def run_deduplicated(jobs, settings, workers, stats):
+    """
+    Analyze a whole round with in-run transposition dedup, yielding (job, analysis).
+
+    Every game is replayed and the positions it needs are collected into one
+    set of unique positions (normalized FEN, reference counted); each unique
+    position is searched once across the worker pool, and the results are
+    fanned back out to every game's timeline before scoring.
+
+    Replay and search are pipelined (see analysis/pipeline.py): a producer
+    thread reads and replays the games in gameIndex order and hands over each
+    batch of new unique positions as soon as it is full, so the engines start
+    searching while later games are still being replayed. Positions are
+    searched in first-seen order, so games become complete in roughly
+    gameIndex order; each game is scored and yielded as soon as the last
+    batch it depends on is back.
+
+    With a coarse depth, the whole round is first searched at that depth
+    (pipelined the same way); each game then only sends its escalated
+    positions (see escalation_positions) to the full-depth pass.
+    """
+    timelines = {}
+    histories = {}  # gameIndex -> (root FEN, UCI moves), sent along so engines get the game history
+    replayed = []  # Jobs in gameIndex order, appended by the replay thread once their timeline is planned
+    coarse_depth = settings.get('coarseDepth')
+
+    def replay(job):
+        """Parse (if needed) and replay a game, and plan the positions it needs at full depth."""
+        if job['moveCount'] == 0:
+            return
+        if 'game' not in job:
+            # Indexed input: games are only read from the file now
+            job['game'] = parse_job_game(job, settings)
+            if job['moveCount'] == 0:
+                return
+        timeline = build_eval_timeline(job['game'], settings['sampleRate'], tablebase)
+        timeline['gameIndex'] = job['gameIndex']
+        positions = set(timeline_positions(timeline))
+        if not coarse_depth:
+            # The final position is included for the comeback check
+            positions.add(len(timeline['fens']) - 1)
+        # Positions to score at full depth, and the ones of them the engine has to search
+        timeline['needed'] = sorted(positions)
+        timeline['planned'] = engine_positions(timeline, positions)
+        timelines[job['gameIndex']] = timeline
+        histories[job['gameIndex']] = (timeline['fens'][0], tuple(move.uci() for move in timeline['moves']))
+
+    def add_refs(refs, game_index, timeline):
+        """
+        Count a timeline's planned positions into refs (normalized FEN -> [FEN,
+        references, first-seen order, gameIndex, ply]); returns the new keys.
+        """
+        new_keys = []
+        last_order = 0
+        for index in timeline['planned']:
+            fen = timeline['fens'][index]
+            key = normalize_fen(fen)
+            if key in refs:
+                refs[key][1] += 1
+            else:
+                refs[key] = [fen, 1, len(refs), game_index, index]
+                new_keys.append(key)
+            last_order = max(last_order, refs[key][2])
+        timeline['readyBatch'] = last_order // POSITION_BATCH_SIZE
+        return new_keys
+
+    def report(refs, label):
+        total_refs = sum(ref[1] for ref in refs.values())
+        stats['positionRefs'] = stats.get('positionRefs', 0) + total_refs
+        stats['uniquePositions'] = stats.get('uniquePositions', 0) + len(refs)
+
+        saved = total_refs - len(refs)
+        saved_pct = (saved / total_refs * 100) if total_refs > 0 else 0
+        return (f"♻️  Transposition dedup{label}: {total_refs} positions -> {len(refs)} unique "
+                f"({saved} engine calls saved, {saved_pct:.1f}%)")
+
+    def batch_positions(refs, keys, depth):
+        """Work items for a batch: each position with the history of the game that first reached it."""
+        items = []
+        for key in keys:
+            fen, _, _, game_index, ply = refs[key]
+            root_fen, ucis = histories[game_index]
+            items.append((fen, root_fen, ucis[:ply], depth, game_index))
+        return items
+
+    def replay_batches(refs, depth):
+        """
+        Replay thread: replay every game and yield the first pass's position
+        batches as they fill up. A game is listed in `replayed` before any
+        batch it depends on is handed out.
+        """
+        keys = []
         try:
-            black_elo = int(game.headers.get('BlackElo', 0))
-            black_rating = black_elo if black_elo > 0 else None
-        except (ValueError, TypeError):
-            black_rating = None
-
-        # Extract gameId from headers (GameId or Site URL)
-        game_id = game.headers.get('GameId')
-        if not game_id:
-            site = game.headers.get('Site', '')
-            game_id = site.split('/')[-1] if site else None
-
-        # Count moves in this game
+            for job in jobs:
+                replay(job)
+                timeline = timelines.get(job['gameIndex'])
+                if timeline is not None:
+                    keys.extend(add_refs(refs, job['gameIndex'], timeline))
+                replayed.append(job)
+                while len(keys) >= POSITION_BATCH_SIZE:
+                    yield batch_positions(refs, keys[:POSITION_BATCH_SIZE], depth)
+                    del keys[:POSITION_BATCH_SIZE]
+        finally:
+            if tablebase:
+                tablebase.close()
+        if keys:
+            yield batch_positions(refs, keys, depth)
+
+    def search(work):
+        """Search batches of work items, yielding (batch index, {key: evaluation})."""
+        submitted = collections.deque()
+
+        def submit():
+            for items in work:
+                submitted.append([normalize_fen(item[0]) for item in items])
+                yield items
+
+        for batch_index, (evaluations, counters) in enumerate(run_in_workers(evaluate_positions_job, submit(), settings, workers)):
+            add_counters(stats, counters)
+            yield batch_index, dict(zip(submitted.popleft(), evaluations))
+
+    tablebase = open_tablebase(settings.get('syzygyPath'))
+    first_refs = {}
+    first_pass = search(PipelineStage('replay', replay_batches(first_refs, coarse_depth), PREPARED_BATCHES_QUEUE, metrics))
+
+    if coarse_depth:
+        # Pass one: every needed position at the coarse depth
+        coarse_by_key = {}
+        for _, evaluations in first_pass:
+            coarse_by_key.update(evaluations)
+        print(report(first_refs, f' (coarse pass, depth {coarse_depth})') + '\n', file=sys.stderr)
+
+        # Pass two only gets the positions the coarse evaluations cannot be trusted with
+        refs = {}
+        for job in replayed:
+            timeline = timelines.get(job['gameIndex'])
+            if timeline is None:
+                continue
+            coarse_evals = timeline['coarseEvals'] = [None] * len(timeline['fens'])
+            for index in timeline['planned']:
+                coarse_evals[index] = coarse_by_key[normalize_fen(timeline['fens'][index])]
+            fill_resolved(timeline, coarse_evals, timeline['needed'])
+            deep_positions, escalated = escalation_positions(timeline, coarse_evals)
+            timeline['needed'] = sorted(deep_positions)
+            timeline['planned'] = engine_positions(timeline, deep_positions)
+            add_counters(stats, {'sampledPlies': len(timeline['sampled']), 'escalatedPlies': escalated})
+            add_refs(refs, job['gameIndex'], timeline)
+        print(report(refs, f' (full depth {settings["depth"]})') + '\n', file=sys.stderr)
+        unique_keys = list(refs)
+        batches = search(batch_positions(refs, unique_keys[i:i + POSITION_BATCH_SIZE], None)
+                         for i in range(0, len(unique_keys), POSITION_BATCH_SIZE))
+    else:
+        refs = first_refs
+        batches = first_pass
+
+    def score(job):
+        game = job.pop('game', None)
+        timeline = timelines.get(job['gameIndex'])
+        if timeline is None:
+            return job, None
+        evals = timeline['evals']
+        for index in timeline['planned']:
+            evals[index] = evals_by_key[normalize_fen(timeline['fens'][index])]
+        fill_resolved(timeline, evals, timeline['needed'])
+        if coarse_depth:
+            # Positions that were not escalated keep their coarse evaluation
+            for index in timeline_positions(timeline):
+                if evals[index] is None:
+                    evals[index] = timeline['coarseEvals'][index]
+        analysis = analyze_game(game, None, settings['depth'], settings['sampleRate'], timeline=timeline,
+                                windowed_accuracy=settings.get('windowedAccuracy'))
+        add_counters(stats, resolved_counts(timeline))
+        del timelines[job['gameIndex']]
+        return job, analysis
+
+    def ready(job, batch_index):
+        timeline = timelines.get(job['gameIndex'])
+        return timeline is None or timeline['readyBatch'] <= batch_index
+
+    evals_by_key = {}
+    next_job = 0
+
+    for batch_index, evaluations in batches:
+        evals_by_key.update(evaluations)
+
+        # Games the replay thread has listed so far
+        while next_job < len(replayed) and ready(replayed[next_job], batch_index):
+            yield score(replayed[next_job])
+            next_job += 1
+
+    # Games with no positions to search (e.g. all skipped)
+    while next_job < len(replayed):
+        yield score(replayed[next_job])
+        next_job += 1
+
+    if not coarse_depth:
+        # Only known once every game has been replayed
+        stats['dedupReport'] = report(refs, '')
+
+# Positions per worker searched to estimate throughput for --time-budget
+BUDGET_CALIBRATION_POSITIONS = 8
+
+# Positions handed to a worker at once while calibrating (small, so every worker stays busy)
+TUNE_BATCH_SIZE = 4
+
+def calibration_positions(jobs, count):
+    """
+    Up to `count` unique positions spread evenly over the games of the input
+    jobs, as evaluate_positions_job work items.
+    """
+    items = []
+    seen = set()
+    for job in jobs:
+        game = job['game'] if 'game' in job else parse_job_game(dict(job))
         board = game.board()
-        move_count = 0
-        for _ in game.mainline_moves():
-            move_count += 1
+        root_fen = board.fen()
+        history = []
+        for move in game.mainline_moves():
+            board.push(move)
+            history.append(move.uci())
+            key = normalize_fen(board.fen())
+            if key not in seen and not board.is_game_over():
+                seen.add(key)
+                items.append((board.fen(), root_fen, tuple(history), None, job['gameIndex']))
+    stride = max(1, len(items) / count) if items else 1
+    return [items[int(i * stride)] for i in range(min(count, len(items)))]
+
+def measure_layout(layout, items, settings):
+    """
+    Positions/sec of one engine layout over the calibration positions.
 
-        # Print progress with game info (use \r to overwrite line)
-        progress_pct = ((game_index + 1) / total_games) * 100
-        progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+    Measured from the engine wait time of the workers (divided by the worker
+    count), so engine startup does not weigh on short calibrations.
+    """
+    layout_settings = {**settings, 'threads': layout['threads'], 'hash': layout['hash'],
+                       'pinCpus': layout['pinCpus'], 'cachePath': None}
+    batches = [items[i:i + TUNE_BATCH_SIZE] for i in range(0, len(items), TUNE_BATCH_SIZE)]
+    engine_seconds = 0.0
+    for _, counters in run_in_workers(evaluate_positions_job, batches, layout_settings, layout['workers']):
+        engine_seconds += counters['metrics']['engineSeconds']
+    return len(items) * layout['workers'] / engine_seconds if engine_seconds > 0 else float('inf')
+
+def tune_engines(jobs, settings, positions):
+    """
+    Calibrate worker/thread/hash layouts on a sample of the input jobs and
+    return the fastest as a profile (see analysis/tuning.py).
+    """
+    cpus = len(available_cpus())
+    items = calibration_positions(jobs, positions)
+    layouts = candidate_layouts(cpus, physical_memory_mb())
+    print(f"🎛️  Tuning engines: {len(items)} position(s) at depth {settings['depth']} on {cpus} CPU(s), "
+          f"{len(layouts)} layout(s)", file=sys.stderr)
+
+    def measure(layout):
+        layout['positionsPerSecond'] = round(measure_layout(layout, items, settings), 2)
+        print(f"   {layout['workers']} worker(s) x {layout['threads']} thread(s), {layout['hash']} MB hash"
+              f"{', pinned' if layout['pinCpus'] else ''}: {layout['positionsPerSecond']} positions/s", file=sys.stderr)
+        return layout
+
+    candidates = [measure(layout) for layout in layouts]
+    best = max(candidates, key=lambda layout: layout['positionsPerSecond'])
+    if can_pin() and best['workers'] > 1:
+        pinned = measure({**best, 'pinCpus': True, 'positionsPerSecond': None})
+        candidates.append(pinned)
+        if pinned['positionsPerSecond'] > best['positionsPerSecond']:
+            best = pinned
 
-        # Truncate long names to fit on one line (shorter to avoid wrapping)
-        max_name_len = 20
-        white_short = white[:max_name_len] + '...' if len(white) > max_name_len else white
-        black_short = black[:max_name_len] + '...' if len(black) > max_name_len else black
+    return {
+        **best,
+        'depth': settings['depth'],
+        'cpus': cpus,
+        'engineId': read_engine_id(settings['stockfishPath']),
+        'candidates': candidates
+    }
 
-        # Clear line with spaces, then print progress
-        progress_line = f"[{progress_bar}] {progress_pct:3.0f}% | {game_index + 1}/{total_games} | {white_short} vs {black_short}"
+def apply_profile(args, profile):
+    """Take the engine layout from a profile, except for settings given on the command line."""
+    if args.workers is None:
+        args.workers = profile['workers']
+    if args.threads is None:
+        args.threads = profile['threads']
+    if args.hash is None:
+        args.hash = profile['hash']
+    if not args.pin_cpus:
+        args.pin_cpus = profile['pinCpus']
+
+def merge_main(argv):
+    """
+    `analyze-pgn.py merge`: combine the outputs of --shard runs into one analysis.
 
-        # Skip games with no moves (forfeits, etc.)
-        if move_count == 0:
-            print(f"\r{progress_line:<100} [SKIPPED - no moves]", end='', flush=True, file=sys.stderr)
-            game_index += 1
-            continue
+    Games are put back in gameIndex order and the summary is recomputed from
+    the game records; no engine is started. Shard ply files are read back and
+    either written to one merged --ply-file or inlined as moveTimes.
+    """
+    parser = argparse.ArgumentParser(prog='analyze-pgn.py merge', description='Merge --shard analysis outputs')
+    parser.add_argument('outputs', nargs='+', help='Analysis JSON files written by --shard runs')
+    parser.add_argument('--ply-file', type=str, default=None, help='Write the merged per-ply evaluations to this binary file instead of the JSON output (needs --out)')
+    parser.add_argument('--out', type=str, default=None, help='Write the merged analysis JSON to this file instead of stdout')
+    args = parser.parse_args(argv)
+    if args.ply_file and not args.out:
+        parser.error('--ply-file needs --out FILE (plyFile is stored relative to the JSON file)')
+
+    outputs = []
+    for path in args.outputs:
+        with open(path, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+        if output.get('plyFile'):
+            # Per-ply records of this shard live next to its JSON
+            move_times = read_ply_file(os.path.join(os.path.dirname(path), output['plyFile']))
+            for record in output['games']:
+                record['moveTimes'] = move_times.get(record['gameIndex'], [])
+        outputs.append(output)
 
-        print(f"\r{progress_line:<100}", end='', flush=True, file=sys.stderr)
+    try:
+        merged = merge_outputs(outputs)
+    except ShardError as e:
+        print(f"Cannot merge: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        analysis = analyze_game(game, stockfish, args.depth, args.sample)
+    if args.ply_file:
+        ply_writer = PlyFileWriter(args.ply_file)
+        for record in merged['games']:
+            ply_writer.add(record['gameIndex'], record.pop('moveTimes', []))
+        ply_writer.close()
+        merged['plyFile'] = ply_file_reference(args.ply_file, args.out)
 
-        # Get ratings from metadata if available (JSON input), otherwise use extracted ratings
-        metadata = game_metadata.get(game_index, {})
-        final_white_rating = metadata.get('whiteRating') or white_rating
-        final_black_rating = metadata.get('blackRating') or black_rating
+    print(f"🧩 Merged {len(merged['games'])} game(s) from {len(outputs)} output(s)", file=sys.stderr)
+    if args.out:
+        write_json_atomic(args.out, merged)
+    else:
+        print(json.dumps(merged, indent=2))
 
-        games_analyzed.append({
-            'gameIndex': game_index,
-            'gameId': game_id,
-            'white': white,
-            'black': black,
-            'whiteRating': final_white_rating,
-            'blackRating': final_black_rating,
-            **analysis
-        })
+def rescore_main(argv):
+    """
+    `analyze-pgn.py rescore`: recompute the per-game scores of an analysis from
+    its per-ply evaluations (inline moveTimes or its ply file), e.g. with other
+    move quality thresholds; no engine is started. biggestComeback (which
+    needs the final position's evaluation) is kept as it is.
+    """
+    parser = argparse.ArgumentParser(prog='analyze-pgn.py rescore', description='Re-score an analysis without the engine')
+    parser.add_argument('analysis', help='Analysis JSON file (with moveTimes or a plyFile)')
+    parser.add_argument('--thresholds', type=str, default=None,
+                        help='Win%% loss bounds of excellent,good,inaccuracy,mistake moves '
+                             f'(default: {",".join(map(str, QUALITY_THRESHOLDS))})')
+    parser.add_argument('--windowed-accuracy', action='store_true', help="Also compute Lichess' volatility-weighted windowed accuracy")
+    args = parser.parse_args(argv)
+
+    thresholds = QUALITY_THRESHOLDS
+    if args.thresholds:
+        try:
+            thresholds = tuple(float(value) for value in args.thresholds.split(','))
+        except ValueError:
+            parser.error(f'--thresholds must be numbers, got {args.thresholds!r}')
+        if len(thresholds) != len(QUALITY_THRESHOLDS) or list(thresholds) != sorted(thresholds):
+            parser.error(f'--thresholds needs {len(QUALITY_THRESHOLDS)} increasing values')
 
-        game_index += 1
+    try:
+        with open(args.analysis, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+        ply_games = None
+        if output.get('plyFile'):
+            ply_games = read_ply_file(os.path.join(os.path.dirname(args.analysis), output['plyFile']))
+    except (OSError, ValueError) as e:
+        print(f"Cannot read analysis: {e}", file=sys.stderr)
+        sys.exit(1)
 
-    print(f"\n\n✅ Analysis complete! Processed {total_games} games\n", file=sys.stderr)
-
-    # Find accuracy king, biggest blunder, ACPL extremes, comeback king, lucky escape, stockfish buddy, and inaccuracy king
-    accuracy_king = None
-    biggest_blunder = None
-    comeback_king = None
-    lucky_escape = None
-    stockfish_buddy = None
-    inaccuracy_king = None
-    lowest_acpl = None
-    highest_acpl = None
-    lowest_combined_acpl = None
-    highest_combined_acpl = None
-
-    for game_data in games_analyzed:
-        # Check white accuracy
-        if accuracy_king is None or game_data['whiteAccuracy'] > accuracy_king['accuracy']:
-            accuracy_king = {
-                'player': 'white',
-                'accuracy': game_data['whiteAccuracy'],
-                'acpl': game_data['whiteACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    started = time.perf_counter()
+    for record in output['games']:
+        move_times = ply_games.get(record['gameIndex'], []) if ply_games is not None else record.get('moveTimes', [])
+        if args.windowed_accuracy and any(move['ply'] != move_times[0]['ply'] + i for i, move in enumerate(move_times)):
+            print(f"Cannot re-score with --windowed-accuracy: game {record['gameIndex']} was analyzed with --sample "
+                  f"(every ply is needed)", file=sys.stderr)
+            sys.exit(1)
+        scores = score_plies(move_times_columns(move_times), [move['move'] for move in move_times],
+                             thresholds, args.windowed_accuracy)
+        record.update(scores)
+    output['summary'] = summarize(output['games'])
+
+    print(f"🧮 Re-scored {len(output['games'])} game(s) in {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+    print(json.dumps(output, indent=2))
 
-        # Check black accuracy
-        if accuracy_king is None or game_data['blackAccuracy'] > accuracy_king['accuracy']:
-            accuracy_king = {
-                'player': 'black',
-                'accuracy': game_data['blackAccuracy'],
-                'acpl': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+def index_main(argv):
+    """`analyze-pgn.py index`: build (or refresh) the game index sidecars of PGN files."""
+    parser = argparse.ArgumentParser(prog='analyze-pgn.py index', description='Index PGN files for --pgn')
+    parser.add_argument('files', nargs='+', help='PGN files to index (each gets a sidecar in --index-dir)')
+    parser.add_argument('--index-dir', type=str, default=default_index_dir(), help='Directory of the game index sidecars (default: .cache/pgn-index)')
+    args = parser.parse_args(argv)
 
-        # Check white lowest ACPL
-        if lowest_acpl is None or game_data['whiteACPL'] < lowest_acpl['acpl']:
-            lowest_acpl = {
-                'player': 'white',
-                'acpl': game_data['whiteACPL'],
-                'accuracy': game_data['whiteAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    for path in args.files:
+        games = load_index(path, args.index_dir)
+        print(f"📇 {path}: {len(games)} game(s), {sum(game['plies'] for game in games)} plies "
+              f"-> {sidecar_path(path, args.index_dir)}", file=sys.stderr)
 
-        # Check black lowest ACPL
-        if lowest_acpl is None or game_data['blackACPL'] < lowest_acpl['acpl']:
-            lowest_acpl = {
-                'player': 'black',
-                'acpl': game_data['blackACPL'],
-                'accuracy': game_data['blackAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+def serve_main(argv):
+    """
+    `analyze-pgn.py serve`: keep the engines, cache connections and finished
+    game results warm and analyze batches sent over localhost HTTP (see
+    analysis/service.py), so a small batch only pays for its own searches.
 
-        # Check white highest ACPL
-        if highest_acpl is None or game_data['whiteACPL'] > highest_acpl['acpl']:
-            highest_acpl = {
-                'player': 'white',
-                'acpl': game_data['whiteACPL'],
-                'accuracy': game_data['whiteAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    Settings are fixed when the service starts; a request's output is exactly
+    what analyze-pgn.py prints for the same input and settings. Games analyzed
+    before (in this service or, with the result cache, any run) are reused.
+    """
+    parser = argparse.ArgumentParser(prog='analyze-pgn.py serve', description='Run the analyzer as a local service with warm engines')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--profile', type=str, default=None, help='Engine profile written by --tune to take the engine layout from')
+    add_analysis_arguments(parser)
+    args = parser.parse_args(argv)
+    check_analysis_arguments(parser, args)
 
-        # Check black highest ACPL
-        if highest_acpl is None or game_data['blackACPL'] > highest_acpl['acpl']:
-            highest_acpl = {
-                'player': 'black',
-                'acpl': game_data['blackACPL'],
-                'accuracy': game_data['blackAccuracy'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    if args.stockfish_path is None:
+        args.stockfish_path = find_stockfish_path()
+    if args.profile:
+        try:
+            apply_profile(args, load_profile(args.profile))
+        except (OSError, ValueError) as e:
+            print(f"Cannot load engine profile: {e}", file=sys.stderr)
+            sys.exit(1)
+    workers = max(1, args.workers or default_worker_count())
+    args.threads = args.threads or 1
+    args.hash = args.hash or 16
+    check_engine(args)
+
+    settings = analysis_settings(args, read_engine_id(args.stockfish_path))
+    # Results stay in memory for the service's lifetime without the on-disk cache
+    result_cache = ResultCache(':memory:' if args.no_cache else args.result_cache)
+    counters = {'requests': 0, 'gamesAnalyzed': 0, 'gamesReused': 0}
+    started = time.perf_counter()
+
+    def analyze_request(body, params):
+        for name, value in (('depth', args.depth), ('sample', args.sample)):
+            if name in params and params[name] != str(value):
+                raise ServiceError(f"this service runs with --{name} {value}, the request asked for {params[name]}", 409)
+        request_started = time.perf_counter()
+        game_metadata = {}
+        try:
+            if body.lstrip().startswith('{'):
+                pgn_text, game_metadata = read_json_input(body)
+            else:
+                pgn_text = body
+            jobs = list(with_result_keys(iter_game_jobs(io.StringIO(pgn_text), workers > 1 and args.no_dedup), settings,
+                                         parse=True))
+        except (ValueError, KeyError, AttributeError) as e:
+            raise ServiceError(f'cannot read games: {e!r}', 400)
+
+        jobs, reused, _ = reuse_results(jobs, result_cache, drop_duplicates=False)
+        stats = {'cacheHits': 0, 'cacheMisses': 0}
+        if args.no_dedup:
+            results = run_jobs(jobs, settings, workers, stats)
+        else:
+            results = run_deduplicated(jobs, settings, workers, stats)
+
+        games = []
+        for job, analysis in results:
+            if analysis is None:
+                continue  # No moves
+            result_cache.put(job['resultKey'], analysis)
+            games.append(game_record(job, analysis, args.depth, game_metadata.get(job['gameIndex'])))
+        games += [game_record(job, analysis, args.depth, game_metadata.get(job['gameIndex']))
+                  for job, analysis in reused.values()]
+        games.sort(key=lambda g: g['gameIndex'])
+        # Measurements are not reported per request; keep them from piling up
+        metrics.drain()
+
+        counters['requests'] += 1
+        counters['gamesAnalyzed'] += len(games) - len(reused)
+        counters['gamesReused'] += len(reused)
+        print(f"📨 Request {counters['requests']}: {len(games)} game(s), {len(games) - len(reused)} analyzed, "
+              f"{len(reused)} reused, {stats['cacheHits']} eval cache hit(s) "
+              f"in {time.perf_counter() - request_started:.2f}s", file=sys.stderr)
+        return {'games': games, 'summary': summarize(games)}
+
+    def status():
+        return {
+            'engineId': settings['engineId'],
+            'engineBackend': args.engine_backend,
+            'depth': args.depth,
+            'sampleRate': args.sample,
+            'coarseDepth': args.coarse_depth,
+            'windowedAccuracy': args.windowed_accuracy,
+            'workers': workers,
+            'threads': args.threads,
+            'hash': args.hash,
+            'evalCache': settings['cachePath'],
+            'resultCache': None if args.no_cache else args.result_cache,
+            **counters,
+            'uptimeSeconds': round(time.perf_counter() - started, 1)
+        }
 
-        # Check combined ACPL
-        combined_acpl = game_data['whiteACPL'] + game_data['blackACPL']
-
-        if lowest_combined_acpl is None or combined_acpl < lowest_combined_acpl['combinedACPL']:
-            lowest_combined_acpl = {
-                'combinedACPL': combined_acpl,
-                'whiteACPL': game_data['whiteACPL'],
-                'blackACPL': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    try:
+        server = AnalysisServer(args.host, args.port, analyze_request, status)
+    except OSError as e:
+        print(f"Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        if highest_combined_acpl is None or combined_acpl > highest_combined_acpl['combinedACPL']:
-            highest_combined_acpl = {
-                'combinedACPL': combined_acpl,
-                'whiteACPL': game_data['whiteACPL'],
-                'blackACPL': game_data['blackACPL'],
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    # Engines start once, before the first request
+    global warm_pool
+    if workers > 1:
+        warm_pool = multiprocessing.Pool(workers, initializer=init_pool_worker,
+                                         initargs=(settings, multiprocessing.Value('i', 0)))
+    else:
+        init_worker(settings)
+    # Stop cleanly (engines closed) on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
 
-        # Check biggest blunder (compare by severity, not just cpLoss)
-        if game_data['biggestBlunder']:
-            if biggest_blunder is None or game_data['biggestBlunder']['severity'] > biggest_blunder.get('severity', 0):
-                biggest_blunder = {
-                    **game_data['biggestBlunder'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex'],
-                    'gameId': game_data['gameId']
-                }
-
-        # Check biggest comeback
-        if game_data['biggestComeback']:
-            if comeback_king is None or game_data['biggestComeback']['swing'] > comeback_king.get('swing', 0):
-                comeback_king = {
-                    **game_data['biggestComeback'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex'],
-                    'gameId': game_data['gameId']
-                }
-
-        # Check lucky escape
-        if game_data['luckyEscape']:
-            if lucky_escape is None or game_data['luckyEscape']['escapeAmount'] > lucky_escape.get('escapeAmount', 0):
-                lucky_escape = {
-                    **game_data['luckyEscape'],
-                    'white': game_data['white'],
-                    'black': game_data['black'],
-                    'gameIndex': game_data['gameIndex'],
-                    'gameId': game_data['gameId']
-                }
-
-        # Check Stockfish Buddy (most engine-level moves)
-        if stockfish_buddy is None or game_data['whiteEngineMoves'] > stockfish_buddy.get('engineMoves', 0):
-            stockfish_buddy = {
-                'player': 'white',
-                'engineMoves': game_data['whiteEngineMoves'],
-                'totalMoves': sum(game_data['whiteMoveQuality'].values()),
-                'percentage': round(game_data['whiteEngineMoves'] / sum(game_data['whiteMoveQuality'].values()) * 100, 1) if sum(game_data['whiteMoveQuality'].values()) > 0 else 0,
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    print(f"🛰️  Analysis service on http://{args.host}:{args.port} | Depth: {args.depth} | Sample rate: every {args.sample} move(s) | "
+          f"Workers: {workers} | Engine: {settings['engineId']} ({args.threads} thread(s), {args.hash} MB hash)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if warm_pool is not None:
+            warm_pool.terminate()
+            warm_pool.join()
+            warm_pool = None
+        close_worker()
+        result_cache.close()
+        print(f"🛑 Analysis service stopped after {counters['requests']} request(s)", file=sys.stderr)
+
+def follow_round(args):
+    """
+    --follow: analyze the games.pgn files under the given directories while a
+    round is broadcast (see analysis/live.py), until interrupted or, with
+    --follow-idle, until the files stop changing.
+
+    One warm engine follows every game. Each game keeps its evaluation
+    timeline between polls, so a poll only searches the positions of plies
+    that arrived since the last one (a game whose moves were corrected is
+    replayed from scratch, its known positions coming from the eval cache);
+    the whole evaluation vector is then re-scored. After every change the
+    analysis of all games and the summary are rewritten to --out atomically,
+    exactly as a run over the current files (concatenated in path order)
+    would write them.
+    """
+    args.threads = args.threads or 1
+    args.hash = args.hash or 16
+    settings = analysis_settings(args, None if args.no_cache else read_engine_id(args.stockfish_path))
+    live = LiveRound(args.follow)
+
+    print(f"\n📡 Following {', '.join(args.follow)} every {args.follow_interval:g}s -> {args.out}", file=sys.stderr)
+    print(f"⚙️  Depth: {args.depth} | Sample rate: every {args.sample} move(s) | "
+          f"Engine: {args.engine_backend} ({args.threads} thread(s), {args.hash} MB hash)\n", file=sys.stderr)
+
+    # Stop cleanly (engine closed, cache flushed) on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    init_worker(settings)
+    last_change = time.perf_counter()
+    updates_written = 0
+
+    def write_output():
+        """Rewrite --out from the latest analysis of every game (games still waiting keep their previous one)."""
+        nonlocal updates_written
+        games = []
+        for game_index, followed in enumerate(live.ordered()):
+            if followed.analysis is None:
+                continue  # No moves yet, or not analyzed yet
+            games.append(game_record(dict(followed.job, gameIndex=game_index), followed.analysis, args.depth))
+        write_json_atomic(args.out, {'games': games, 'summary': summarize(games)})
+        if worker_cache:
+            worker_cache.flush()
+        # Measurements are not reported while following; keep them from piling up
+        metrics.drain()
+        updates_written += 1
+        in_progress = sum(1 for followed in live.ordered() if not followed.finished)
+        print(f"💾 {args.out}: {len(games)} game(s), {in_progress} in progress", file=sys.stderr)
 
-        if stockfish_buddy is None or game_data['blackEngineMoves'] > stockfish_buddy.get('engineMoves', 0):
-            stockfish_buddy = {
-                'player': 'black',
-                'engineMoves': game_data['blackEngineMoves'],
-                'totalMoves': sum(game_data['blackMoveQuality'].values()),
-                'percentage': round(game_data['blackEngineMoves'] / sum(game_data['blackMoveQuality'].values()) * 100, 1) if sum(game_data['blackMoveQuality'].values()) > 0 else 0,
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    try:
+        while True:
+            updates = live.poll()
+            last_write = time.perf_counter()
+            for status, followed, game, new_plies in updates:
+                if status == 'removed':
+                    continue
+                if followed.timeline is None:
+                    followed.timeline = build_eval_timeline(game, args.sample, worker_tablebase)
+                else:
+                    extend_eval_timeline(followed.timeline, list(game.mainline())[len(followed.timeline['moves']):],
+                                         args.sample, worker_tablebase)
+                followed.job = game_job(game, None)
+                followed.analysis = analyze_game(game, worker_engine, args.depth, args.sample, worker_cache,
+                                                 followed.timeline, windowed_accuracy=args.windowed_accuracy) \
+                    if followed.ucis else None
+                print(f"   {time.strftime('%H:%M:%S')} {followed.path}: {followed.job['white']} "
+                      f"vs {followed.job['black']} {status}{f', +{new_plies} plies' if new_plies > 0 else ''} "
+                      f"({len(followed.ucis)} plies{', ' + followed.job['result'] if followed.finished else ''})", file=sys.stderr)
+                # Catching up with many changed games (e.g. joining a round in progress): publish as it goes
+                if time.perf_counter() - last_write >= args.follow_interval:
+                    write_output()
+                    last_write = time.perf_counter()
+
+            if updates:
+                last_change = time.perf_counter()
+                write_output()
+            elif args.follow_idle is not None and time.perf_counter() - last_change >= args.follow_idle:
+                print(f"\n⏹️  No changes for {args.follow_idle:g}s, stopped following", file=sys.stderr)
+                break
+            time.sleep(args.follow_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_worker()
+    print(f"✅ Followed {len(live.games)} game(s), {updates_written} update(s) written to {args.out}", file=sys.stderr)
+
+def analyze_rounds(args):
+    """
+    --source: analyze several rounds of the FIDE source tree (see
+    analysis/source.py) in one run and write each round's analysis JSON to the
+    --out directory as soon as that round is finished.
+
+    The games.pgn files of a round are read in place through their game index
+    (see analysis/pgnindex.py), numbered as if concatenated. The engines (a
+    warm pool, or one in-process engine), their eval caches and the result
+    cache are shared by every round, so start-up is paid once and positions
+    seen in an earlier round are not searched again.
+    """
+    try:
+        found = round_pgn_files(args.source)
+    except OSError as e:
+        print(f"Cannot read source directory: {e}", file=sys.stderr)
+        sys.exit(1)
+    round_numbers = sorted(found if args.rounds is None else args.rounds & set(found))
+    for round_number in sorted((args.rounds or set()) - set(found)):
+        print(f"⚠️  No PGN files found for Round {round_number} in {args.source}", file=sys.stderr)
+    if not round_numbers:
+        print(f"Cannot analyze: no round<N>game<M>/games.pgn files in {args.source}", file=sys.stderr)
+        sys.exit(1)
 
-        # Check Inaccuracy King (most inaccuracies)
-        if inaccuracy_king is None or game_data['whiteMoveQuality']['inaccuracies'] > inaccuracy_king.get('inaccuracies', 0):
-            inaccuracy_king = {
-                'player': 'white',
-                'inaccuracies': game_data['whiteMoveQuality']['inaccuracies'],
-                'totalMoves': sum(game_data['whiteMoveQuality'].values()),
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    try:
+        with metrics.timer('pgnParse'):
+            rounds = [(round_number, list(iter_indexed_jobs(
+                          [(path, load_index(path, args.index_dir)) for path in found[round_number]])))
+                      for round_number in round_numbers]
+    except OSError as e:
+        print(f"Cannot read PGN file: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        if inaccuracy_king is None or game_data['blackMoveQuality']['inaccuracies'] > inaccuracy_king.get('inaccuracies', 0):
-            inaccuracy_king = {
-                'player': 'black',
-                'inaccuracies': game_data['blackMoveQuality']['inaccuracies'],
-                'totalMoves': sum(game_data['blackMoveQuality'].values()),
-                'white': game_data['white'],
-                'black': game_data['black'],
-                'gameIndex': game_data['gameIndex'],
-                'gameId': game_data['gameId']
-            }
+    workers = max(1, args.workers or default_worker_count())
+    args.threads = args.threads or 1
+    args.hash = args.hash or 16
+    settings = analysis_settings(args, None if args.no_cache else read_engine_id(args.stockfish_path))
+    result_cache = None if args.no_cache else ResultCache(args.result_cache)
+    stats = {'cacheHits': 0, 'cacheMisses': 0}
+    eta = EtaTracker(sum(job['moveCount'] for _, jobs in rounds for job in jobs))
+    run_started = time.perf_counter()
 
-    # Find worst blunder by a strong GM (2600+ rating)
-    not_so_super_gm = None
-    for game_data in games_analyzed:
-        if game_data['biggestBlunder']:
-            blunder = game_data['biggestBlunder']
-            blunder_player = blunder['player']
-
-            # Check if the blunderer is a 2600+ player (strong GM level)
-            player_rating = None
-            if blunder_player == 'white' and game_data.get('whiteRating'):
-                player_rating = game_data['whiteRating']
-                player_name = game_data['white']
-            elif blunder_player == 'black' and game_data.get('blackRating'):
-                player_rating = game_data['blackRating']
-                player_name = game_data['black']
-
-            if player_rating and player_rating >= 2600:
-                # Track worst blunder by a 2700+ player
-                if not_so_super_gm is None or blunder['severity'] > not_so_super_gm.get('severity', 0):
-                    not_so_super_gm = {
-                        **blunder,
-                        'rating': player_rating,
-                        'playerName': player_name,
-                        'white': game_data['white'],
-                        'black': game_data['black'],
-                        'whiteRating': game_data.get('whiteRating'),
-                        'blackRating': game_data.get('blackRating'),
-                        'gameIndex': game_data['gameIndex'],
-                        'gameId': game_data['gameId']
-                    }
-
-    # Output JSON
-    output = {
-        'games': games_analyzed,
-        'summary': {
-            'accuracyKing': accuracy_king,
-            'biggestBlunder': biggest_blunder,
-            'comebackKing': comeback_king,
-            'luckyEscape': lucky_escape,
-            'stockfishBuddy': stockfish_buddy,
-            'inaccuracyKing': inaccuracy_king,
-            'lowestACPL': lowest_acpl,
-            'highestACPL': highest_acpl,
-            'lowestCombinedACPL': lowest_combined_acpl,
-            'highestCombinedACPL': highest_combined_acpl,
-            'notSoSuperGM': not_so_super_gm
-        }
+    print(f"\n🔬 Stockfish Analysis Starting...", file=sys.stderr)
+    print(f"📂 {args.source}: round(s) {', '.join(map(str, round_numbers))} | "
+          f"{sum(len(jobs) for _, jobs in rounds)} games -> {args.out}", file=sys.stderr)
+    print(f"⚙️  Depth: {args.depth} | Sample rate: every {args.sample} move(s) | Workers: {workers} | "
+          f"Engine: {args.engine_backend} ({args.threads} thread(s), {args.hash} MB hash"
+          f"{', pinned' if args.pin_cpus else ''})", file=sys.stderr)
+    if args.coarse_depth:
+        print(f"🔭 Adaptive depth: every ply at depth {args.coarse_depth}, critical plies at depth {args.depth}", file=sys.stderr)
+    print(f"⏱️  Total plies: {eta.total_plies} (ETA shown once the first games finish)\n", file=sys.stderr)
+
+    # Engines start once, for every round
+    global warm_pool
+    if workers > 1:
+        warm_pool = multiprocessing.Pool(workers, initializer=init_pool_worker,
+                                         initargs=(settings, multiprocessing.Value('i', 0)))
+    else:
+        init_worker(settings)
+    # Stop cleanly (engines closed, finished rounds kept) on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    rounds_written = 0
+    try:
+        for round_number, round_jobs in rounds:
+            round_started = time.perf_counter()
+            jobs = iter(round_jobs)
+            reused = {}
+            if result_cache:
+                jobs = with_result_keys(jobs, settings, parse=args.changed_only)
+            if args.changed_only:
+                jobs, reused, dropped = reuse_results(jobs, result_cache, eta)
+                print(f"♻️  Round {round_number}: {len(reused)} unchanged game(s) reused, {len(jobs)} new or changed "
+                      f"game(s) to analyze{f', {len(dropped)} duplicate game(s) dropped' if dropped else ''}", file=sys.stderr)
+
+            if args.no_dedup:
+                results = run_jobs(jobs, settings, workers, stats)
+            else:
+                results = run_deduplicated(jobs, settings, workers, stats)
+
+            games = []
+            for games_seen, (job, analysis) in enumerate(results, len(reused) + 1):
+                eta.advance(job['moveCount'])
+                progress_pct = games_seen / len(round_jobs) * 100
+                progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+                progress_line = (f"[{progress_bar}] {progress_pct:3.0f}% | Round {round_number}: {games_seen}/{len(round_jobs)} | "
+                                 f"{job['white'][:20]} vs {job['black'][:20]}")
+                remaining = eta.eta_seconds()
+                if remaining is not None:
+                    progress_line += f" | ETA {format_duration(remaining)} ({eta.plies_per_second():.0f} plies/s)"
+                print(f"\r{progress_line:<100}", end='', flush=True, file=sys.stderr)
+                if analysis is None:
+                    continue  # No moves
+                record = game_record(job, analysis, args.depth)
+                if result_cache and 'resultKey' in job:
+                    result_cache.put(job['resultKey'], analysis)
+                games.append(record)
+            games += [game_record(job, analysis, args.depth) for job, analysis in reused.values()]
+            games.sort(key=lambda g: g['gameIndex'])
+
+            output_path = round_output_path(args.out, round_number)
+            with metrics.timer('summary'):
+                summary = summarize(games)
+            output = {'games': games, 'summary': summary}
+            with metrics.timer('serialization'):
+                if args.ply_file:
+                    ply_path = args.ply_file.replace(ROUND_PLACEHOLDER, str(round_number))
+                    ply_writer = PlyFileWriter(ply_path)
+                    for record in games:
+                        ply_writer.add(record['gameIndex'], record.pop('moveTimes'))
+                    ply_writer.close()
+                    output['plyFile'] = ply_file_reference(ply_path, output_path)
+                write_json_atomic(output_path, output)
+            rounds_written += 1
+            # Measurements are not reported per round; keep them from piling up
+            metrics.drain()
+            stats.pop('metrics', None)
+            print(f"\n✅ Round {round_number}: {len(games)} game(s) in {format_duration(time.perf_counter() - round_started)} "
+                  f"-> {output_path}", file=sys.stderr)
+            if stats.get('dedupReport'):
+                print(stats.pop('dedupReport'), file=sys.stderr)
+            print('', file=sys.stderr)
+    except KeyboardInterrupt:
+        print(f"\n\n⏹️  Interrupted: {rounds_written} of {len(rounds)} round(s) written", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if warm_pool is not None:
+            warm_pool.terminate()
+            warm_pool.join()
+            warm_pool = None
+        close_worker()
+
+    print(f"✅ Analysis complete! {rounds_written} round(s) in {format_duration(time.perf_counter() - run_started)}\n",
+          file=sys.stderr)
+    report_caches(args, settings, stats, result_cache)
+
+def report_caches(args, settings, stats, result_cache):
+    """Trim the eval cache to --cache-max-entries, print both caches' counters and close the result cache."""
+    if settings['cachePath']:
+        cache = EvalCache(settings['cachePath'], settings['engineId'], args.depth, args.cache_max_entries)
+        evicted = cache.evict()
+        lookups = stats['cacheHits'] + stats['cacheMisses']
+        hit_rate = (stats['cacheHits'] / lookups * 100) if lookups > 0 else 0
+        print(f"💾 Eval cache: {stats['cacheHits']} hits, {stats['cacheMisses']} misses ({hit_rate:.1f}% hit rate)", file=sys.stderr)
+        print(f"   {cache.entry_count()} positions, {cache.size_bytes() / (1024 * 1024):.1f} MB"
+              f"{f', {evicted} evicted' if evicted else ''} ({settings['cachePath']})\n", file=sys.stderr)
+        cache.close()
+
+    if result_cache:
+        print(f"🗃️  Result cache: {result_cache.hits} game(s) reused, {result_cache.stores} stored, "
+              f"{result_cache.entry_count()} games ({args.result_cache})\n", file=sys.stderr)
+        result_cache.close()
+
+# Inputs and per-run outputs of a single analysis, which the --follow and --source modes replace
+SINGLE_RUN_FLAGS = ('--json-input', '--round-json', '--pgn', '--stream', '--games', '--shard', '--tune',
+                    '--time-budget', '--checkpoint', '--metrics')
+# --source writes one --ply-file per round, --follow rewrites only the JSON
+FOLLOW_CONFLICTS = SINGLE_RUN_FLAGS + ('--ply-file', '--source', '--coarse-depth', '--changed-only')
+SOURCE_CONFLICTS = SINGLE_RUN_FLAGS + ('--follow',)
+ENGINE_LAYOUT_FLAGS = ('--workers', '--profile', '--pin-cpus')
+
+def reject_flags(parser, args, mode, flags, reason=None):
+    """Exit with a usage error if any of the flags was given together with a mode flag such as --follow."""
+    given = [flag for flag in flags if getattr(args, flag[2:].replace('-', '_')) not in (None, False)]
+    if given:
+        parser.error(f"{mode} cannot be combined with {', '.join(given)}{f' ({reason})' if reason else ''}")
+
+def parse_game_selection(spec):
+    """gameIndex values of a --games spec like "3,7,12-15"; ValueError if malformed."""
+    selection = set()
+    for part in spec.split(','):
+        first, _, last = part.strip().partition('-')
+        first = int(first)
+        last = int(last) if last else first
+        if first < 0 or last < first:
+            raise ValueError(f"invalid range {part.strip()!r}")
+        selection.update(range(first, last + 1))
+    return selection
+
+def add_analysis_arguments(parser):
+    """Engine, search and cache options shared by the analyzer and the analysis service."""
+    parser.add_argument('--depth', type=int, default=15, help='Stockfish search depth (default: 15)')
+    parser.add_argument('--sample', type=int, default=1, help='Analyze every Nth move (default: 1 = all moves)')
+    parser.add_argument('--coarse-depth', type=int, default=None, help='Search every ply at this depth first and re-search only the plies that matter at --depth')
+    parser.add_argument('--stockfish-path', type=str, default=None, help='Path to Stockfish binary (auto-detected if not specified)')
+    parser.add_argument('--engine-backend', choices=sorted(ENGINE_BACKENDS), default='uci', help='uci: persistent python-chess session with move history (default); stockfish: stockfish package wrapper')
+    parser.add_argument('--threads', type=int, default=None, help='Stockfish Threads per engine (default: 1, or the --profile value)')
+    parser.add_argument('--hash', type=int, default=None, help='Stockfish Hash size in MB per engine (default: 16, or the --profile value)')
+    parser.add_argument('--pin-cpus', action='store_true', help='Pin each worker process and its engine to its own CPUs')
+    parser.add_argument('--syzygy', type=str, default=None, help='Directory of Syzygy tablebase files used to score few-piece positions without the engine')
+    parser.add_argument('--workers', type=int, default=None, help='Number of parallel engine processes (default: CPU core count, or the --profile value)')
+    parser.add_argument('--cache', type=str, default=default_cache_path(), help='Path to the persistent evaluation cache (default: .cache/eval-cache.sqlite)')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the persistent evaluation cache')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES, help=f'Evict least recently used positions beyond this many (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--index-dir', type=str, default=default_index_dir(), help='Directory of the --pgn / --source game index sidecars (default: .cache/pgn-index)')
+    parser.add_argument('--result-cache', type=str, default=default_result_cache_path(), help='Path to the cache of finished game analyses (default: .cache/game-results.sqlite)')
+    parser.add_argument('--no-dedup', action='store_true', help='Analyze games one at a time instead of searching unique positions across the round')
+    parser.add_argument('--windowed-accuracy', action='store_true', help="Also compute Lichess' volatility-weighted windowed accuracy (whiteWindowedAccuracy, blackWindowedAccuracy)")
+
+def check_analysis_arguments(parser, args):
+    """Reject invalid combinations of the add_analysis_arguments options."""
+    if args.coarse_depth is not None and not 0 < args.coarse_depth < args.depth:
+        parser.error('--coarse-depth must be between 1 and --depth - 1')
+    if args.syzygy and not os.path.isdir(args.syzygy):
+        parser.error(f'--syzygy directory not found: {args.syzygy}')
+    if args.pin_cpus and not can_pin():
+        parser.error('--pin-cpus is not supported on this platform')
+    if args.windowed_accuracy and args.sample > 1:
+        parser.error('--windowed-accuracy needs every ply scored and cannot be combined with --sample')
+
+def check_engine(args):
+    """Start and stop the engine once, exiting with install hints if it does not start."""
+    try:
+        open_engine(args.engine_backend, args.stockfish_path, args.depth, args.threads or 1, args.hash or 16).close()
+    except Exception as e:
+        print(f"Error initializing Stockfish: {e}", file=sys.stderr)
+        print("Install Stockfish: brew install stockfish (macOS) or apt-get install stockfish (Linux)", file=sys.stderr)
+        sys.exit(1)
+
+def analysis_settings(args, engine_id):
+    """Settings handed to every engine worker (see init_worker)."""
+    return {
+        'stockfishPath': args.stockfish_path,
+        'engineBackend': args.engine_backend,
+        'threads': args.threads,
+        'hash': args.hash,
+        'pinCpus': args.pin_cpus,
+        'depth': args.depth,
+        'sampleRate': args.sample,
+        'coarseDepth': args.coarse_depth,
+        'windowedAccuracy': args.windowed_accuracy,
+        'syzygyPath': args.syzygy,
+        'cachePath': None if args.no_cache else args.cache,
+        'cacheMaxEntries': args.cache_max_entries,
+        'engineId': engine_id,
+        # Games parsed for analysis are keyed for the result cache (see parse_job_game)
+        'resultKeys': not args.no_cache
     }
 
-    print(json.dumps(output, indent=2))
+def main():
+    if sys.argv[1:2] == ['merge']:
+        merge_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['index']:
+        index_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['rescore']:
+        rescore_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['serve']:
+        serve_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description='Analyze chess PGN with Stockfish',
+                                     epilog='Run "analyze-pgn.py merge -h" to merge --shard outputs, '
+                                            '"analyze-pgn.py index -h" to index PGN files for --pgn, '
+                                            '"analyze-pgn.py rescore -h" to re-score an analysis without the engine, '
+                                            '"analyze-pgn.py serve -h" to run the analyzer as a local service with warm engines.')
+    add_analysis_arguments(parser)
+    parser.add_argument('--json-input', action='store_true', help='Read JSON format with game metadata (includes ratings)')
+    parser.add_argument('--pgn', type=str, nargs='+', default=None, help='Read these PGN files (in order) through their game index instead of stdin')
+    parser.add_argument('--games', type=str, default=None, help='Only analyze these gameIndex values, e.g. "3,7,12-15"')
+    parser.add_argument('--round-json', action='store_true', help='Read a consolidated/enriched round file (moveList moves, no PGN parsing); records keep matchId and gameNumber')
+    parser.add_argument('--tune', action='store_true', help='Calibrate workers x threads x hash (and pinning) on a sample of the input first, save the fastest to --profile and use it')
+    parser.add_argument('--tune-positions', type=int, default=200, help='Positions searched per layout while tuning (default: 200)')
+    parser.add_argument('--profile', type=str, default=None, help=f'Engine profile file to load (or to write with --tune, default: {os.path.relpath(default_profile_path())})')
+    parser.add_argument('--changed-only', action='store_true', help='Reuse cached results of unchanged games, analyze only new or changed games and drop exact duplicate games')
+    parser.add_argument('--checkpoint', type=str, default=None, help='Append each finished game to this JSONL file as soon as it is done')
+    parser.add_argument('--resume', action='store_true', help='Skip games already in the --checkpoint file and merge their results')
+    parser.add_argument('--stream', action='store_true', help='Read games one at a time and write one JSON line per game, then a summary line')
+    parser.add_argument('--ply-file', type=str, default=None, help='Write per-ply evaluations (moveTimes) to this compact binary file instead of the JSON output; with --source, one file per round named by a {round} placeholder')
+    parser.add_argument('--metrics', type=str, default=None, help='Write phase timings, engine call counts and latency histogram to this JSON file')
+    parser.add_argument('--time-budget', type=float, default=None, help='Finish within this many minutes: award-relevant games go first and deepest, later games get a lower depth if needed')
+    parser.add_argument('--shard', type=str, default=None, help='Analyze only shard i of N (e.g. 3/16); games are split by ply count, see "merge"')
+    parser.add_argument('--out', type=str, default=None, help='Write the analysis JSON to this file (atomically: written to a temporary file, then renamed) instead of stdout; with --source, the directory of the round-N-analysis.json files')
+    parser.add_argument('--source', type=str, default=None, help='Read the round<N>game<M>/games.pgn files of this FIDE source tree (e.g. _SRC/cup2025) and write one analysis per round to --out, sharing the engines and caches')
+    parser.add_argument('--rounds', type=str, default=None, help='Rounds to analyze with --source, e.g. "1-6" or "2,5" (default: every round found)')
+    parser.add_argument('--follow', type=str, nargs='+', default=None, help='Live mode: keep analyzing the games.pgn files under these directories as plies arrive, rewriting --out after every change')
+    parser.add_argument('--follow-interval', type=float, default=5, help='Seconds between checks for new plies with --follow (default: 5)')
+    parser.add_argument('--follow-idle', type=float, default=None, help='Stop following once the files have not changed for this many seconds (default: until interrupted)')
+    args = parser.parse_args()
+
+    check_analysis_arguments(parser, args)
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint PATH')
+    if args.stream and (args.json_input or args.round_json or args.resume):
+        parser.error('--stream cannot be combined with --json-input, --round-json or --resume')
+    if sum(map(bool, (args.json_input, args.round_json, args.pgn, args.stream))) > 1:
+        parser.error('--json-input, --round-json, --pgn and --stream are different inputs; pick one')
+    selection = None
+    if args.games:
+        if args.stream:
+            parser.error('--games cannot be combined with --stream')
+        try:
+            selection = parse_game_selection(args.games)
+        except ValueError as e:
+            parser.error(f'--games: {e}')
+    if args.time_budget is not None:
+        if args.time_budget <= 0:
+            parser.error('--time-budget must be a positive number of minutes')
+        if args.stream or args.coarse_depth:
+            parser.error('--time-budget cannot be combined with --stream or --coarse-depth')
+    if args.changed_only and (args.stream or args.no_cache):
+        parser.error('--changed-only cannot be combined with --stream or --no-cache')
+    if args.tune and args.stream:
+        parser.error('--tune samples the whole input and cannot be combined with --stream')
+    if args.out and args.stream:
+        parser.error('--out cannot be combined with --stream (one JSON line per game goes to stdout)')
+    if args.ply_file and not (args.out or args.stream or args.source):
+        parser.error('--ply-file needs --out FILE (plyFile is stored relative to the JSON file)')
+    if args.follow:
+        if not args.out:
+            parser.error('--follow needs --out PATH (rewritten after every change)')
+        reject_flags(parser, args, '--follow', FOLLOW_CONFLICTS)
+        reject_flags(parser, args, '--follow', ENGINE_LAYOUT_FLAGS, 'it analyzes with one in-process engine')
+        if args.follow_interval <= 0:
+            parser.error('--follow-interval must be a positive number of seconds')
+    if args.rounds and not args.source:
+        parser.error('--rounds requires --source DIR')
+    if args.source:
+        if not args.out:
+            parser.error('--source needs --out DIR (one round-N-analysis.json per round)')
+        if os.path.isfile(args.out):
+            parser.error(f'--out must be a directory with --source: {args.out} is a file')
+        reject_flags(parser, args, '--source', SOURCE_CONFLICTS)
+        if args.ply_file and ROUND_PLACEHOLDER not in args.ply_file:
+            parser.error(f'--ply-file needs a {ROUND_PLACEHOLDER} placeholder with --source '
+                         f'(e.g. data/analysis/round-{ROUND_PLACEHOLDER}-plies.bin)')
+        if args.rounds:
+            try:
+                args.rounds = parse_game_selection(args.rounds)
+            except ValueError as e:
+                parser.error(f'--rounds: {e}')
+    shard = None
+    if args.shard:
+        if args.stream:
+            parser.error('--shard needs the whole input and cannot be combined with --stream')
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(f'--shard: {e}')
+
+    # Auto-detect Stockfish path if not specified
+    if args.stockfish_path is None:
+        args.stockfish_path = find_stockfish_path()
+
+    # A saved engine layout (flags given on the command line still win)
+    if args.profile and not args.tune:
+        try:
+            profile = load_profile(args.profile)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load engine profile: {e}", file=sys.stderr)
+            sys.exit(1)
+        apply_profile(args, profile)
+        if profile.get('cpus') != len(available_cpus()) or profile.get('depth') != args.depth:
+            print(f"⚠️  {args.profile} was tuned for {profile.get('cpus')} CPU(s) at depth {profile.get('depth')}, "
+                  f"this run has {len(available_cpus())} CPU(s) at depth {args.depth}", file=sys.stderr)
+
+    # Make sure Stockfish starts before reading input (workers start their own engines)
+    check_engine(args)
+
+    if args.follow:
+        follow_round(args)
+        return
+    if args.source:
+        analyze_rounds(args)
+        return
+
+    run_started = time.perf_counter()
+
+    # Parse input based on format
+    game_metadata = {}  # Maps game_index to {white, black, whiteRating, blackRating}
+    listed_jobs = None  # Jobs known without parsing PGN text (--round-json, --pgn)
+    if args.stream:
+        # Games are parsed straight from stdin as they are needed
+        pgn_text = None
+    elif args.round_json:
+        pgn_text = None
+        try:
+            with metrics.timer('pgnParse'):
+                listed_jobs = list(iter_round_jobs(sys.stdin))
+        except (RoundFileError, json.JSONDecodeError, KeyError) as e:
+            print(f"Cannot read round file: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.pgn:
+        # Games are read by byte offset when they are analyzed
+        pgn_text = None
+        try:
+            with metrics.timer('pgnParse'):
+                listed_jobs = list(iter_indexed_jobs([(path, load_index(path, args.index_dir)) for path in args.pgn]))
+        except OSError as e:
+            print(f"Cannot read PGN file: {e}", file=sys.stderr)
+            sys.exit(1)
+    elif args.json_input:
+        pgn_text, game_metadata = read_json_input(sys.stdin.read())
+    else:
+        pgn_text = sys.stdin.read()
+
+    if listed_jobs is not None and selection is not None:
+        listed_jobs = [job for job in listed_jobs if job['gameIndex'] in selection]
+
+    def input_jobs(pack_pgn=False):
+        """A pass over the (selected) input games as analysis jobs, in gameIndex order."""
+        if listed_jobs is not None:
+            # Move-list games and index references are small enough to send to workers as they are
+            return iter(listed_jobs)
+        jobs = iter_game_jobs(sys.stdin if args.stream else io.StringIO(pgn_text), pack_pgn)
+        if selection is not None:
+            jobs = (job for job in jobs if job['gameIndex'] in selection)
+        return jobs
+
+    if args.tune:
+        profile = tune_engines(input_jobs(), {
+            'stockfishPath': args.stockfish_path,
+            'engineBackend': args.engine_backend,
+            'depth': args.depth,
+            'syzygyPath': None
+        }, args.tune_positions)
+        profile_path = args.profile or default_profile_path()
+        save_profile(profile_path, profile)
+        apply_profile(args, profile)
+        print(f"🎛️  Fastest: {profile['workers']} worker(s) x {profile['threads']} thread(s), {profile['hash']} MB hash"
+              f"{', pinned' if profile['pinCpus'] else ''} ({profile['positionsPerSecond']} positions/s), "
+              f"saved to {profile_path}", file=sys.stderr)
+
+    # Defaults for whatever neither the command line nor a profile set
+    if args.workers is None:
+        args.workers = default_worker_count()
+    if args.threads is None:
+        args.threads = 1
+    if args.hash is None:
+        args.hash = 16
+
+    # Parse games
+    games_analyzed = []
+
+    if args.stream:
+        total_games = None
+        workers = max(1, args.workers)
+    else:
+        # First pass: count total games
+        if listed_jobs is not None:
+            total_games = len(listed_jobs)
+        else:
+            total_games = pgn_text.count('[Event ')
+            if selection is not None:
+                total_games = len([game_index for game_index in selection if game_index < total_games])
+        if shard:
+            # Every shard splits the whole input the same way and keeps its own part
+            shard_jobs = select_shard(input_jobs(), *shard)
+            shard_positions = {job['gameIndex']: position for position, job in enumerate(shard_jobs, 1)}
+            total_games = len(shard_jobs)
+        workers = max(1, min(args.workers, total_games))
+
+    print(f"\n🔬 Stockfish Analysis Starting...", file=sys.stderr)
+    print(f"📊 Total games to analyze: {total_games if total_games is not None else 'streaming'}"
+          f"{f' (shard {shard[0]}/{shard[1]})' if shard else ''}", file=sys.stderr)
+    print(f"⚙️  Depth: {args.depth} | Sample rate: every {args.sample} move(s) | Workers: {workers} | "
+          f"Engine: {args.engine_backend} ({args.threads} thread(s), {args.hash} MB hash"
+          f"{', pinned' if args.pin_cpus else ''})", file=sys.stderr)
+    if args.coarse_depth:
+        print(f"🔭 Adaptive depth: every ply at depth {args.coarse_depth}, critical plies at depth {args.depth}", file=sys.stderr)
+
+    # The ETA is measured (plies/sec so far over the plies left) once games finish
+    if shard or listed_jobs is not None:
+        total_plies = sum(job['moveCount'] for job in (shard_jobs if shard else listed_jobs))
+    elif pgn_text is not None and selection is None:
+        total_plies = count_plies(pgn_text)
+    else:
+        total_plies = None
+    eta = EtaTracker(total_plies)
+    if total_plies is not None:
+        print(f"⏱️  Total plies: {total_plies} (ETA shown once the first games finish)\n", file=sys.stderr)
+    else:
+        print('', file=sys.stderr)
+
+    settings = analysis_settings(args, None if args.no_cache else read_engine_id(args.stockfish_path))
+    stats = {'cacheHits': 0, 'cacheMisses': 0}
+
+    # Results of games finished by an earlier (interrupted) run
+    finished = {}
+    checkpoint = None
+    if args.checkpoint:
+        # Evaluations of another engine (e.g. after a Stockfish upgrade) must not be mixed in
+        header = {'engineId': settings['engineId'] or read_engine_id(args.stockfish_path),
+                  'depth': args.depth, 'sampleRate': args.sample}
+        if args.coarse_depth:
+            header['coarseDepth'] = args.coarse_depth
+        if args.syzygy:
+            header['syzygy'] = True
+        if args.windowed_accuracy:
+            header['windowedAccuracy'] = True
+        if shard:
+            header['shard'] = f"{shard[0]}/{shard[1]}"
+        if args.resume:
+            try:
+                finished = load_checkpoint(args.checkpoint, header)
+            except CheckpointMismatch as e:
+                print(f"Cannot resume: {e}", file=sys.stderr)
+                sys.exit(1)
+        checkpoint = CheckpointWriter(args.checkpoint, header, resume=args.resume)
+
+    # Per-ply records go to the binary ply file, the JSON keeps per-game fields
+    ply_writer = PlyFileWriter(args.ply_file) if args.ply_file else None
+
+    # Streaming analyzes game by game (dedup needs the whole round up front), and
+    # so does a time budget (each game is searched at its own depth, in priority order)
+    game_by_game = args.no_dedup or args.stream or args.time_budget is not None
+    if shard:
+        if workers > 1 and game_by_game and listed_jobs is None:
+            for job in shard_jobs:
+                job['pgn'] = str(job.pop('game'))
+        jobs = skip_finished(shard_jobs, finished, eta)
+    else:
+        jobs = skip_finished(input_jobs(pack_pgn=workers > 1 and game_by_game), finished, eta)
+
+    # Every finished game is kept under the content key of its moves and settings
+    result_cache = None if args.no_cache else ResultCache(args.result_cache)
+    reused = {}
+    if result_cache:
+        jobs = with_result_keys(jobs, settings, parse=args.changed_only)
+    if args.changed_only:
+        jobs, reused, dropped = reuse_results(jobs, result_cache, eta)
+        print(f"♻️  Changed only: {len(reused)} unchanged game(s) reused, {len(jobs)} new or changed game(s) to analyze"
+              f"{f', {len(dropped)} duplicate game(s) dropped' if dropped else ''}\n", file=sys.stderr)
+        for job in dropped:
+            print(f"   Dropped duplicate game {job['gameIndex']}: {job['white']} vs {job['black']}", file=sys.stderr)
+        if dropped:
+            print('', file=sys.stderr)
+
+    # Award columns of streamed games (per-ply data is not kept)
+    award_table = AwardTable()
+
+    scheduler = None
+    if args.time_budget is not None:
+        # Short calibration at the full depth; finished games refine the estimate
+        items = calibration_positions(input_jobs(), workers * BUDGET_CALIBRATION_POSITIONS)
+        positions_per_second = measure_layout({'workers': workers, 'threads': args.threads, 'hash': args.hash,
+                                               'pinCpus': args.pin_cpus}, items, settings)
+        scheduler = BudgetScheduler(args.time_budget * 60, args.depth, args.sample, workers,
+                                    positions_per_second, started=run_started)
+        jobs = list(jobs)
+        full_depth = scheduler.estimate(jobs)
+        print(f"⏳ Time budget: {format_duration(args.time_budget * 60)} | Full depth estimate: {format_duration(full_depth)} "
+              f"({positions_per_second:.1f} positions/s at depth {args.depth})", file=sys.stderr)
+        if full_depth > args.time_budget * 60:
+            floor = scheduler.estimate(jobs, scheduler.min_depth)
+            print(f"   Games later in the queue will be downgraded (depth {scheduler.min_depth} everywhere: "
+                  f"{format_duration(floor)})", file=sys.stderr)
+        print('', file=sys.stderr)
+        jobs = scheduler.schedule(jobs)
+
+    if game_by_game:
+        results = run_jobs(jobs, settings, workers, stats, scheduler)
+    else:
+        results = run_deduplicated(jobs, settings, workers, stats)
+
+    games_seen = 0
+    plies_analyzed = 0
+    for job, analysis in results:
+        games_seen += 1
+        eta.advance(job['moveCount'])
+        plies_analyzed += job['moveCount']
+        game_index = job['gameIndex']
+        white = job['white']
+        black = job['black']
+
+        # Truncate long names to fit on one line (shorter to avoid wrapping)
+        max_name_len = 20
+        white_short = white[:max_name_len] + '...' if len(white) > max_name_len else white
+        black_short = black[:max_name_len] + '...' if len(black) > max_name_len else black
+
+        # Print progress with game info (use \r to overwrite line)
+        if total_games:
+            # Budgeted runs go in priority order and --games / --changed-only skip games, so count finished games instead
+            if scheduler or selection is not None or args.changed_only:
+                progress_count = games_seen + len(finished) + len(reused)
+            elif shard:
+                progress_count = shard_positions[game_index]
+            else:
+                progress_count = game_index + 1
+            progress_pct = (progress_count / total_games) * 100
+            progress_bar = '█' * int(progress_pct / 5) + '░' * (20 - int(progress_pct / 5))
+            progress_line = f"[{progress_bar}] {progress_pct:3.0f}% | {progress_count}/{total_games} | {white_short} vs {black_short}"
+        else:
+            progress_line = f"Game {game_index + 1} | {white_short} vs {black_short}"
+        rate = eta.plies_per_second()
+        remaining = eta.eta_seconds()
+        if remaining is not None:
+            progress_line += f" | ETA {format_duration(remaining)} ({rate:.0f} plies/s)"
+        elif rate is not None:
+            progress_line += f" | {rate:.0f} plies/s"
+
+        # Skip games with no moves (forfeits, etc.)
+        if analysis is None:
+            print(f"\r{progress_line:<100} [SKIPPED - no moves]", end='', flush=True, file=sys.stderr)
+            continue
+
+        print(f"\r{progress_line:<100}", end='', flush=True, file=sys.stderr)
+
+        record = game_record(job, analysis, args.depth, game_metadata.get(game_index))
+        if result_cache and 'resultKey' in job and 'analysisDepth' not in record:
+            result_cache.put(job['resultKey'], analysis)
+        if checkpoint:
+            with metrics.timer('serialization'):
+                checkpoint.append(record)
+        if ply_writer:
+            ply_writer.add(game_index, record.pop('moveTimes'))
+
+        if args.stream:
+            # Emit the game right away and keep only the award leaders
+            with metrics.timer('serialization'):
+                print(json.dumps(record), flush=True)
+            award_table.add(record)
+        else:
+            games_analyzed.append(record)
+
+    if checkpoint:
+        checkpoint.close()
+
+    if scheduler:
+        games_analyzed.sort(key=lambda g: g['gameIndex'])
+
+    if finished:
+        print(f"\n\n♻️  Resumed {len(finished)} game(s) from {args.checkpoint}", end='', file=sys.stderr)
+        if ply_writer:
+            for record in finished.values():
+                ply_writer.add(record['gameIndex'], record.pop('moveTimes'))
+        games_analyzed = sorted(games_analyzed + list(finished.values()), key=lambda g: g['gameIndex'])
+
+    if reused:
+        # Unchanged games: cached analyses with the players, ratings and ids of this input
+        records = [game_record(job, analysis, args.depth, game_metadata.get(job['gameIndex']))
+                   for job, analysis in reused.values()]
+        if ply_writer:
+            for record in records:
+                ply_writer.add(record['gameIndex'], record.pop('moveTimes'))
+        games_analyzed = sorted(games_analyzed + records, key=lambda g: g['gameIndex'])
+
+    if ply_writer:
+        with metrics.timer('serialization'):
+            ply_writer.close()
+
+    print(f"\n\n✅ Analysis complete! Processed {total_games if total_games is not None else games_seen} games\n", file=sys.stderr)
+
+    if stats.get('dedupReport'):
+        print(stats.pop('dedupReport') + '\n', file=sys.stderr)
+
+    # Worker measurements came back with their results; add this process's measurements so far
+    run_metrics = stats.pop('metrics', Metrics())
+    run_metrics.merge(metrics.drain())
+    for name, stage in run_metrics.stages.items():
+        print(f"🔀 Pipeline ({name} -> engine): engine side waited {stage['consumerWaitSeconds']:.1f}s for {name}, "
+              f"{name} waited {stage['producerWaitSeconds']:.1f}s for the engine "
+              f"({stage['items']} item(s), queue of {stage['queueSize']})\n", file=sys.stderr)
+
+    if stats.get('resolvedPositions') or stats.get('forcedPositions'):
+        print(f"🧮 Scored without a search: {stats['resolvedPositions']} terminal/tablebase position(s), "
+              f"{stats['forcedPositions']} forced reply position(s)\n", file=sys.stderr)
+
+    if scheduler:
+        print(f"⏳ Time budget: finished in {format_duration(time.perf_counter() - run_started)} of "
+              f"{format_duration(args.time_budget * 60)}, {scheduler.downgraded} game(s) analyzed below depth {args.depth} "
+              f"(marked with analysisDepth)\n", file=sys.stderr)
+
+    if args.coarse_depth and stats.get('sampledPlies'):
+        escalated_pct = stats['escalatedPlies'] / stats['sampledPlies'] * 100
+        print(f"🔭 Adaptive depth: {stats['escalatedPlies']}/{stats['sampledPlies']} plies escalated to depth {args.depth} "
+              f"({escalated_pct:.1f}%), the rest kept at depth {args.coarse_depth}\n", file=sys.stderr)
+
+    report_caches(args, settings, stats, result_cache)
+
+    if args.stream:
+        # Final record: the summary over every streamed game
+        with metrics.timer('summary'):
+            summary = award_table.summary()
+        with metrics.timer('serialization'):
+            print(json.dumps({'summary': summary}), flush=True)
+    else:
+        # Output JSON
+        with metrics.timer('summary'):
+            summary = summarize(games_analyzed)
+        output = {
+            'games': games_analyzed,
+            'summary': summary
+        }
+        if args.ply_file:
+            output['plyFile'] = ply_file_reference(args.ply_file, args.out)
+        if shard:
+            # Checked by `analyze-pgn.py merge`
+            output['shard'] = {'index': shard[0], 'count': shard[1]}
+
+        with metrics.timer('serialization'):
+            if args.out:
+                write_json_atomic(args.out, output)
+            else:
+                print(json.dumps(output, indent=2), flush=True)
+
+    if args.metrics:
+        # Summary and output timings
+        run_metrics.merge(metrics.drain())
+        report = run_metrics.report(time.perf_counter() - run_started, games_seen, plies_analyzed, workers, stats)
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📈 Metrics written to {args.metrics}", file=sys.stderr)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Analyzer Benchmark
+==================
+
+Deterministic benchmark of scripts/analyze-pgn.py over fixed corpora taken
+from the committed round data (data/consolidated):
+
+    small   first 10 games of Round 5
+    medium  all of Round 5 (30 games)
+    large   Rounds 3-6 (200 games, about the size of Round 1)
+
+Two benchmarks run per corpus:
+
+    analyze_game  games analyzed one by one in-process with a timed engine
+                  (engine vs Python time measured around every search)
+    main          the full script (python3 analyze-pgn.py) as a subprocess,
+                  with the input PGN on stdin, as the workflows run it
+
+Reported: games/sec, positions/sec, engine calls per game, wall time split
+between engine and Python, and peak RSS. In analyze_game the engine time is
+measured around each search (UCI round trip included); in main it is the
+mock engine's own busy time (from `go` to `bestmove`), so the Python share
+there also covers talking to the engine.
+
+By default the bundled mock engine (scripts/analysis/mock_uci_engine.py) is
+used: it answers every search with a canned score, optionally after a fixed
+latency, so the Python-side cost is measurable on any Linux machine. Pass
+--engine PATH to benchmark a real Stockfish instead (engine time of the main
+benchmark is then only known as a whole).
+
+Usage:
+    python3 scripts/benchmark-analysis.py
+    python3 scripts/benchmark-analysis.py --corpus small --latency-ms 5
+    python3 scripts/benchmark-analysis.py --engine /usr/games/stockfish --depth 12
+    python3 scripts/benchmark-analysis.py --analyzer-args "--no-dedup" --json bench.json
+"""
+
+import argparse
+import concurrent.futures
+import importlib.util
+import io
+import json
+import os
+import resource
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+import chess.pgn
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+ANALYZER = os.path.join(SCRIPTS_DIR, 'analyze-pgn.py')
+MOCK_ENGINE = os.path.join(SCRIPTS_DIR, 'analysis', 'mock_uci_engine.py')
+
+# Corpus name -> [(round, number of games or None for all)]
+CORPORA = {
+    'small': [(5, 10)],
+    'medium': [(5, None)],
+    'large': [(3, None), (4, None), (5, None), (6, None)],
+}
+
+
+def load_corpus(name):
+    """PGN text of a corpus, games in round order."""
+    pgns = []
+    for round_num, limit in CORPORA[name]:
+        path = os.path.join(REPO_DIR, 'data', 'consolidated', f'round-{round_num}-matches.json')
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        games = [game['pgn'] for match in data['matches'] for game in match['gameDetails'] if game.get('pgn')]
+        pgns.extend(games[:limit])
+    return '\n\n'.join(pgns) + '\n'
+
+
+def count_positions(pgn_text):
+    """(games, positions) of a PGN text; a game with N moves has N + 1 positions."""
+    pgn_io = io.StringIO(pgn_text)
+    games = positions = 0
+    while True:
+        game = chess.pgn.read_game(pgn_io)
+        if game is None:
+            break
+        games += 1
+        moves = sum(1 for _ in game.mainline_moves())
+        positions += moves + 1 if moves else 0
+    return games, positions
+
+
+def load_analyzer():
+    """Import analyze-pgn.py as a module (its name is not a valid identifier)."""
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    spec = importlib.util.spec_from_file_location('analyze_pgn', ANALYZER)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TimedEngine:
+    """Engine wrapper counting searches and the time spent waiting for them."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.calls = 0
+        self.seconds = 0.0
+
+    def evaluate(self, board, depth=None):
+        started = time.perf_counter()
+        evaluation = self.engine.evaluate(board, depth)
+        self.seconds += time.perf_counter() - started
+        self.calls += 1
+        return evaluation
+
+    def close(self):
+        self.engine.close()
+
+
+def bench_analyze_game(corpus, engine_path, backend, depth):
+    """Analyze every game of a corpus in this process. Runs in a fresh child process."""
+    analyzer = load_analyzer()
+    pgn_text = load_corpus(corpus)
+    engine = TimedEngine(analyzer.open_engine(backend, engine_path, depth))
+
+    pgn_io = io.StringIO(pgn_text)
+    started = time.perf_counter()
+    while True:
+        game = chess.pgn.read_game(pgn_io)
+        if game is None:
+            break
+        if next(iter(game.mainline_moves()), None) is None:
+            continue
+        analyzer.analyze_game(game, engine, depth)
+    wall = time.perf_counter() - started
+    engine.close()
+
+    return {
+        'wallSeconds': wall,
+        'engineSeconds': engine.seconds,
+        'engineCalls': engine.calls,
+        'peakRssMB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def bench_main(corpus, engine_path, backend, depth, analyzer_args, mock):
+    """Run analyze-pgn.py on a corpus as a subprocess."""
+    pgn_text = load_corpus(corpus)
+    command = [sys.executable, ANALYZER, '--stockfish-path', engine_path, '--engine-backend', backend,
+               '--depth', str(depth), '--no-cache', '--workers', '1', *analyzer_args]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, 'engine-stats.jsonl')
+        env = dict(os.environ)
+        if mock:
+            env['MOCK_UCI_STATS'] = stats_path
+
+        with tempfile.TemporaryFile('w+') as stdin, tempfile.TemporaryFile() as stdout:
+            stdin.write(pgn_text)
+            stdin.seek(0)
+            started = time.perf_counter()
+            process = subprocess.Popen(command, stdin=stdin, stdout=stdout, stderr=subprocess.DEVNULL,
+                                       cwd=REPO_DIR, env=env)
+            # wait4 reports the peak RSS of this run alone (analyzer and its engines)
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - started
+            process.returncode = os.waitstatus_to_exitcode(status)
+            if process.returncode != 0:
+                raise RuntimeError(f"analyze-pgn.py exited with {process.returncode}: {shlex.join(command)}")
+
+        engine_calls = engine_seconds = None
+        if mock and os.path.exists(stats_path):
+            with open(stats_path, 'r', encoding='utf-8') as f:
+                engines = [json.loads(line) for line in f if line.strip()]
+            engine_calls = sum(engine['searches'] for engine in engines)
+            engine_seconds = sum(engine['busySeconds'] for engine in engines)
+
+    return {
+        'wallSeconds': wall,
+        'engineSeconds': engine_seconds,
+        'engineCalls': engine_calls,
+        'peakRssMB': usage.ru_maxrss / 1024
+    }
+
+
+def with_rates(result, games, positions):
+    """Add per-game / per-second figures to a raw benchmark result."""
+    wall = result['wallSeconds']
+    engine = result['engineSeconds']
+    return {
+        **result,
+        'games': games,
+        'positions': positions,
+        'pythonSeconds': wall - engine if engine is not None else None,
+        'gamesPerSecond': games / wall if wall > 0 else None,
+        'positionsPerSecond': positions / wall if wall > 0 else None,
+        'engineCallsPerGame': result['engineCalls'] / games if result['engineCalls'] is not None and games else None
+    }
+
+
+def format_row(columns, widths):
+    return '  '.join(str(column).rjust(width) if i else str(column).ljust(width)
+                     for i, (column, width) in enumerate(zip(columns, widths)))
+
+
+def print_report(results):
+    def number(value, digits=2):
+        return '-' if value is None else f"{value:.{digits}f}"
+
+    headers = ['benchmark', 'games', 'positions', 'calls/game', 'wall s', 'engine s', 'python s',
+               'games/s', 'positions/s', 'peak RSS MB']
+    rows = [[f"{r['corpus']}/{r['benchmark']}", r['games'], r['positions'], number(r['engineCallsPerGame'], 1),
+             number(r['wallSeconds']), number(r['engineSeconds']), number(r['pythonSeconds']),
+             number(r['gamesPerSecond']), number(r['positionsPerSecond'], 0), number(r['peakRssMB'], 1)]
+            for r in results]
+    widths = [max(len(str(row[i])) for row in [headers, *rows]) for i in range(len(headers))]
+
+    print(format_row(headers, widths))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print(format_row(row, widths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyze-pgn.py on fixed corpora')
+    parser.add_argument('--corpus', choices=[*CORPORA, 'all'], default='all', help='Corpus to run (default: all)')
+    parser.add_argument('--benchmark', choices=['analyze_game', 'main', 'all'], default='all', help='Benchmark to run (default: all)')
+    parser.add_argument('--engine', type=str, default=None, help='Engine binary (default: the bundled mock engine)')
+    parser.add_argument('--engine-backend', choices=['uci', 'stockfish'], default='uci', help='Engine backend of analyze-pgn.py (default: uci)')
+    parser.add_argument('--depth', type=int, default=10, help='Search depth (default: 10)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mock engine latency per search (default: 0)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per benchmark; the fastest is reported (default: 1)')
+    parser.add_argument('--analyzer-args', type=str, default='', help='Extra arguments for the main benchmark, e.g. "--no-dedup"')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    mock = args.engine is None
+    engine_path = MOCK_ENGINE if mock else args.engine
+    if mock:
+        os.environ['MOCK_UCI_LATENCY_MS'] = str(args.latency_ms)
+
+    corpora = list(CORPORA) if args.corpus == 'all' else [args.corpus]
+    benchmarks = ['analyze_game', 'main'] if args.benchmark == 'all' else [args.benchmark]
+
+    print(f"🏁 Benchmarking analyze-pgn.py | Engine: {'mock' if mock else engine_path}"
+          f"{f' ({args.latency_ms:g} ms/search)' if mock else ''} | Depth: {args.depth} | Backend: {args.engine_backend}\n",
+          file=sys.stderr)
+
+    results = []
+    for corpus in corpora:
+        games, positions = count_positions(load_corpus(corpus))
+        for benchmark in benchmarks:
+            runs = []
+            for _ in range(args.repeat):
+                if benchmark == 'analyze_game':
+                    # A fresh process per run, so peak RSS belongs to this run
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as pool:
+                        runs.append(pool.submit(bench_analyze_game, corpus, engine_path,
+                                                args.engine_backend, args.depth).result())
+                else:
+                    runs.append(bench_main(corpus, engine_path, args.engine_backend, args.depth,
+                                           shlex.split(args.analyzer_args), mock))
+            best = min(runs, key=lambda run: run['wallSeconds'])
+            result = {'corpus': corpus, 'benchmark': benchmark, **with_rates(best, games, positions)}
+            results.append(result)
+            print(f"   ✓ {corpus}/{benchmark}: {result['wallSeconds']:.2f}s", file=sys.stderr)
+
+    print('', file=sys.stderr)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'engine': 'mock' if mock else engine_path,
+                'engineBackend': args.engine_backend,
+                'depth': args.depth,
+                'latencyMs': args.latency_ms if mock else None,
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
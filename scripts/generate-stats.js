@@ -210,16 +210,12 @@ function generateStatsForRound(roundNum, options = {}) {
   const funStats = calculateFunStats(allGames);
   console.log('    ✓ Fun Stats complete');
 
-  // Time Awards (time-based awards)
-  console.log('\n  Calculating Time Awards...');
-  const timeAwards = calculateTimeAwards(allGames);
-  console.log('    ✓ Time Awards complete');
-
   // Stockfish Analysis (read from pre-generated analysis files if available)
   let analysis = null;
+  let rawAnalysis = null;
   if (hasAnalysis(roundNum)) {
     console.log(`\n  Reading Stockfish analysis from data/analysis/round-${roundNum}-analysis.json...`);
-    const rawAnalysis = readRoundAnalysis(roundNum);
+    rawAnalysis = readRoundAnalysis(roundNum);
     analysis = formatAnalysisForStats(rawAnalysis);
     if (analysis) {
       console.log(`    ✓ Loaded analysis for ${analysis.metadata.gamesAnalyzed} games (depth ${analysis.metadata.depth})`);
@@ -229,6 +225,11 @@ function generateStatsForRound(roundNum, options = {}) {
     console.log(`     Run: gh workflow run "🔬 Stockfish Analysis (Parallel)"  to generate analysis`);
   }
 
+  // Time Awards (time-based awards, with the analysis clock times when available)
+  console.log('\n  Calculating Time Awards...');
+  const timeAwards = calculateTimeAwards(allGames, rawAnalysis, roundNum);
+  console.log('    ✓ Time Awards complete');
+
   // Compile final output
   const statsOutput = {
     // Metadata
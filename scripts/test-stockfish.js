@@ -3,11 +3,14 @@
  * Test Stockfish Analysis
  *
  * Extracts 2 sample games and runs Stockfish analysis to verify setup.
+ * Uses a running analysis service (analyze-pgn.py serve --depth 10) when
+ * there is one, instead of starting the analyzer.
  */
 
 const fs = require('fs');
 const path = require('path');
 const { execSync } = require('child_process');
+const { analyzeWithService, serviceStatus } = require('./utils/analysis-service');
 
 // Extract first 2 games from Round 1 enriched data
 function extractSampleGames() {
@@ -76,6 +79,18 @@ function runAnalysis(pgnData, depth = 10) {
   }
 }
 
+// Run the analysis on the warm engines of a running service
+async function runServiceAnalysis(pgnData, depth = 10) {
+  console.log('\n🔍 Running Stockfish analysis (analysis service)...');
+  console.log(`   Depth: ${depth}\n`);
+
+  const startTime = Date.now();
+  const results = await analyzeWithService(pgnData, { depth });
+  const elapsed = ((Date.now() - startTime) / 1000).toFixed(1);
+  console.log(`✅ Analysis complete in ${elapsed}s`);
+  return results;
+}
+
 // Display results
 function displayResults(results) {
   console.log('\n' + '='.repeat(60));
@@ -118,12 +133,8 @@ function displayResults(results) {
   console.log('\n');
 }
 
-// Main
-async function main() {
-  console.log('Stockfish Analysis Test');
-  console.log('='.repeat(60));
-
-  // Check dependencies
+// Check Stockfish, the venv and the Python packages (exits with install hints if any is missing)
+function checkDependencies() {
   const missing = [];
   const pythonPath = path.join(__dirname, '..', 'venv', 'bin', 'python3');
 
@@ -164,12 +175,33 @@ async function main() {
     console.error('   source venv/bin/activate && pip install python-chess stockfish\n');
     process.exit(1);
   }
+}
+
+// Main
+async function main() {
+  console.log('Stockfish Analysis Test');
+  console.log('='.repeat(60));
+
+  // Depth 10 for faster testing
+  const depth = 10;
+
+  // A running service already has Stockfish and the Python packages loaded
+  const service = await serviceStatus();
+  const useService = service && service.depth === depth;
+  if (useService) {
+    console.log(`✅ Analysis service running (${service.engineId}, ${service.workers} worker(s))\n`);
+  } else {
+    if (service) {
+      console.log(`ℹ️  Analysis service runs depth ${service.depth}, not ${depth}; starting the analyzer instead\n`);
+    }
+    checkDependencies();
+  }
 
   // Extract sample games
   const pgnData = extractSampleGames();
 
-  // Run analysis (depth 10 for faster testing)
-  const results = runAnalysis(pgnData, 10);
+  // Run analysis
+  const results = useService ? await runServiceAnalysis(pgnData, depth) : runAnalysis(pgnData, depth);
 
   // Display results
   displayResults(results);
@@ -9,6 +9,12 @@
  * 1. Stockfish analysis can be run independently (slow, 60 min parallel)
  * 2. Stats generation is fast (30 min) and reads existing analysis files
  * 3. Analysis data persists across stats regenerations
+ *
+ * Per-ply evaluations (moveTimes) may live in a compact binary ply file, whose
+ * path relative to the JSON is its plyFile (analyze-pgn.py --ply-file, layout
+ * in scripts/analysis/plies.py).
+ * It is only opened when a consumer asks for a game's plies, and only that
+ * game's rows are read from disk.
  */
 
 const fs = require('fs');
@@ -43,6 +49,216 @@ function readRoundAnalysis(round) {
   }
 }
 
+const PLY_FILE_MAGIC = 'PLYS';
+const PLY_FILE_VERSION = 2;
+const PLY_FILE_HEADER_SIZE = 16;
+// Stored for clock times that were not annotated
+const PLY_FILE_NO_CLOCK = -1;
+
+/**
+ * Stored clock time (milliseconds) in seconds, as in the analysis JSON
+ * @param {number} milliseconds - Stored value
+ * @returns {number|null} Seconds, or null if not annotated
+ */
+function clockSeconds(milliseconds) {
+  return milliseconds === PLY_FILE_NO_CLOCK ? null : milliseconds / 1000;
+}
+
+/**
+ * Read `length` bytes at `position` from an open file
+ * @param {number} fd - File descriptor
+ * @param {number} position - Byte offset
+ * @param {number} length - Number of bytes
+ * @returns {Buffer}
+ */
+function readBytes(fd, position, length) {
+  const buffer = Buffer.alloc(length);
+  fs.readSync(fd, buffer, 0, length, position);
+  return buffer;
+}
+
+/**
+ * Open a binary ply file lazily: only the header and game table are read here
+ * @param {string} plyPath - Path to the .plies.bin file
+ * @returns {Object} Reader with gameIndexes, hasGame(gameIndex), readGame(gameIndex), close()
+ */
+function openPlyFile(plyPath) {
+  const fd = fs.openSync(plyPath, 'r');
+  const header = readBytes(fd, 0, PLY_FILE_HEADER_SIZE);
+
+  const version = header.readUInt16LE(4);
+  // Version 1 files have no clock sections (read back without clock times)
+  if (header.toString('latin1', 0, 4) !== PLY_FILE_MAGIC || version < 1 || version > PLY_FILE_VERSION) {
+    fs.closeSync(fd);
+    throw new Error(`${plyPath} is not a version 1-${PLY_FILE_VERSION} ply file`);
+  }
+  const hasClocks = version >= 2;
+
+  const gameCount = header.readUInt32LE(8);
+  const plyCount = header.readUInt32LE(12);
+
+  // Section offsets (see scripts/analysis/plies.py)
+  const gameIndexOffset = PLY_FILE_HEADER_SIZE;
+  const plyStartOffset = gameIndexOffset + gameCount * 4;
+  const sanStartOffset = plyStartOffset + (gameCount + 1) * 4;
+  const clockOffset = sanStartOffset + (plyCount + 1) * 4;
+  const elapsedOffset = clockOffset + (hasClocks ? plyCount * 4 : 0);
+  const plyOffset = elapsedOffset + (hasClocks ? plyCount * 4 : 0);
+  const evalBeforeOffset = plyOffset + plyCount * 2;
+  const evalAfterOffset = evalBeforeOffset + plyCount * 2;
+  const sanOffset = evalAfterOffset + plyCount * 2;
+
+  const table = readBytes(fd, gameIndexOffset, sanStartOffset - gameIndexOffset);
+  const rowsByGame = new Map();
+  for (let game = 0; game < gameCount; game++) {
+    const gameIndex = table.readInt32LE(game * 4);
+    const start = table.readUInt32LE(gameCount * 4 + game * 4);
+    const end = table.readUInt32LE(gameCount * 4 + (game + 1) * 4);
+    rowsByGame.set(gameIndex, { start, end });
+  }
+
+  return {
+    gameCount,
+    plyCount,
+    gameIndexes: [...rowsByGame.keys()],
+
+    hasGame(gameIndex) {
+      return rowsByGame.has(gameIndex);
+    },
+
+    /**
+     * Read one game's plies in the analysis JSON moveTimes format
+     * @param {number} gameIndex - Game index within the round
+     * @returns {Array|null} moveTimes records, or null if the game is not in the file
+     */
+    readGame(gameIndex) {
+      const rows = rowsByGame.get(gameIndex);
+      if (!rows) {
+        return null;
+      }
+      const count = rows.end - rows.start;
+      if (count === 0) {
+        return [];
+      }
+
+      const sanStarts = readBytes(fd, sanStartOffset + rows.start * 4, (count + 1) * 4);
+      const plies = readBytes(fd, plyOffset + rows.start * 2, count * 2);
+      const evalsBefore = readBytes(fd, evalBeforeOffset + rows.start * 2, count * 2);
+      const evalsAfter = readBytes(fd, evalAfterOffset + rows.start * 2, count * 2);
+      const clocks = hasClocks ? readBytes(fd, clockOffset + rows.start * 4, count * 4) : null;
+      const elapsed = hasClocks ? readBytes(fd, elapsedOffset + rows.start * 4, count * 4) : null;
+      const firstSan = sanStarts.readUInt32LE(0);
+      const sans = readBytes(fd, sanOffset + firstSan, sanStarts.readUInt32LE(count * 4) - firstSan);
+
+      const moveTimes = [];
+      for (let row = 0; row < count; row++) {
+        const ply = plies.readUInt16LE(row * 2);
+        moveTimes.push({
+          ply,
+          moveNumber: Math.floor((ply - 1) / 2) + 1,
+          color: (ply - 1) % 2 === 0 ? 'white' : 'black',
+          move: sans.toString('utf8', sanStarts.readUInt32LE(row * 4) - firstSan, sanStarts.readUInt32LE((row + 1) * 4) - firstSan),
+          evalBefore: evalsBefore.readInt16LE(row * 2) / 100,
+          evalAfter: evalsAfter.readInt16LE(row * 2) / 100,
+          clockRemaining: clocks ? clockSeconds(clocks.readInt32LE(row * 4)) : null,
+          timeSpent: elapsed ? clockSeconds(elapsed.readInt32LE(row * 4)) : null
+        });
+      }
+      return moveTimes;
+    },
+
+    close() {
+      fs.closeSync(fd);
+    }
+  };
+}
+
+// Ply file readers opened so far, by path
+const plyFileReaders = new Map();
+
+/**
+ * Per-ply evaluations of one game, from the analysis JSON or its ply file
+ * @param {number} round - Round number
+ * @param {Object} analysis - Analysis from readRoundAnalysis()
+ * @param {number} gameIndex - Game index within the round
+ * @returns {Array|null} moveTimes records, or null if not available
+ */
+function readGameMoveTimes(round, analysis, gameIndex) {
+  const game = analysis && analysis.games && analysis.games.find(g => g.gameIndex === gameIndex);
+  if (game && game.moveTimes) {
+    return game.moveTimes;
+  }
+  return readPlyFileMoveTimes(round, analysis, gameIndex);
+}
+
+/**
+ * Per-ply evaluations of one game from the analysis' ply file
+ * @param {number} round - Round number
+ * @param {Object} analysis - Analysis from readRoundAnalysis()
+ * @param {number} gameIndex - Game index within the round
+ * @returns {Array|null} moveTimes records, or null if there is no ply file
+ */
+function readPlyFileMoveTimes(round, analysis, gameIndex) {
+  if (!analysis || !analysis.plyFile) {
+    return null;
+  }
+
+  const plyPath = path.join(__dirname, '../../data/analysis', analysis.plyFile);
+  try {
+    if (!plyFileReaders.has(plyPath)) {
+      plyFileReaders.set(plyPath, openPlyFile(plyPath));
+    }
+    return plyFileReaders.get(plyPath).readGame(gameIndex);
+  } catch (error) {
+    console.warn(`⚠️  Error reading per-ply analysis for Round ${round}:`, error.message);
+    return null;
+  }
+}
+
+/**
+ * Key matching a game of the stats data to its analysis: the analysis numbers
+ * games in the order of the round's games.pgn files (round{N}game{M}/), the
+ * enriched data groups them by match, so gameIndex differs between the two
+ * @param {string} white - White player
+ * @param {string} black - Black player
+ * @param {Array<string>} sans - Moves in SAN
+ * @returns {string}
+ */
+function analysisGameKey(white, black, sans) {
+  return `${white}|${black}|${sans.join(' ')}`;
+}
+
+/**
+ * Games with the per-ply moveTimes of their analysis (inline, or from the ply
+ * file when there is one). Games whose analysis is missing or sampled (not
+ * every ply) are returned unchanged.
+ * @param {number} round - Round number
+ * @param {Object} analysis - Analysis from readRoundAnalysis()
+ * @param {Array<Object>} games - Parsed games (white, black, moveList or moves)
+ * @returns {Array<Object>} Games, with moveTimes where matched
+ */
+function attachAnalysisMoveTimes(round, analysis, games) {
+  if (!analysis || !analysis.games) {
+    return games;
+  }
+
+  const moveTimesByGame = new Map();
+  for (const analyzed of analysis.games) {
+    // One pass over the records: no per-game lookup by gameIndex
+    const moveTimes = analyzed.moveTimes || readPlyFileMoveTimes(round, analysis, analyzed.gameIndex);
+    if (moveTimes && moveTimes.length > 0) {
+      const key = analysisGameKey(analyzed.white, analyzed.black, moveTimes.map(m => m.move));
+      moveTimesByGame.set(key, moveTimes);
+    }
+  }
+
+  return games.map(game => {
+    const sans = game.moveList ? game.moveList.map(m => m.san) : (game.moves || '').split(/\s+/).filter(Boolean);
+    const moveTimes = moveTimesByGame.get(analysisGameKey(game.white, game.black, sans));
+    return moveTimes ? { ...game, moveTimes } : game;
+  });
+}
+
 /**
  * Check if analysis exists for a round
  * @param {number} round - Round number
@@ -111,5 +327,8 @@ module.exports = {
   readRoundAnalysis,
   hasAnalysis,
   getAnalysisStatus,
-  formatAnalysisForStats
+  formatAnalysisForStats,
+  openPlyFile,
+  readGameMoveTimes,
+  attachAnalysisMoveTimes
 };
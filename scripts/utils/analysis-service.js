@@ -0,0 +1,92 @@
+/* eslint-disable @typescript-eslint/no-require-imports */
+/**
+ * Analysis Service Client
+ * =======================
+ *
+ * Talks to a running `analyze-pgn.py serve` (warm engines and caches, see
+ * scripts/analysis/service.py) over localhost HTTP, so Node scripts get the
+ * same JSON as piping games through analyze-pgn.py without starting a new
+ * analyzer and engine per call.
+ *
+ * The address defaults to $ANALYSIS_SERVICE_URL or http://127.0.0.1:8737.
+ */
+
+const http = require('http');
+
+const DEFAULT_URL = process.env.ANALYSIS_SERVICE_URL || 'http://127.0.0.1:8737';
+
+/**
+ * Send a request to the service
+ * @param {string} path - Endpoint (/analyze, /status, /shutdown)
+ * @param {Object} options - { url, body, params }
+ * @returns {Promise<Object>} Decoded JSON response (rejects with the service's error message)
+ */
+function requestService(path, { url = DEFAULT_URL, body = null, params = {} } = {}) {
+  const target = new URL(path, url);
+  for (const [name, value] of Object.entries(params)) {
+    if (value !== undefined && value !== null) {
+      target.searchParams.set(name, String(value));
+    }
+  }
+  const method = body !== null || path === '/shutdown' ? 'POST' : 'GET';
+  const data = body !== null ? Buffer.from(body, 'utf8') : null;
+
+  return new Promise((resolve, reject) => {
+    const req = http.request(target, {
+      method,
+      headers: data ? { 'Content-Type': 'text/plain; charset=utf-8', 'Content-Length': data.length } : {},
+    }, (res) => {
+      const chunks = [];
+      res.on('data', (chunk) => chunks.push(chunk));
+      res.on('end', () => {
+        let payload;
+        try {
+          payload = JSON.parse(Buffer.concat(chunks).toString('utf8'));
+        } catch (error) {
+          reject(new Error(`Invalid response from analysis service: ${error.message}`));
+          return;
+        }
+        if (res.statusCode >= 400) {
+          reject(new Error(payload.error || `Analysis service returned HTTP ${res.statusCode}`));
+        } else {
+          resolve(payload);
+        }
+      });
+    });
+    req.on('error', reject);
+    if (data) {
+      req.write(data);
+    }
+    req.end();
+  });
+}
+
+/**
+ * Check whether a service is listening
+ * @param {string} url - Service address
+ * @returns {Promise<Object|null>} Its status (settings and counters) or null if none is running
+ */
+async function serviceStatus(url = DEFAULT_URL) {
+  try {
+    return await requestService('/status', { url });
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * Analyze games with the service
+ * @param {string} input - PGN text, or the analyze-pgn.py --json-input document
+ * @param {Object} options - { url, depth, sample } (the service refuses other settings than its own)
+ * @returns {Promise<Object>} { games, summary }, as written by analyze-pgn.py
+ */
+function analyzeWithService(input, { url = DEFAULT_URL, depth, sample } = {}) {
+  return requestService('/analyze', { url, body: input, params: { depth, sample } });
+}
+
+module.exports = {
+  DEFAULT_URL,
+  analyzeWithService,
+  requestService,
+  serviceStatus,
+};
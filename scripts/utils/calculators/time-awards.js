@@ -7,6 +7,7 @@
  */
 
 const { analyzeAllGames } = require('../time-analyzer-fide');
+const { attachAnalysisMoveTimes } = require('../analysis-reader');
 
 /**
  * Normalize time control classification to analyzer format
@@ -34,12 +35,14 @@ function normalizeTimeControl(classification) {
 /**
  * Calculate time-based awards from game analyses
  * @param {Array} games - Array of parsed game objects with time control
- * @param {Object|null} analysis - Optional Stockfish analysis results
+ * @param {Object|null} analysis - Optional raw Stockfish analysis (readRoundAnalysis());
+ *   its per-ply clock times are used instead of parsing the PGN again
+ * @param {number|null} round - Round number of the analysis
  * @returns {Object} Time awards
  */
-function calculateTimeAwards(games, analysis = null) {
+function calculateTimeAwards(games, analysis = null, round = null) {
   // Normalize time controls in games
-  const normalizedGames = games.map(game => ({
+  const normalizedGames = attachAnalysisMoveTimes(round, analysis, games).map(game => ({
     ...game,
     timeControl: normalizeTimeControl(game.classification)
   }));
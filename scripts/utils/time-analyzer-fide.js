@@ -85,6 +85,36 @@ function extractFideClockTimes(pgnString) {
   return times;
 }
 
+/**
+ * Clock times of a game. The per-ply moveTimes of a full Stockfish analysis
+ * (analyze-pgn.py reads [%clk] / [%emt] while it walks the moves, every ply
+ * unless run with --sample) are used when the game carries them, so the PGN
+ * is not parsed a second time: calculateTimeAwards() attaches them from the
+ * round's analysis (attachAnalysisMoveTimes() in analysis-reader.js).
+ * @param {Object} game - Parsed game object (optionally with analysis moveTimes)
+ * @returns {Array} Array of move time objects
+ */
+function getGameClockTimes(game) {
+  const analyzed = game.moveTimes || [];
+  const complete = analyzed.length > 0 && analyzed.every((m, i) => m.ply === i + 1);
+  if (complete && analyzed.some(m => m.clockRemaining != null)) {
+    // Same fields as extractFideClockTimes, without the evaluations
+    return analyzed
+      .filter(m => m.clockRemaining != null && m.timeSpent != null)
+      .map(m => ({
+        moveNumber: m.moveNumber,
+        ply: m.ply,
+        color: m.color,
+        move: m.move,
+        clockRemaining: m.clockRemaining,
+        timeSpent: m.timeSpent
+      }));
+  }
+
+  // Extract from the raw PGN (with annotations)
+  return extractFideClockTimes(game.rawPgn || game.pgn);
+}
+
 /**
  * Get time control thresholds for zeitnot detection
  * @param {string} timeControl - Time control type
@@ -144,9 +174,7 @@ function getTimeControlThresholds(timeControl) {
  * @returns {Object} Time analysis for the game
  */
 function analyzeGameTime(game, timeControl = 'classical') {
-  // Extract raw PGN (with annotations)
-  const pgnString = game.rawPgn || game.pgn;
-  const moveTimes = extractFideClockTimes(pgnString);
+  const moveTimes = getGameClockTimes(game);
 
   if (moveTimes.length === 0) {
     return null; // No time data available
@@ -287,6 +315,7 @@ function analyzeAllGames(games) {
 module.exports = {
   parseClockTime,
   extractFideClockTimes,
+  getGameClockTimes,
   getTimeControlThresholds,
   analyzeGameTime,
   analyzeAllGames